@@ -40,10 +40,13 @@ class StoreApiBadGatewayError(StoreApiConnectionError):
 
 class StoreApiServiceUnavailableError(StoreApiConnectionError):
     """
-    Store API is not available
+    Store API is not available, the number of seconds to wait before
+    retrying is in self.retry_after when the API sent one
     """
 
-    pass
+    def __init__(self, message, retry_after=None):
+        self.retry_after = retry_after
+        return super().__init__(message)
 
 
 class StoreApiGatewayTimeoutError(StoreApiConnectionError):
@@ -99,10 +102,45 @@ class StoreApiResponseErrorList(StoreApiResponseError):
         return super().__init__(message, status_code)
 
 
+class StoreApiTooManyRequestsError(StoreApiResponseErrorList):
+    """
+    The API is rate limiting us, the number of seconds to wait before
+    retrying is in self.retry_after when the API sent one, and the errors
+    it returned, if any, in self.errors
+    """
+
+    def __init__(
+        self, message, status_code=429, retry_after=None, errors=None
+    ):
+        self.retry_after = retry_after
+        return super().__init__(message, status_code, errors or [])
+
+
 class StoreApiCircuitBreaker(StoreApiError):
     pass
 
 
+class StoreApiConcurrencyLimitError(StoreApiError):
+    """
+    Too many requests are in flight to the Store API host, the request
+    was not sent
+    """
+
+    pass
+
+
+class StoreApiRateLimitError(StoreApiError):
+    """
+    The rate limit shared by our workers for the endpoint group is used up,
+    the request was not sent. The number of seconds until a request is
+    allowed again is in self.retry_after
+    """
+
+    def __init__(self, message, retry_after=None):
+        self.retry_after = retry_after
+        return super().__init__(message)
+
+
 class PublisherAgreementNotSigned(StoreApiError):
     """
     The user needs to sign the agreement
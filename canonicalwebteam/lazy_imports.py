@@ -0,0 +1,24 @@
+import importlib
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for a module that is only imported when one of its attributes
+    is first used, so that importing our modules doesn't pay for optional
+    dependencies (redis, pymacaroons...) the application never uses.
+
+    Attributes set on the stand-in, e.g. by `unittest.mock.patch`, take
+    precedence over the module's own.
+    """
+
+    def __getattr__(self, name: str):
+        # import_module is thread-safe and cheap once the module is loaded
+        return getattr(importlib.import_module(self.__name__), name)
+
+
+def lazy_module(name: str) -> ModuleType:
+    """
+    Return a stand-in for the module `name`, imported on first use
+    """
+    return LazyModule(name)
@@ -1,7 +1,32 @@
-from typing import Callable, Tuple, Type, TypeVar
+from typing import Callable, Optional, Tuple, Type, TypeVar
 from random import uniform
 from sys import maxsize as MAX_INT
+from contextvars import ContextVar
+import asyncio
 import functools
+import inspect
+import logging
+import threading
+
+from canonicalwebteam.lazy_imports import lazy_module
+
+logger = logging.getLogger(__name__)
+
+redis = lazy_module("redis")
+
+# The exception that made `retry` call `delay_fn`, see `delay_retry_after`
+_retried_exception: ContextVar[Optional[BaseException]] = ContextVar(
+    "retried_exception", default=None
+)
+
+
+def _get_delay(delay_fn, retry_attempts: int, exception) -> float:
+    token = _retried_exception.set(exception)
+    try:
+        return delay_fn(retry_attempts)
+    finally:
+        _retried_exception.reset(token)
+
 
 P = TypeVar("P")
 R = TypeVar("R")
@@ -12,10 +37,11 @@ def retry(
     *,
     limit: int = MAX_INT,
     delay_fn: Callable[[int], float] = (lambda x: 0.0),
-    sleep_fn: Callable[[float], None] = (lambda x: None),
+    sleep_fn: Optional[Callable[[float], None]] = None,
     callback_fn: Callable[[Exception], bool] = (lambda x: False),
     logger_fn: Callable[[str], None] = (lambda x: None),
     exceptions: Tuple[Type[Exception]] = (Exception),
+    budget: Optional["RetryBudget"] = None,
 ) -> Callable[P, R]:
     """
     Decorator that implements retry logic for `func` when any of the
@@ -34,9 +60,10 @@ def retry(
             Defaults to a function that always returns 0.0 (no delay).
         sleep_fn (Callable[[float], None], optional): A function that takes
             a float (delay in seconds) and pauses execution for that duration.
-            Users are responsible for ensuring this function is appropriate
-            for their environment (e.g., an async sleep for async contexts).
-            Defaults to a function that performs no actual sleep.
+            When `func` is a coroutine function, the result of `sleep_fn` is
+            awaited if it is awaitable, so `asyncio.sleep` can be used.
+            Defaults to `asyncio.sleep` for coroutine functions, and to a
+            function that performs no actual sleep otherwise.
         callback_fn (Callable[[Exception], bool], optional): A function that
             is called every time an exception from `exceptions` is caught
             during the retry loop. It receives the caught exception as an
@@ -51,12 +78,19 @@ def retry(
         exceptions (Tuple[Type[Exception]], optional): A tuple containing the
             types of exceptions that will trigger a retry. Defaults to
             `(Exception)`, meaning any standard exception will cause a retry.
+        budget (RetryBudget, optional): A retry budget, usually shared by
+            every function calling the same service. Each successful call
+            adds to the budget and each retry spends from it; when it is
+            empty, the exception is raised instead of retrying. Defaults to
+            `None`, meaning retries are only bounded by `limit`.
 
     Returns:
         Callable[P, R]: A decorated version of the input function `func`
             that incorporates the defined retry logic. If `func` is initially
             `None` (when used as `@retry(...)`), it returns a decorator
-            function ready to be applied to another callable.
+            function ready to be applied to another callable. When `func` is
+            a coroutine function, so is the decorated version, and
+            cancelling it stops the retry loop, even while it is sleeping.
 
     Raises:
         ValueError: if `limit` is less than 1
@@ -74,11 +108,27 @@ def retry(
             callback_fn=callback_fn,
             logger_fn=logger_fn,
             exceptions=exceptions,
+            budget=budget,
         )
 
     if limit < 1:
         raise ValueError("The limit must be at least 1")
 
+    if inspect.iscoroutinefunction(func):
+        return _retry_async(
+            func,
+            limit,
+            delay_fn,
+            sleep_fn or asyncio.sleep,
+            callback_fn,
+            logger_fn,
+            exceptions,
+            budget,
+        )
+
+    if sleep_fn is None:
+        sleep_fn = lambda x: None  # noqa: E731
+
     @functools.wraps(func)
     def _retry(*args, **kwargs):
         retry_attempts = 0
@@ -87,10 +137,10 @@ def retry(
         while retry_attempts < limit:
             if retry_attempts > 0:
                 # only sleep if we've already tried once
-                sleep_fn(delay_fn(retry_attempts))
+                sleep_fn(_get_delay(delay_fn, retry_attempts, last_exception))
 
             try:
-                return func(*args, **kwargs)
+                result = func(*args, **kwargs)
             except exceptions as e:
                 last_exception = e
                 retry_attempts += 1
@@ -99,9 +149,19 @@ def retry(
                     # stop early if callback says so, raise `e` immediately
                     raise e
 
+                if _budget_exhausted(budget, retry_attempts, limit):
+                    logger_fn(
+                        f"@retry budget exhausted `{func.__name__}`: {e}"
+                    )
+                    raise e
+
                 logger_fn(
                     f"@retry ({retry_attempts}/{limit}) `{func.__name__}`: {e}"
                 )
+            else:
+                if budget is not None:
+                    budget.record_success()
+                return result
 
         # if we made it here, it means we ran the loop and couldn't get a
         # clean run, raise the last exception we caught and let the user
@@ -111,6 +171,84 @@ def retry(
     return _retry
 
 
+def _budget_exhausted(budget, retry_attempts: int, limit: int) -> bool:
+    # only spend from the budget when another attempt will actually be made
+    return (
+        budget is not None
+        and retry_attempts < limit
+        and not budget.try_spend()
+    )
+
+
+async def _abudget_exhausted(budget, retry_attempts: int, limit: int) -> bool:
+    return (
+        budget is not None
+        and retry_attempts < limit
+        and not await budget.atry_spend()
+    )
+
+
+def _retry_async(
+    func,
+    limit,
+    delay_fn,
+    sleep_fn,
+    callback_fn,
+    logger_fn,
+    exceptions,
+    budget,
+):
+    """
+    Same retry loop as `retry`, for coroutine functions
+    """
+
+    @functools.wraps(func)
+    async def _retry(*args, **kwargs):
+        retry_attempts = 0
+        last_exception = None
+
+        while retry_attempts < limit:
+            if retry_attempts > 0:
+                # only sleep if we've already tried once, without blocking
+                # the event loop when `sleep_fn` is async
+                pause = sleep_fn(
+                    _get_delay(delay_fn, retry_attempts, last_exception)
+                )
+                if inspect.isawaitable(pause):
+                    await pause
+
+            try:
+                result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                # never retry a cancelled call, even if `exceptions` would
+                # catch it
+                raise
+            except exceptions as e:
+                last_exception = e
+                retry_attempts += 1
+
+                if callback_fn(e):
+                    raise e
+
+                if await _abudget_exhausted(budget, retry_attempts, limit):
+                    logger_fn(
+                        f"@retry budget exhausted `{func.__name__}`: {e}"
+                    )
+                    raise e
+
+                logger_fn(
+                    f"@retry ({retry_attempts}/{limit}) `{func.__name__}`: {e}"
+                )
+            else:
+                if budget is not None:
+                    await budget.arecord_success()
+                return result
+
+        raise last_exception
+
+    return _retry
+
+
 def delay_constant(d: float):
     """
     Create a constant delay function that always returns `d`.
@@ -210,6 +348,290 @@ def delay_exponential(
     return _delay_exponential
 
 
+def delay_full_jitter(
+    delay_mult: float, exp_base: float, max_delay: float = float("inf")
+):
+    """
+    Create an exponential backoff function with "full jitter": the delay is
+    a random value between 0 and the exponential delay, so that clients
+    failing at the same time don't all retry at the same time:
+        `uniform(0, min(max_delay, delay_mult * exp_base^n))`.
+
+    Args:
+        delay_mult (float): The multiplier for the exponential delay
+            calculation.
+        exp_base (float): The base of the exponent for the delay
+            calculation.
+        max_delay (float, optional): The upper limit for the delay in
+            seconds. Defaults to positive infinity.
+
+    Returns:
+        Callable[[int], float]: A function that takes an integer
+            (representing the attempt number `n`) and returns a float
+            indicating the randomised delay.
+
+    Raises:
+        ValueError: if `delay_mult` is negative or zero
+        ValueError: if `exp_base` is less than 1
+        ValueError: if `max_delay` is negative
+    """
+    exponential = delay_exponential(delay_mult, exp_base, max_delay)
+
+    def _delay_full_jitter(attempt: int):
+        return uniform(0, exponential(attempt))
+
+    return _delay_full_jitter
+
+
+def delay_decorrelated_jitter(
+    base_delay: float, max_delay: float = float("inf")
+):
+    """
+    Create a backoff function with "decorrelated jitter": each delay is a
+    random value between `base_delay` and three times the previous delay,
+    capped at `max_delay`:
+        `min(max_delay, uniform(base_delay, previous_delay * 3))`.
+
+    The previous delay is reset on the first attempt, so the returned
+    function should not be shared by calls retrying at the same time,
+    e.g. create one per decorated function.
+
+    Args:
+        base_delay (float): The minimum delay in seconds, also used as the
+            previous delay of the first attempt.
+        max_delay (float, optional): The upper limit for the delay in
+            seconds. Defaults to positive infinity.
+
+    Returns:
+        Callable[[int], float]: A function that takes an integer
+            (representing the attempt number) and returns a float
+            indicating the randomised delay.
+
+    Raises:
+        ValueError: if `base_delay` is negative or zero
+        ValueError: if `max_delay` is less than `base_delay`
+    """
+    if base_delay <= 0:
+        raise ValueError("The base delay must be greater than 0")
+    if max_delay < base_delay:
+        raise ValueError("The maximum delay must be at least the base delay")
+
+    previous = [base_delay]
+
+    def _delay_decorrelated_jitter(attempt: int):
+        if attempt <= 1:
+            previous[0] = base_delay
+        previous[0] = min(max_delay, uniform(base_delay, previous[0] * 3))
+        return previous[0]
+
+    return _delay_decorrelated_jitter
+
+
+def delay_retry_after(
+    fallback_fn: Callable[[int], float] = (lambda x: 0.0),
+    max_delay: float = float("inf"),
+):
+    """
+    Create a delay function that waits as long as the server asked. When
+    the exception being retried has a `retry_after` (e.g.
+    StoreApiTooManyRequestsError or StoreApiServiceUnavailableError built
+    from a Retry-After header), that delay is used, capped at `max_delay`.
+    Otherwise the delay comes from `fallback_fn`.
+
+    Args:
+        fallback_fn (Callable[[int], float], optional): The delay function
+            used when the server didn't say how long to wait. Defaults to a
+            function that always returns 0.0 (no delay).
+        max_delay (float, optional): The upper limit for the delay in
+            seconds, so a misbehaving server can't stall the caller.
+            Defaults to positive infinity.
+
+    Returns:
+        Callable[[int], float]: A function that takes an integer
+            (representing the attempt number) and returns the delay in
+            seconds.
+
+    Raises:
+        ValueError: if `max_delay` is negative
+    """
+    if max_delay < 0:
+        raise ValueError("The maximum delay must be at least 0")
+
+    def _delay_retry_after(attempt: int):
+        retry_after = getattr(_retried_exception.get(), "retry_after", None)
+        if retry_after is None:
+            return fallback_fn(attempt)
+        return min(max_delay, retry_after)
+
+    return _delay_retry_after
+
+
+# Redis scripts keeping the token bucket update atomic across processes.
+# KEYS[1]: bucket, ARGV: initial tokens, TTL in seconds, [ratio, max tokens]
+_DEPOSIT_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2])
+local tokens = tonumber(redis.call('INCRBYFLOAT', KEYS[1], ARGV[3]))
+if tokens > tonumber(ARGV[4]) then
+    redis.call('SET', KEYS[1], ARGV[4])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+"""
+_SPEND_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2])
+if tonumber(redis.call('GET', KEYS[1])) >= 1 then
+    redis.call('INCRBYFLOAT', KEYS[1], -1)
+    return 1
+end
+return 0
+"""
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of successful calls, so that
+    an outage doesn't multiply the request rate by the retry `limit`.
+
+    Every successful call adds `ratio` tokens, up to `max_tokens`, and every
+    retry spends one token. Retries are refused while fewer than one token
+    is left. The bucket starts with `initial_tokens` so that a process that
+    just started can still retry a little.
+
+    When a `RedisCache` is given and Redis is available, the bucket is kept
+    in Redis under `name` so the budget applies to the whole fleet, and
+    expires after `ttl` seconds without calls. If Redis fails, the local
+    bucket is used instead, until the cache finds Redis available again.
+    Successes are then counted locally and deposited in Redis
+    `deposit_every` at a time, saving a round trip on most calls.
+
+    Example:
+        store_budget = RetryBudget(ratio=0.1, cache=redis_cache)
+
+        @retry(limit=3, budget=store_budget)
+        def get_details(name):
+            ...
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        max_tokens: float = 100.0,
+        initial_tokens: float = 10.0,
+        cache=None,
+        name: str = "store-api",
+        ttl: int = 3600,
+        deposit_every: int = 10,
+    ):
+        if ratio <= 0:
+            raise ValueError("The ratio must be greater than 0")
+        if initial_tokens > max_tokens:
+            raise ValueError("The initial tokens can't exceed the maximum")
+        if deposit_every < 1:
+            raise ValueError("The deposit interval must be at least 1")
+
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.initial_tokens = initial_tokens
+        self.ttl = ttl
+        self.deposit_every = deposit_every
+        self._lock = threading.Lock()
+        self._tokens = initial_tokens
+        # Successes not deposited in Redis yet
+        self._successes = 0
+
+        self.cache = cache
+        if cache is not None:
+            self._key = f"{cache.namespace}:retry-budget:{name}"
+            self._deposit = cache.client.register_script(_DEPOSIT_SCRIPT)
+            self._spend = cache.client.register_script(_SPEND_SCRIPT)
+
+    def record_success(self):
+        successes = self._count_success()
+        if successes:
+            self._deposit_shared(successes)
+
+    async def arecord_success(self):
+        """
+        Same as `record_success`, for coroutines
+        """
+        successes = self._count_success()
+        if successes:
+            # Redis calls block, keep them off the event loop
+            await asyncio.to_thread(self._deposit_shared, successes)
+
+    def try_spend(self) -> bool:
+        """
+        Spend a token for a retry, returning `False` if none is left
+        """
+        if self.cache is not None and self.cache.redis_available:
+            try:
+                return bool(
+                    self._spend(
+                        keys=[self._key],
+                        args=[self.initial_tokens, self.ttl],
+                    )
+                )
+            except redis.RedisError as e:
+                logger.error("Redis retry budget error: %s", e)
+                self.cache.record_error(e)
+
+        return self._spend_local()
+
+    async def atry_spend(self) -> bool:
+        """
+        Same as `try_spend`, for coroutines
+        """
+        if self.cache is None or not self.cache.redis_available:
+            return self._spend_local()
+        return await asyncio.to_thread(self.try_spend)
+
+    def _count_success(self) -> int:
+        """
+        Count a successful call, returning how many successes to deposit
+        in Redis now, if any
+        """
+        shared = self.cache is not None and self.cache.redis_available
+        with self._lock:
+            if not shared:
+                self._add_tokens(1)
+                return 0
+            self._successes += 1
+            if self._successes < self.deposit_every:
+                return 0
+            successes, self._successes = self._successes, 0
+            return successes
+
+    def _deposit_shared(self, successes: int):
+        try:
+            self._deposit(
+                keys=[self._key],
+                args=[
+                    self.initial_tokens,
+                    self.ttl,
+                    self.ratio * successes,
+                    self.max_tokens,
+                ],
+            )
+            return
+        except redis.RedisError as e:
+            logger.error("Redis retry budget error: %s", e)
+            self.cache.record_error(e)
+
+        with self._lock:
+            self._add_tokens(successes)
+
+    def _add_tokens(self, successes: int):
+        self._tokens = min(
+            self.max_tokens, self._tokens + self.ratio * successes
+        )
+
+    def _spend_local(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
 """
 Example usage:
 
@@ -233,4 +655,16 @@ then it will let the exception propagate after executing the function for the
 last time. Each time, it will take an exponentially longer amount of time to
 run, making the total execution time around 30s (plus some small random delay
 caused by the OS).
+
+Coroutine functions are retried the same way, sleeping with `asyncio.sleep`
+unless another `sleep_fn` is given, so other tasks keep running between
+attempts:
+
+    @retry(
+        limit=3,
+        exceptions=(StoreApiConnectionError,),
+        delay_fn=delay_exponential(0.5, 2),
+    )
+    async def get_details(name: str):
+        return await device_gateway.get_item_details(name)
 """
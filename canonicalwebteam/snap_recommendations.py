@@ -1,6 +1,10 @@
 from os import getenv
 
-from requests import Session
+from canonicalwebteam.store_api.timeouts import (
+    DEFAULT_TIMEOUT,
+    resolve_timeout,
+)
+from canonicalwebteam.store_api.transport import build_session
 
 RECOMMENDATIONS_API_URL = getenv(
     "SNAP_RECOMMENDATIONS_API_URL",
@@ -11,8 +15,11 @@ RECOMMENDATIONS_API_URL = getenv(
 class SnapRecommendations:
     """Helpers for Snap Recommendation Service."""
 
-    def __init__(self, session=Session()):
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT):
+        if session is None:
+            session = build_session([RECOMMENDATIONS_API_URL])
         self.session = session
+        self.timeout = timeout
         self.base_url = RECOMMENDATIONS_API_URL
 
     def get_endpoint_url(self, endpoint: str) -> str:
@@ -33,7 +40,7 @@ class SnapRecommendations:
         Endpoint: [GET] /categories
         """
         url = self.get_endpoint_url("categories")
-        response = self.session.get(url)
+        response = self.session.get(url, timeout=resolve_timeout(self.timeout))
         return self._process_response(response)
 
     def get_category(self, category_id: str) -> list:
@@ -43,7 +50,7 @@ class SnapRecommendations:
         Endpoint: [GET] /category/{id}
         """
         url = self.get_endpoint_url(f"category/{category_id}")
-        response = self.session.get(url)
+        response = self.session.get(url, timeout=resolve_timeout(self.timeout))
         return self._process_response(response)
 
     def get_popular(self) -> list:
@@ -66,7 +73,7 @@ class SnapRecommendations:
         Returns: { "total_tracked": n, "updated_today": n, "new_today": n }
         """
         url = self.get_endpoint_url("stats")
-        response = self.session.get(url)
+        response = self.session.get(url, timeout=resolve_timeout(self.timeout))
         return self._process_response(response)
 
     def get_recently_updated(
@@ -80,5 +87,7 @@ class SnapRecommendations:
         """
         params = {"page": page, "size": size}
         url = self.get_endpoint_url("recently-updated")
-        response = self.session.get(url, params=params, timeout=timeout)
+        response = self.session.get(
+            url, params=params, timeout=resolve_timeout(timeout)
+        )
         return self._process_response(response)
@@ -0,0 +1,137 @@
+from typing import Optional
+
+import httpx
+
+from canonicalwebteam.exceptions import (
+    StoreApiConnectionError,
+    StoreApiTimeoutError,
+)
+from canonicalwebteam.store_api.base import Base, Request
+from canonicalwebteam.store_api.circuit_breaker import CircuitBreaker
+from canonicalwebteam.store_api.coalescing import request_key
+from canonicalwebteam.store_api.hedging import HEDGED_METHODS, HedgePolicy
+from canonicalwebteam.store_api.limiter import AdaptiveLimiter
+from canonicalwebteam.store_api.rate_limiter import RateLimiter
+from canonicalwebteam.store_api.timeouts import (
+    DEFAULT_TIMEOUT,
+    resolve_timeout,
+)
+from canonicalwebteam.store_api.token_refresh import record_request
+
+# A single AsyncClient multiplexes every in-flight request over this pool,
+# so one event loop can keep hundreds of store calls going at once
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=200, max_keepalive_connections=50
+)
+
+
+class AsyncBase(Base):
+    """
+    Base class for the asyncio gateways. Responses are mapped to exceptions
+    by the same `process_response` used by the synchronous gateways.
+    """
+
+    def __init__(
+        self,
+        session: Optional[httpx.AsyncClient] = None,
+        timeout=DEFAULT_TIMEOUT,
+        coalesce=False,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        hedging: Optional[HedgePolicy] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        if session is None:
+            session = httpx.AsyncClient(limits=DEFAULT_LIMITS)
+        super().__init__(
+            session,
+            timeout,
+            coalesce,
+            circuit_breaker,
+            hedging,
+            limiter,
+            rate_limiter,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.session.aclose()
+
+    async def _arequest(
+        self, method: str, url: str, params: Optional[dict] = None, **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request through the pooled client.
+
+        requests drops query parameters set to `None` while httpx sends them
+        as empty values, so they are removed here to keep both flavours of
+        the gateways sending the same requests.
+
+        With coalescing enabled, coroutines making the same GET while one
+        is in flight await it and get the same response (or exception).
+        """
+        record_request(method)
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+
+        key = request_key(method, url, dict(kwargs, params=params))
+        if self.singleflight is None or key is None:
+            return await self._asend(method, url, params=params, **kwargs)
+
+        return await self.singleflight.ado(
+            key, lambda: self._asend(method, url, params=params, **kwargs)
+        )
+
+    async def _afetch(self, request: Request) -> httpx.Response:
+        """
+        Send a `request` built by one of the gateway's `_*_request` methods
+        """
+        method, url, kwargs = request
+        return await self._arequest(method, url, **kwargs)
+
+    async def _asend(
+        self, method: str, url: str, params: Optional[dict] = None, **kwargs
+    ) -> httpx.Response:
+        if self.hedging is None or method.upper() not in HEDGED_METHODS:
+            return await self._asend_once(method, url, params, **kwargs)
+
+        return await self.hedging.acall(
+            lambda: self._asend_once(method, url, params, **kwargs)
+        )
+
+    async def _asend_once(
+        self, method: str, url: str, params: Optional[dict] = None, **kwargs
+    ) -> httpx.Response:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire(url)
+        # After waiting for the rate limiter, which uses up the deadline
+        connect, read = resolve_timeout(self.timeout)
+        kwargs.setdefault("timeout", httpx.Timeout(read, connect=connect))
+
+        if self.circuit_breaker is None:
+            return await self._asend_request(method, url, params, **kwargs)
+
+        return await self.circuit_breaker.acall(
+            url,
+            lambda: self._asend_request(method, url, params, **kwargs),
+        )
+
+    async def _asend_request(
+        self, method: str, url: str, params: Optional[dict] = None, **kwargs
+    ) -> httpx.Response:
+        def send():
+            return self.session.request(method, url, params=params, **kwargs)
+
+        try:
+            if self.limiter is None:
+                return await send()
+            return await self.limiter.acall(url, send)
+        except httpx.TimeoutException as error:
+            raise StoreApiTimeoutError(f"Request timed out: {error}")
+        except httpx.TransportError as error:
+            raise StoreApiConnectionError(f"Request failed: {error}")
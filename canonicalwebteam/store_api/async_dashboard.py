@@ -0,0 +1,320 @@
+from typing import List, Optional
+
+from canonicalwebteam.exceptions import PublisherMacaroonRefreshRequired
+from canonicalwebteam.store_api.async_base import AsyncBase
+from canonicalwebteam.store_api.dashboard import (
+    DASHBOARD_TIMEOUT,
+    DashboardRequests,
+    build_config,
+)
+
+
+class AsyncDashboard(DashboardRequests, AsyncBase):
+    """
+    asyncio counterpart of `Dashboard`, see its methods for documentation
+    """
+
+    def __init__(
+        self,
+        session=None,
+        timeout=DASHBOARD_TIMEOUT,
+        coalesce=False,
+        circuit_breaker=None,
+        hedging=None,
+        limiter=None,
+        rate_limiter=None,
+        refresher=None,
+        refresh_coordinator=None,
+    ):
+        super().__init__(
+            session,
+            timeout,
+            coalesce,
+            circuit_breaker,
+            hedging,
+            limiter,
+            rate_limiter,
+        )
+        self.refresher = refresher
+
+        self.config = build_config()
+        self.refresh_coordinator = refresh_coordinator
+        if refresh_coordinator is not None:
+            # Refresh expired credentials and replay calls, see
+            # `RefreshCoordinator`
+            refresh_coordinator.bind(self)
+
+    async def get_macaroon(self, permissions: List[str]) -> str:
+        response = await self._afetch(self._get_macaroon_request(permissions))
+
+        return self.process_response(response)["macaroon"]
+
+    async def get_account(self, session: dict) -> dict:
+        return self.process_response(
+            await self._afetch(self._get_account_request(session))
+        )
+
+    async def get_account_keys(self, session: dict) -> list:
+        return (await self.get_account(session)).get("account-keys", [])
+
+    async def get_account_snaps(self, session: dict) -> dict:
+        return (await self.get_account(session)).get("snaps", {}).get("16", {})
+
+    async def get_agreement(self, session: dict) -> dict:
+        agreement_response = await self._afetch(
+            self._get_agreement_request(session)
+        )
+
+        if self._is_macaroon_expired(agreement_response.headers):
+            raise PublisherMacaroonRefreshRequired
+
+        return agreement_response.json()
+
+    async def post_agreement(self, session: dict, agreed: bool) -> dict:
+        return self.process_response(
+            await self._afetch(self._post_agreement_request(session, agreed))
+        )
+
+    async def post_username(self, session: dict, username: str) -> dict:
+        username_response = await self._afetch(
+            self._post_username_request(session, username)
+        )
+
+        if username_response.status_code == 204:
+            return {}
+        else:
+            return self.process_response(username_response)
+
+    async def post_register_name(
+        self,
+        session: dict,
+        snap_name: str,
+        registrant_comment: str = "",
+        is_private: str = "",
+        store: str = "",
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._post_register_name_request(
+                    session, snap_name, registrant_comment, is_private, store
+                )
+            )
+        )
+
+    async def post_register_name_dispute(
+        self, session: dict, snap_name: str, claim_comment: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._post_register_name_dispute_request(
+                    session, snap_name, claim_comment
+                )
+            )
+        )
+
+    async def get_snap_info(self, session: dict, snap_name: str) -> dict:
+        return self.process_response(
+            await self._afetch(self._get_snap_info_request(session, snap_name))
+        )
+
+    async def get_package_upload_macaroon(
+        self, session: dict, snap_name: str, channels: List[str]
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_package_upload_macaroon_request(
+                    session, snap_name, channels
+                )
+            )
+        )
+
+    async def get_snap_id(self, session: dict, snap_name: str) -> str:
+        snap_info = await self.get_snap_info(session, snap_name)
+
+        return snap_info["snap_id"]
+
+    async def snap_metadata(
+        self, session: dict, snap_id: str, json: Optional[dict] = None
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._snap_metadata_request(session, snap_id, json)
+            )
+        )
+
+    async def snap_screenshots(
+        self,
+        session,
+        snap_id,
+        data: Optional[dict] = None,
+        files: Optional[list] = None,
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._snap_screenshots_request(session, snap_id, data, files)
+            )
+        )
+
+    async def get_snap_revision(
+        self, session: dict, snap_id: str, revision_id: int
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_snap_revision_request(session, snap_id, revision_id)
+            )
+        )
+
+    async def snap_release_history(
+        self, session: dict, snap_name: str, page: int = 1
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._snap_release_history_request(session, snap_name, page)
+            )
+        )
+
+    async def snap_channel_map(self, session: dict, snap_name: str) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._snap_channel_map_request(session, snap_name)
+            )
+        )
+
+    async def post_snap_release(self, session: dict, json: dict) -> dict:
+        return self.process_response(
+            await self._afetch(self._post_snap_release_request(session, json))
+        )
+
+    async def post_close_channel(
+        self, session: dict, snap_id: str, json: dict
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._post_close_channel_request(session, snap_id, json)
+            )
+        )
+
+    async def get_publisher_metrics(self, session: dict, json: dict) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_publisher_metrics_request(session, json)
+            )
+        )
+
+    async def get_validation_sets(self, session: dict) -> dict:
+        return self.process_response(
+            await self._afetch(self._get_validation_sets_request(session))
+        )
+
+    async def get_validation_set(
+        self, session: dict, validation_set_id: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_validation_set_request(session, validation_set_id)
+            )
+        )
+
+    async def get_stores(
+        self,
+        session: dict,
+        roles: List[str] = ["admin", "review", "view", "access"],
+    ) -> List[dict]:
+        account_info = self.process_response(
+            await self._afetch(self._get_stores_request(session))
+        )
+        stores = account_info.get("stores", [])
+        user_stores = []
+
+        for store in stores:
+            if not set(roles).isdisjoint(store["roles"]):
+                user_stores.append(store)
+
+        return user_stores
+
+    async def get_store(self, session: dict, store_id: str) -> dict:
+        return self.process_response(
+            await self._afetch(self._store_request("GET", session, store_id))
+        )["store"]
+
+    async def get_store_snaps(
+        self,
+        session: dict,
+        store_id: str,
+        query: Optional[str] = None,
+        allowed_for_inclusion: Optional[str] = None,
+    ) -> List[dict]:
+        return self.process_response(
+            await self._afetch(
+                self._get_store_snaps_request(
+                    session, store_id, query, allowed_for_inclusion
+                )
+            )
+        ).get("snaps", [])
+
+    async def get_store_members(
+        self, session: dict, store_id: str
+    ) -> List[dict]:
+        return self.process_response(
+            await self._afetch(self._store_request("GET", session, store_id))
+        ).get("users", [])
+
+    async def update_store_members(
+        self, session: dict, store_id: str, members: dict
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._store_request(
+                    "POST", session, store_id, "users", members
+                )
+            )
+        )
+
+    async def invite_store_members(
+        self, session: dict, store_id: str, members: dict
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._store_request(
+                    "POST", session, store_id, "invites", members
+                )
+            )
+        )
+
+    async def change_store_settings(
+        self, session: dict, store_id: str, settings: dict
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._store_request(
+                    "PUT", session, store_id, "settings", settings
+                )
+            )
+        )
+
+    async def update_store_snaps(
+        self, session: dict, store_id: str, snaps: list
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._store_request("POST", session, store_id, "snaps", snaps)
+            )
+        )
+
+    async def update_store_invites(
+        self, session: dict, store_id: str, invites: list
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._store_request(
+                    "PUT", session, store_id, "invites", invites
+                )
+            )
+        )
+
+    async def get_store_invites(
+        self, session: dict, store_id: str
+    ) -> List[dict]:
+        return self.process_response(
+            await self._afetch(self._store_request("GET", session, store_id))
+        ).get("invites", [])
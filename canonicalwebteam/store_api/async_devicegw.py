@@ -0,0 +1,262 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Deque, Iterable, Optional
+
+from canonicalwebteam.exceptions import StoreApiError
+from canonicalwebteam.store_api.async_base import AsyncBase
+from canonicalwebteam.store_api.devicegw import (
+    BATCH_MAX_WORKERS,
+    DeviceGWRequests,
+    ItemsDetails,
+    build_config,
+    has_next_search_page,
+    last_search_page,
+    parse_refresh_results,
+    search_page_items,
+)
+from canonicalwebteam.store_api.timeouts import DEFAULT_TIMEOUT
+
+
+class AsyncDeviceGW(DeviceGWRequests, AsyncBase):
+    """
+    asyncio counterpart of `DeviceGW`, see its methods for documentation
+    """
+
+    def __init__(
+        self,
+        namespace,
+        session=None,
+        store=None,
+        staging=False,
+        timeout=DEFAULT_TIMEOUT,
+        coalesce=False,
+        circuit_breaker=None,
+        hedging=None,
+        limiter=None,
+        rate_limiter=None,
+    ):
+        super().__init__(
+            session,
+            timeout,
+            coalesce,
+            circuit_breaker,
+            hedging,
+            limiter,
+            rate_limiter,
+        )
+        self.config = build_config(namespace, store, staging)
+
+    async def search(
+        self,
+        search: str,
+        size: int = 100,
+        page: int = 1,
+        category: Optional[str] = None,
+        arch: str = "wide",
+        api_version: int = 1,
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._search_request(
+                    search, size, page, category, arch, api_version
+                )
+            )
+        )
+
+    async def iter_search(
+        self,
+        search: str = "",
+        category: Optional[str] = None,
+        size: int = 100,
+        arch: str = "wide",
+        api_version: int = 1,
+        prefetch: int = 1,
+    ) -> AsyncIterator[dict]:
+        def fetch(page):
+            return asyncio.ensure_future(
+                self.search(search, size, page, category, arch, api_version)
+            )
+
+        page, body = 1, await fetch(1)
+        pending: Deque[asyncio.Future] = deque()
+        try:
+            while True:
+                items = search_page_items(body)
+                if not items or not has_next_search_page(body, page, size):
+                    for item in items:
+                        yield item
+                    return
+
+                requested = page + len(pending)
+                last_page = last_search_page(body, page, size)
+                while len(pending) < prefetch and requested < last_page:
+                    requested += 1
+                    pending.append(fetch(requested))
+
+                for item in items:
+                    yield item
+
+                page += 1
+                body = await (pending.popleft() if pending else fetch(page))
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def find(
+        self,
+        query: str = "",
+        category: str = "",
+        architecture: str = "",
+        publisher: str = "",
+        featured: str = "",
+        fields: list = [],
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._find_request(
+                    query, category, architecture, publisher, featured, fields
+                )
+            )
+        )
+
+    async def get_all_items(self, size: int, api_version: int = 1) -> dict:
+        return self.process_response(
+            await self._afetch(self._get_all_items_request(size, api_version))
+        )
+
+    async def get_category_items(
+        self,
+        category: str,
+        size: int = 10,
+        page: int = 1,
+        api_version: int = 1,
+    ) -> dict:
+        return await self.search(
+            search="",
+            category=category,
+            size=size,
+            page=page,
+            api_version=api_version,
+        )
+
+    async def get_featured_items(
+        self, size: int = 10, page: int = 1, api_version: int = 1
+    ) -> dict:
+        return await self.search(
+            search="",
+            category="featured",
+            size=size,
+            page=page,
+            api_version=api_version,
+        )
+
+    async def get_publisher_items(
+        self,
+        publisher: str,
+        size: int = 500,
+        page: int = 1,
+        api_version: int = 1,
+    ) -> dict:
+        return await self.search(
+            search="publisher:" + publisher,
+            size=size,
+            page=page,
+            api_version=api_version,
+        )
+
+    async def get_item_details(
+        self,
+        name: str,
+        channel: Optional[str] = None,
+        fields: list = [],
+        api_version: int = 2,
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_item_details_request(
+                    name, channel, fields, api_version
+                )
+            )
+        )
+
+    async def get_items_details(
+        self,
+        names: Iterable[str],
+        fields: list = [],
+        channel: Optional[str] = None,
+        max_workers: int = BATCH_MAX_WORKERS,
+        bulk: bool = False,
+    ) -> ItemsDetails:
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+
+        if bulk:
+            body = self.process_response(
+                await self._afetch(
+                    self._get_items_details_bulk_request(
+                        names, fields, channel
+                    )
+                )
+            )
+            return parse_refresh_results(names, body)
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def get_details(name):
+            async with semaphore:
+                try:
+                    return await self.get_item_details(name, channel, fields)
+                except StoreApiError as error:
+                    return error
+
+        results = await asyncio.gather(*[get_details(n) for n in names])
+        return dict(zip(names, results))
+
+    async def get_snap_details(
+        self,
+        name: str,
+        channel: Optional[str] = None,
+        fields: list = [],
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_snap_details_request(name, channel, fields)
+            )
+        )
+
+    async def get_public_metrics(
+        self, json: dict, api_version: int = 1
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_public_metrics_request(json, api_version)
+            )
+        )
+
+    async def get_categories(
+        self, api_version: int = 2, type: str = "shared"
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(self._get_categories_request(api_version, type))
+        )
+
+    async def get_resource_revisions(
+        self, name: str, resource_name: str, api_version: int = 2
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_resource_revisions_request(
+                    name, resource_name, api_version
+                )
+            )
+        )["revisions"]
+
+    async def get_featured_snaps(
+        self, api_version: int = 1, fields: str = "snap_id", headers: dict = {}
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_featured_snaps_request(api_version, fields, headers)
+            )
+        )
@@ -0,0 +1,582 @@
+import asyncio
+from typing import Optional, Union
+
+from canonicalwebteam.store_api.async_base import AsyncBase
+from canonicalwebteam.store_api.dashboard import get_authorization_header
+from canonicalwebteam.store_api.publishergw import (
+    PublisherGWRequests,
+    build_config,
+)
+from canonicalwebteam.store_api.timeouts import DEFAULT_TIMEOUT
+
+
+class AsyncPublisherGW(PublisherGWRequests, AsyncBase):
+    """
+    asyncio counterpart of `PublisherGW`, see its methods for documentation
+    """
+
+    def __init__(
+        self,
+        name_space: str,
+        session=None,
+        timeout=DEFAULT_TIMEOUT,
+        coalesce=False,
+        circuit_breaker=None,
+        hedging=None,
+        limiter=None,
+        rate_limiter=None,
+        refresher=None,
+        refresh_coordinator=None,
+        exchange_cache=None,
+    ):
+        super().__init__(
+            session,
+            timeout,
+            coalesce,
+            circuit_breaker,
+            hedging,
+            limiter,
+            rate_limiter,
+        )
+        self.refresher = refresher
+        self.name_space = name_space
+        self.config = build_config()
+        # Shares exchanged macaroons between workers, see `ExchangeCache`
+        self.exchange_cache = exchange_cache
+        self.refresh_coordinator = refresh_coordinator
+        if refresh_coordinator is not None:
+            # Refresh expired credentials and replay calls, see
+            # `RefreshCoordinator`
+            refresh_coordinator.bind(self)
+
+    # SEARCH
+    async def find(
+        self,
+        query: str = "",
+        category: str = "",
+        publisher: str = "",
+        type: Optional[str] = None,
+        provides: list = [],
+        requires: list = [],
+        fields: list = [],
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._find_request(
+                    query,
+                    category,
+                    publisher,
+                    type,
+                    provides,
+                    requires,
+                    fields,
+                )
+            )
+        )
+
+    # CATEGORIES
+    async def get_categories(
+        self, api_version: int = 2, type: str = "shared"
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(self._get_categories_request(api_version, type))
+        )
+
+    # AUTH AND MACAROONS
+    async def get_macaroon(self) -> str:
+        response = await self._afetch(self._get_macaroon_request())
+        return self.process_response(response)["macaroon"]
+
+    async def issue_macaroon(
+        self,
+        permissions: list,
+        description: Optional[list] = None,
+        ttl: Optional[list] = None,
+    ) -> str:
+        response = await self._afetch(
+            self._issue_macaroon_request(permissions, description, ttl)
+        )
+        return self.process_response(response)["macaroon"]
+
+    async def issue_usso_macaroon(
+        self,
+        ttl: int,
+        permissions: list,
+        channels: Optional[list] = None,
+        packages: Optional[list] = None,
+    ) -> str:
+        response = await self._afetch(
+            self._issue_usso_macaroon_request(
+                ttl, permissions, channels, packages
+            )
+        )
+
+        return self.process_response(response)["macaroon"]
+
+    async def _aexchange(
+        self, endpoint: str, headers: dict, json: dict
+    ) -> str:
+        # The cache calls Redis and decrypts, keep it off the event loop
+        if self.exchange_cache is not None:
+            cached = await asyncio.to_thread(
+                self.exchange_cache.get, endpoint, headers, json
+            )
+            if cached is not None:
+                return cached
+
+        response = await self._afetch(
+            self._exchange_request(endpoint, headers, json)
+        )
+        macaroon = self.process_response(response)["macaroon"]
+
+        if self.exchange_cache is not None:
+            await asyncio.to_thread(
+                self.exchange_cache.set, endpoint, headers, json, macaroon
+            )
+        return macaroon
+
+    async def exchange_macaroons(self, issued_macaroon: str) -> str:
+        return await self._aexchange(
+            "tokens/exchange", {"Macaroons": issued_macaroon}, {}
+        )
+
+    async def exchange_usso_macaroons(
+        self,
+        root_macaroon: str,
+        discharge_macaroon: str,
+        client_description: Optional[str] = None,
+    ) -> str:
+        data = {}
+        if client_description is not None:
+            data["client-description"] = client_description
+
+        return await self._aexchange(
+            "tokens/usso/exchange",
+            self._usso_authorization_header(root_macaroon, discharge_macaroon),
+            data,
+        )
+
+    async def exchange_dashboard_macaroons(self, session: dict) -> str:
+        return await self._aexchange(
+            "tokens/dashboard/exchange",
+            get_authorization_header(session, self.refresher),
+            {},
+        )
+
+    async def macaroon_info(self, publisher_auth: str) -> dict:
+        return self.process_response(
+            await self._afetch(self._macaroon_info_request(publisher_auth))
+        )
+
+    # PACKAGES MANAGEMENT
+    async def get_account_packages(
+        self,
+        publisher_auth: str,
+        package_type: str,
+        include_collaborations: bool = False,
+        status: Optional[str] = None,
+    ):
+        response = await self._afetch(
+            self._get_account_packages_request(
+                publisher_auth, package_type, include_collaborations
+            )
+        )
+        packages = self.process_response(response)["results"]
+
+        if status:
+            packages = [p for p in packages if p["status"] == status]
+
+        return packages
+
+    async def get_package_metadata(
+        self, session: dict, package_name: str
+    ) -> dict:
+        processed_response = self.process_response(
+            await self._afetch(
+                self._get_package_metadata_request(session, package_name)
+            )
+        )
+
+        if "metadata" not in processed_response:
+            return processed_response
+
+        return processed_response["metadata"]
+
+    async def update_package_metadata(
+        self, publisher_auth: str, package_type: str, name: str, data: dict
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._update_package_metadata_request(
+                    publisher_auth, package_type, name, data
+                )
+            )
+        )["metadata"]
+
+    async def register_package_name(
+        self, publisher_auth: str, data: dict
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._register_package_name_request(publisher_auth, data)
+            )
+        )
+
+    async def unregister_package_name(
+        self, publisher_auth: Union[str, dict], package_name: str
+    ):
+        return await self._afetch(
+            self._unregister_package_name_request(publisher_auth, package_name)
+        )
+
+    async def get_charm_libraries(self, package_name: str) -> dict:
+        return self.process_response(
+            await self._afetch(self._get_charm_libraries_request(package_name))
+        )
+
+    async def get_charm_library(
+        self,
+        charm_name: str,
+        library_id: str,
+        api_version: Optional[int] = None,
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_charm_library_request(
+                    charm_name, library_id, api_version
+                )
+            )
+        )
+
+    async def get_releases(
+        self, publisher_auth: str, package_name: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_releases_request(publisher_auth, package_name)
+            )
+        )
+
+    async def get_item_details(
+        self,
+        name: str,
+        channel: Optional[str] = None,
+        fields: list = [],
+        api_version: int = 2,
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_item_details_request(
+                    name, channel, fields, api_version
+                )
+            )
+        )
+
+    # COLLABORATORS
+    async def get_collaborators(
+        self, publisher_auth: str, package_name: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._collaborators_request(
+                    "GET", publisher_auth, package_name
+                )
+            )
+        )
+
+    async def get_pending_invites(
+        self, publisher_auth: str, package_name: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._collaborators_request(
+                    "GET", publisher_auth, package_name, "invites"
+                )
+            )
+        )
+
+    async def invite_collaborators(
+        self, publisher_auth: str, package_name: str, emails: list
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._invites_request(publisher_auth, package_name, emails)
+            )
+        )
+
+    async def revoke_invites(
+        self, publisher_auth: str, package_name: str, emails: list
+    ):
+        return await self._afetch(
+            self._invites_request(
+                publisher_auth, package_name, emails, "revoke"
+            )
+        )
+
+    async def accept_invite(
+        self, publisher_auth: str, package_name: str, token: str
+    ):
+        response = await self._afetch(
+            self._collaborators_request(
+                "POST",
+                publisher_auth,
+                package_name,
+                "invites/accept",
+                json={"token": token},
+            )
+        )
+        if response.is_error:
+            self.process_response(response)
+        return response
+
+    async def reject_invite(
+        self, publisher_auth: str, package_name: str, token: str
+    ):
+        return await self._afetch(
+            self._reject_invite_request(publisher_auth, package_name, token)
+        )
+
+    # TRACKS
+    async def create_track(
+        self,
+        session: dict,
+        package_name: str,
+        track_name: str,
+        version_pattern: Optional[str] = None,
+        auto_phasing_percentage: Optional[str] = None,
+    ):
+        return await self._afetch(
+            self._create_track_request(
+                session,
+                package_name,
+                track_name,
+                version_pattern,
+                auto_phasing_percentage,
+            )
+        )
+
+    # MODEL SERVICE ADMIN
+    async def get_store_models(self, session: dict, store_id: str) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request("GET", session, store_id, "model")
+            )
+        )
+
+    async def create_store_model(
+        self,
+        session: dict,
+        store_id: str,
+        name: str,
+        api_key: Optional[str] = None,
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._create_store_model_request(
+                    session, store_id, name, api_key
+                )
+            )
+        )
+
+    async def update_store_model(
+        self, session: dict, store_id: str, model_name: str, api_key: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request(
+                    "PATCH",
+                    session,
+                    store_id,
+                    f"model/{model_name}",
+                    json={"api-key": api_key},
+                )
+            )
+        )
+
+    async def get_store_model_serial_logs(
+        self, session: dict, store_id: str, model_name: str, params: dict
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_store_model_serial_logs_request(
+                    session, store_id, model_name, params
+                )
+            )
+        )
+
+    async def get_store_model_serial_log(
+        self,
+        session: dict,
+        store_id: str,
+        model_name: str,
+        serial: str,
+        include_serial_assertion=None,
+        include_serial_request_assertion=None,
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_store_model_serial_log_request(
+                    session,
+                    store_id,
+                    model_name,
+                    serial,
+                    include_serial_assertion,
+                    include_serial_request_assertion,
+                )
+            )
+        )
+
+    async def get_store_model_policies(
+        self, session: dict, store_id: str, model_name: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request(
+                    "GET",
+                    session,
+                    store_id,
+                    f"model/{model_name}/serial_policy",
+                )
+            )
+        )
+
+    async def create_store_model_policy(
+        self,
+        session: dict,
+        store_id: str,
+        model_name: str,
+        signing_key: str,
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request(
+                    "POST",
+                    session,
+                    store_id,
+                    f"model/{model_name}/serial_policy",
+                    json={"signing-key-sha3-384": signing_key},
+                )
+            )
+        )
+
+    async def delete_store_model_policy(
+        self,
+        session: dict,
+        store_id: str,
+        model_name: str,
+        rev: str,
+    ):
+        return await self._afetch(
+            self._brand_request(
+                "DELETE",
+                session,
+                store_id,
+                f"model/{model_name}/serial_policy/{rev}",
+            )
+        )
+
+    async def get_store_signing_keys(
+        self, session: dict, store_id: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request("GET", session, store_id, "signing_key")
+            )
+        )
+
+    async def create_store_signing_key(
+        self, session: dict, store_id: str, name: str
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request(
+                    "POST",
+                    session,
+                    store_id,
+                    "signing_key",
+                    json={"name": name},
+                )
+            )
+        )
+
+    async def delete_store_signing_key(
+        self, session: dict, store_id: str, signing_key_sha3_384: str
+    ):
+        return await self._afetch(
+            self._brand_request(
+                "DELETE",
+                session,
+                store_id,
+                f"signing_key/{signing_key_sha3_384}",
+            )
+        )
+
+    async def get_remodel_allowlist(
+        self, session: dict, store_id: str, params: dict
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._get_remodel_allowlist_request(session, store_id, params)
+            )
+        )
+
+    async def create_remodel_allowlist(
+        self, session: dict, store_id: str, allowlist: list[dict]
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request(
+                    "POST",
+                    session,
+                    store_id,
+                    "remodel-allowlist",
+                    json={"allowlist": allowlist},
+                )
+            )
+        )
+
+    async def update_remodel_allowlist(
+        self, session: dict, store_id: str, allowlist: list[dict]
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request(
+                    "PATCH",
+                    session,
+                    store_id,
+                    "remodel-allowlist",
+                    json={"allowlist": allowlist},
+                )
+            )
+        )
+
+    async def delete_remodel_allowlist(
+        self, session: dict, store_id: str, allowlist: list[dict]
+    ) -> dict:
+        return self.process_response(
+            await self._afetch(
+                self._brand_request(
+                    "POST",
+                    session,
+                    store_id,
+                    "remodel-allowlist/delete",
+                    json={"allowlist": allowlist},
+                )
+            )
+        )
+
+    async def get_brand(self, session: dict, store_id: str) -> dict:
+        return self.process_response(
+            await self._afetch(self._brand_request("GET", session, store_id))
+        )
+
+    # FEATURED SNAP AUTOMATION
+    async def delete_featured_snaps(self, publisher_auth: str, packages: str):
+        return await self._afetch(
+            self._featured_snaps_request("DELETE", publisher_auth, packages)
+        )
+
+    async def update_featured_snaps(self, publisher_auth: str, snaps: list):
+        return await self._afetch(
+            self._featured_snaps_request("PUT", publisher_auth, snaps)
+        )
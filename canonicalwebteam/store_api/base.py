@@ -1,4 +1,9 @@
 import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+
+from requests.exceptions import ConnectionError, Timeout
 
 from canonicalwebteam.exceptions import (
     PublisherAgreementNotSigned,
@@ -14,10 +19,27 @@ from canonicalwebteam.exceptions import (
     StoreApiResponseError,
     StoreApiResponseErrorList,
     StoreApiServiceUnavailableError,
+    StoreApiTimeoutError,
+    StoreApiTooManyRequestsError,
+)
+from canonicalwebteam.store_api.circuit_breaker import CircuitBreaker
+from canonicalwebteam.store_api.coalescing import SingleFlight, request_key
+from canonicalwebteam.store_api.hedging import HEDGED_METHODS, HedgePolicy
+from canonicalwebteam.store_api.limiter import AdaptiveLimiter
+from canonicalwebteam.store_api.rate_limiter import RateLimiter
+from canonicalwebteam.store_api.timeouts import (
+    DEFAULT_TIMEOUT,
+    resolve_timeout,
 )
+from canonicalwebteam.store_api.token_refresh import record_request
+from canonicalwebteam.store_api.transport import pool_stats
 
 logger = logging.getLogger(__name__)
 
+# A request ready to be sent: its method, URL and the keyword arguments
+# passed on to the session
+Request = Tuple[str, str, dict]
+
 
 def _sanitize_dict(dictionary):
     result = {}
@@ -30,7 +52,15 @@ def _sanitize_dict(dictionary):
 
 
 def _get_request_body(request) -> str:
-    body = request.body
+    if hasattr(request, "body"):
+        body = request.body
+    else:
+        # httpx requests keep the payload in `content`, which can't be read
+        # back when the body was streamed (e.g. multipart uploads)
+        try:
+            body = request.content
+        except RuntimeError:
+            body = None
     if isinstance(body, (bytes, bytearray)):
         # try to decode utf-8
         try:
@@ -45,11 +75,34 @@ def _get_request_body(request) -> str:
     return body
 
 
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Return the number of seconds to wait from a Retry-After header, which
+    is either a number of seconds or an HTTP date. Invalid values return
+    `None`.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
 def _loggable_request(request):
     return {
         "url": request.url,
         "headers": _sanitize_dict(request.headers),
-        "cookies": _sanitize_dict(request._cookies),
+        "cookies": _sanitize_dict(getattr(request, "_cookies", {})),
         "body": _get_request_body(request),
     }
 
@@ -65,8 +118,149 @@ def _loggable_response(response):
 
 
 class Base:
-    def __init__(self, session):
+    def __init__(
+        self,
+        session,
+        timeout=DEFAULT_TIMEOUT,
+        coalesce=False,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        hedging: Optional[HedgePolicy] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         self.session = session
+        # (connect, read) seconds, see `timeouts.store_timeout` to override
+        # it for some calls and `timeouts.store_deadline` to bound the total
+        self.timeout = timeout
+        # When enabled, concurrent identical GETs share one request
+        self.singleflight = SingleFlight() if coalesce else None
+        self.circuit_breaker = circuit_breaker
+        # When set, slow GETs are sent a second time, see `HedgePolicy`
+        self.hedging = hedging
+        # When set, requests in flight to each host are capped adaptively
+        self.limiter = limiter
+        # When set, the request rate to each endpoint group is capped, see
+        # `RateLimiter`
+        self.rate_limiter = rate_limiter
+
+    def pool_stats(self) -> dict:
+        """
+        Return the connection pool usage of this gateway's session, keyed
+        by URL prefix. Only sessions created with
+        `transport.build_session` (the default) report stats.
+        """
+        return pool_stats(self.session)
+
+    def coalesce_stats(self) -> dict:
+        """
+        Return the request coalescing counters of this gateway, empty when
+        it was created without `coalesce=True`.
+        """
+        if self.singleflight is None:
+            return {}
+        return self.singleflight.stats()
+
+    def circuit_stats(self) -> dict:
+        """
+        Return the state of the circuit of each endpoint group this gateway
+        called, empty when it has no circuit breaker.
+        """
+        if self.circuit_breaker is None:
+            return {}
+        return self.circuit_breaker.stats()
+
+    def hedge_stats(self) -> dict:
+        """
+        Return the hedging counters of this gateway, empty when it has no
+        hedging policy.
+        """
+        if self.hedging is None:
+            return {}
+        return self.hedging.stats()
+
+    def limiter_stats(self) -> dict:
+        """
+        Return the concurrency limit and usage of each host this gateway
+        called, empty when it has no limiter.
+        """
+        if self.limiter is None:
+            return {}
+        return self.limiter.stats()
+
+    def rate_limit_stats(self) -> dict:
+        """
+        Return how many requests to each endpoint group were sent right
+        away, sent after waiting or rejected by the rate limiter, empty when
+        the gateway has none.
+        """
+        if self.rate_limiter is None:
+            return {}
+        return self.rate_limiter.stats()
+
+    def _request(self, method: str, url: str, **kwargs):
+        """
+        Send a request through the session, using the gateway's timeout
+        shortened to fit in what is left of the current `store_deadline`
+        once the request is ready to be sent.
+
+        With coalescing enabled, callers making the same GET while one is
+        in flight wait for it and get the same response (or exception).
+        With a circuit breaker, requests to an endpoint group whose circuit
+        is open raise StoreApiCircuitBreaker without being sent. With
+        hedging, a GET that is slower than usual is sent a second time and
+        the first response is used. With a limiter, requests wait for a
+        slot under the host's concurrency limit, or raise
+        StoreApiConcurrencyLimitError. With a rate limiter, requests wait
+        for their endpoint group's rate, or raise StoreApiRateLimitError.
+        """
+        record_request(method)
+
+        key = request_key(method, url, kwargs)
+        if self.singleflight is None or key is None:
+            return self._send(method, url, **kwargs)
+
+        return self.singleflight.do(
+            key, lambda: self._send(method, url, **kwargs)
+        )
+
+    def _fetch(self, request: Request):
+        """
+        Send a `request` built by one of the gateway's `_*_request` methods
+        """
+        method, url, kwargs = request
+        return self._request(method, url, **kwargs)
+
+    def _send(self, method: str, url: str, **kwargs):
+        if self.hedging is None or method.upper() not in HEDGED_METHODS:
+            return self._send_once(method, url, **kwargs)
+
+        return self.hedging.call(
+            lambda: self._send_once(method, url, **kwargs)
+        )
+
+    def _send_once(self, method: str, url: str, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(url)
+        # After waiting for the rate limiter, which uses up the deadline
+        kwargs.setdefault("timeout", resolve_timeout(self.timeout))
+
+        if self.circuit_breaker is None:
+            return self._send_request(method, url, **kwargs)
+
+        return self.circuit_breaker.call(
+            url, lambda: self._send_request(method, url, **kwargs)
+        )
+
+    def _send_request(self, method: str, url: str, **kwargs):
+        send = getattr(self.session, method.lower())
+        try:
+            if self.limiter is None:
+                return send(url=url, **kwargs)
+            return self.limiter.call(url, lambda: send(url=url, **kwargs))
+        except Timeout as error:
+            raise StoreApiTimeoutError(f"Request timed out: {error}")
+        except ConnectionError as error:
+            raise StoreApiConnectionError(f"Request failed: {error}")
 
     def log_detailed_error(self, response):
         logger.error(
@@ -90,7 +284,12 @@ class Base:
             elif response.status_code == 502:
                 raise StoreApiBadGatewayError("Invalid response from upstream")
             elif response.status_code == 503:
-                raise StoreApiServiceUnavailableError("Service is unavailable")
+                raise StoreApiServiceUnavailableError(
+                    "Service is unavailable",
+                    retry_after=parse_retry_after(
+                        response.headers.get("Retry-After")
+                    ),
+                )
             elif response.status_code == 504:
                 raise StoreApiGatewayTimeoutError("Upstream request timed out")
             else:
@@ -98,6 +297,16 @@ class Base:
                     f"Service unavailable, code {response.status_code}"
                 )
 
+        if response.status_code == 429:
+            self.log_detailed_error(response)
+            raise StoreApiTooManyRequestsError(
+                "Too many requests",
+                retry_after=parse_retry_after(
+                    response.headers.get("Retry-After")
+                ),
+                errors=self._rate_limit_errors(response),
+            )
+
         try:
             body = response.json()
         except ValueError as decode_error:
@@ -113,7 +322,7 @@ class Base:
             logger.error("Publisher macaroon refresh required")
             raise PublisherMacaroonRefreshRequired
 
-        if not response.ok:
+        if response.status_code >= 400:
             if self._requires_macaroon_reauth(response, body):
                 logger.error("Publisher macaroon reauthentication required")
                 raise PublisherMacaroonRefreshRequired
@@ -160,6 +369,19 @@ class Base:
 
         return body
 
+    def _rate_limit_errors(self, response):
+        """
+        Returns the error list of a 429 response, which may not have a
+        JSON body
+        """
+        try:
+            body = response.json()
+        except ValueError:
+            return []
+        if not isinstance(body, dict):
+            return []
+        return body.get("error_list") or body.get("error-list") or []
+
     def _is_macaroon_expired(self, headers):
         """
         Returns True if the macaroon needs to be refreshed from
@@ -0,0 +1,72 @@
+import hmac
+import json
+from hashlib import blake2b, sha256
+from os import getenv
+from typing import Any, Union
+
+from canonicalwebteam.lazy_imports import lazy_module
+
+nacl_encoding = lazy_module("nacl.encoding")
+nacl_exceptions = lazy_module("nacl.exceptions")
+nacl_secret = lazy_module("nacl.secret")
+
+# Secret protecting the credentials shared between workers through Redis
+CACHE_KEY = getenv("STORE_API_CACHE_KEY")
+
+
+class CacheCipher:
+    """
+    Protect credentials kept in a cache shared with other workers: keys are
+    hashed with an HMAC and values encrypted with NaCl's SecretBox, with
+    keys derived from `secret` and `name`, so that users of the same secret
+    can't read each other's entries.
+    """
+
+    def __init__(self, secret: Union[str, bytes], name: str):
+        if isinstance(secret, str):
+            secret = secret.encode()
+        # blake2b personalization strings are at most 16 bytes
+        self._hash_key = blake2b(
+            secret, digest_size=32, person=f"{name}-hash".encode()
+        ).digest()
+        try:
+            self._box = nacl_secret.SecretBox(
+                blake2b(
+                    secret, digest_size=32, person=f"{name}-box".encode()
+                ).digest()
+            )
+        except ImportError as e:
+            raise ImportError(
+                "Encrypting cached credentials needs PyNaCl, install it "
+                "with `pip install pynacl`"
+            ) from e
+
+    def hash(self, data: str) -> str:
+        """
+        Return the HMAC of `data`, to be used in cache keys
+        """
+        return hmac.new(self._hash_key, data.encode(), sha256).hexdigest()
+
+    def encrypt(self, value: Any) -> str:
+        """
+        Return `value`, serialized to JSON and encrypted
+        """
+        return self._box.encrypt(
+            json.dumps(value).encode(),
+            encoder=nacl_encoding.URLSafeBase64Encoder,
+        ).decode()
+
+    def decrypt(self, encrypted: str) -> Any:
+        """
+        Return the value encrypted by `encrypt`. Raises ValueError when it
+        can't be decrypted, e.g. after the secret changed.
+        """
+        try:
+            return json.loads(
+                self._box.decrypt(
+                    encrypted.encode(),
+                    encoder=nacl_encoding.URLSafeBase64Encoder,
+                )
+            )
+        except nacl_exceptions.CryptoError as e:
+            raise ValueError(f"Could not decrypt: {e}") from e
@@ -0,0 +1,354 @@
+import asyncio
+import logging
+import re
+import threading
+from collections import deque
+from math import ceil
+from time import monotonic, time
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+from canonicalwebteam.exceptions import (
+    StoreApiCircuitBreaker,
+    StoreApiConcurrencyLimitError,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Path segments naming a resource rather than an endpoint: revisions and
+# other numbers, snap IDs and hashes
+_IDENTIFIER = re.compile(r"^(\d+|[A-Za-z0-9]{32,})$")
+# Publisher gateway paths are /v1/<namespace>/<package name>/... and
+# /v1/brand/<store ID>/...
+_PUBLISHER_COLLECTIONS = ("charm", "snap", "bundle", "rock", "brand")
+_PUBLISHER_ENDPOINTS = ("libraries",)
+
+
+def endpoint_group(url: str) -> str:
+    """
+    Return the group a URL belongs to: its host and the first three path
+    segments, e.g. "api.snapcraft.io/v2/snaps/info". Segments naming a
+    package, store, revision or ID are replaced by a placeholder, e.g.
+    "api.charmhub.io/v1/charm/{name}", so that the number of groups stays
+    bounded. Endpoints in the same group share a circuit.
+    """
+    parts = urlsplit(url)
+    segments = [
+        "{id}" if _IDENTIFIER.match(segment) else segment
+        for segment in parts.path.split("/")
+        if segment
+    ][:3]
+    if (
+        len(segments) == 3
+        and segments[0] == "v1"
+        and segments[1] in _PUBLISHER_COLLECTIONS
+        and segments[2] not in _PUBLISHER_ENDPOINTS
+    ):
+        segments[2] = "{name}"
+    return "/".join([parts.netloc, *segments])
+
+
+class _Circuit:
+    def __init__(self, window_size: int):
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        # (failed, slow) outcome of the last `window_size` calls
+        self.outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self.open_until = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        self.next_sync = 0.0
+
+    def rates(self) -> Tuple[float, float]:
+        if not self.outcomes:
+            return 0.0, 0.0
+        failed = sum(1 for f, _ in self.outcomes if f)
+        slow = sum(1 for _, s in self.outcomes if s)
+        return failed / len(self.outcomes), slow / len(self.outcomes)
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to an endpoint group that keeps failing, so that
+    callers fail fast with StoreApiCircuitBreaker instead of waiting on a
+    degraded upstream.
+
+    Each endpoint group (see `endpoint_group`) has its own circuit:
+    - closed: calls go through and their outcome is recorded. Once
+      `minimum_calls` are recorded, the circuit opens when the share of
+      failed calls (connection errors, timeouts and 5xx responses) or of
+      calls slower than `slow_call_duration` in the last `window_size`
+      calls reaches its threshold.
+    - open: calls fail immediately for `open_duration` seconds.
+    - half-open: up to `half_open_calls` probe calls go through, others
+      fail immediately. The circuit closes once they all succeed and
+      opens again on the first failure.
+
+    Calls shed by an `AdaptiveLimiter` were never sent and aren't counted.
+
+    When a `RedisCache` is given, opening a circuit is shared with every
+    process using the same cache, which check it every `sync_interval`
+    seconds. Outcomes are still counted per process. Redis is never called
+    while holding a circuit's lock, nor from the event loop in `acall`.
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 1.0,
+        slow_call_duration: float = 10.0,
+        window_size: int = 20,
+        minimum_calls: int = 10,
+        open_duration: float = 30.0,
+        half_open_calls: int = 3,
+        cache=None,
+        sync_interval: float = 1.0,
+        group_fn: Callable[[str], str] = endpoint_group,
+    ):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self.cache = cache
+        self.sync_interval = sync_interval
+        self.group_fn = group_fn
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def _circuit(self, group: str) -> _Circuit:
+        with self._lock:
+            circuit = self._circuits.get(group)
+            if circuit is None:
+                circuit = self._circuits[group] = _Circuit(self.window_size)
+            return circuit
+
+    def _cache_key(self, group: str):
+        return ("circuit-breaker", {"group": group})
+
+    def _sync_due(self, group: str) -> bool:
+        """
+        Whether a closed circuit should check if another process opened
+        it, at most every `sync_interval` seconds
+        """
+        if self.cache is None:
+            return False
+        circuit = self._circuit(group)
+        with circuit.lock:
+            if circuit.state != CLOSED:
+                return False
+            now = monotonic()
+            if now < circuit.next_sync:
+                return False
+            circuit.next_sync = now + self.sync_interval
+            return True
+
+    def _shared_open_until(self, group: str) -> Optional[float]:
+        """
+        Return until when another process opened the circuit, as a
+        timestamp
+        """
+        open_until = self.cache.get(self._cache_key(group))
+        return float(open_until) if open_until else None
+
+    def _share(self, group: str, open_until: Optional[float]):
+        """
+        Tell other processes that the circuit is open until `open_until`,
+        or closed
+        """
+        if open_until is None:
+            self.cache.delete(self._cache_key(group))
+        else:
+            self.cache.set(
+                self._cache_key(group),
+                str(open_until),
+                ttl=ceil(self.open_duration),
+            )
+
+    def _open(self, group: str, circuit: _Circuit) -> Tuple[bool, float]:
+        logger.warning("Circuit breaker opened for %s", group)
+        circuit.state = OPEN
+        circuit.open_until = monotonic() + self.open_duration
+        circuit.outcomes.clear()
+        return True, time() + self.open_duration
+
+    def _close(self, group: str, circuit: _Circuit) -> Tuple[bool, None]:
+        logger.info("Circuit breaker closed for %s", group)
+        circuit.state = CLOSED
+        circuit.outcomes.clear()
+        return True, None
+
+    def before_call(self, url: str) -> str:
+        """
+        Return the group of `url` if a call to it can go through.
+
+        Raises:
+            StoreApiCircuitBreaker: if the group's circuit is open, or
+                half-open with all its probe calls in flight
+        """
+        group = self.group_fn(url)
+        open_until = None
+        if self._sync_due(group):
+            open_until = self._shared_open_until(group)
+        self._admit(group, open_until)
+        return group
+
+    async def _abefore_call(self, url: str) -> str:
+        group = self.group_fn(url)
+        open_until = None
+        if self._sync_due(group):
+            open_until = await asyncio.to_thread(
+                self._shared_open_until, group
+            )
+        self._admit(group, open_until)
+        return group
+
+    def _admit(self, group: str, shared_open_until: Optional[float]):
+        circuit = self._circuit(group)
+        with circuit.lock:
+            if (
+                shared_open_until is not None
+                and shared_open_until > time()
+                and circuit.state == CLOSED
+            ):
+                circuit.state = OPEN
+                circuit.open_until = monotonic() + shared_open_until - time()
+
+            if circuit.state == OPEN and monotonic() >= circuit.open_until:
+                circuit.state = HALF_OPEN
+                circuit.probes = circuit.probe_successes = 0
+
+            if circuit.state == OPEN or (
+                circuit.state == HALF_OPEN
+                and circuit.probes >= self.half_open_calls
+            ):
+                circuit.rejected += 1
+                raise StoreApiCircuitBreaker(f"Circuit open for {group}")
+
+            if circuit.state == HALF_OPEN:
+                circuit.probes += 1
+
+    def _record(
+        self, group: str, duration: float, failed: bool
+    ) -> Tuple[bool, Optional[float]]:
+        """
+        Record the outcome of a call, returning whether the circuit opened
+        or closed, and until when it is open
+        """
+        slow = duration >= self.slow_call_duration
+        circuit = self._circuit(group)
+        with circuit.lock:
+            if circuit.state == HALF_OPEN:
+                if failed or slow:
+                    return self._open(group, circuit)
+                circuit.probe_successes += 1
+                if circuit.probe_successes >= self.half_open_calls:
+                    return self._close(group, circuit)
+                return False, None
+
+            if circuit.state == OPEN:
+                # Started before the circuit opened
+                return False, None
+
+            circuit.outcomes.append((failed, slow))
+            if len(circuit.outcomes) < self.minimum_calls:
+                return False, None
+            failure_rate, slow_rate = circuit.rates()
+            if (
+                failure_rate >= self.failure_rate_threshold
+                or slow_rate >= self.slow_call_rate_threshold
+            ):
+                return self._open(group, circuit)
+            return False, None
+
+    def after_call(self, group: str, duration: float, failed: bool):
+        """
+        Record the outcome of a call allowed by `before_call`
+        """
+        changed, open_until = self._record(group, duration, failed)
+        if changed and self.cache is not None:
+            self._share(group, open_until)
+
+    async def _aafter_call(self, group: str, duration: float, failed: bool):
+        changed, open_until = self._record(group, duration, failed)
+        if changed and self.cache is not None:
+            await asyncio.to_thread(self._share, group, open_until)
+
+    def _release(self, group: str):
+        circuit = self._circuit(group)
+        with circuit.lock:
+            if circuit.state == HALF_OPEN and circuit.probes:
+                circuit.probes -= 1
+
+    def call(self, url: str, fn: Callable[[], T]) -> T:
+        """
+        Call `fn`, which sends a request to `url`, through the circuit
+        """
+        group = self.before_call(url)
+        started = monotonic()
+        try:
+            response = fn()
+        except StoreApiConcurrencyLimitError:
+            # Shed by the limiter without being sent
+            self._release(group)
+            raise
+        except Exception:
+            self.after_call(group, monotonic() - started, failed=True)
+            raise
+        self.after_call(
+            group,
+            monotonic() - started,
+            failed=getattr(response, "status_code", 0) >= 500,
+        )
+        return response
+
+    async def acall(self, url: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        asyncio counterpart of `call`
+        """
+        group = await self._abefore_call(url)
+        started = monotonic()
+        try:
+            response = await fn()
+        except (asyncio.CancelledError, StoreApiConcurrencyLimitError):
+            # A cancelled or shed call says nothing about the upstream
+            self._release(group)
+            raise
+        except Exception:
+            await self._aafter_call(group, monotonic() - started, failed=True)
+            raise
+        await self._aafter_call(
+            group,
+            monotonic() - started,
+            failed=getattr(response, "status_code", 0) >= 500,
+        )
+        return response
+
+    def stats(self) -> dict:
+        """
+        Return the state of each endpoint group's circuit
+        """
+        with self._lock:
+            circuits = dict(self._circuits)
+
+        stats = {}
+        for group, circuit in circuits.items():
+            with circuit.lock:
+                failure_rate, slow_rate = circuit.rates()
+                stats[group] = {
+                    "state": circuit.state,
+                    "calls": len(circuit.outcomes),
+                    "failure_rate": failure_rate,
+                    "slow_call_rate": slow_rate,
+                    "rejected": circuit.rejected,
+                }
+        return stats
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Only reads are safe to share between callers
+COALESCED_METHODS = ("GET", "HEAD")
+
+
+def _freeze(mapping) -> tuple:
+    if not mapping:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in mapping.items()))
+
+
+def request_key(method: str, url: str, kwargs: dict) -> Optional[tuple]:
+    """
+    Return the key identifying a request for coalescing, or `None` when
+    the request must not be shared with other callers.
+
+    The key is made of the method, URL, query parameters and the headers
+    passed for this request (auth, store and series headers all change the
+    response). Requests with a body are never coalesced.
+    """
+    if method.upper() not in COALESCED_METHODS:
+        return None
+    if set(kwargs) - {"params", "headers", "timeout"}:
+        return None
+    return (
+        method.upper(),
+        url,
+        _freeze(kwargs.get("params")),
+        _freeze(kwargs.get("headers")),
+    )
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls sharing the same key into a single call,
+    whose result (or exception) is handed to every caller.
+
+    `do` coalesces calls made from threads and `ado` calls made from
+    coroutines. A call is only shared while it is in flight, nothing is
+    cached once it completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._total = 0
+        self._coalesced = 0
+
+    def _count(self, coalesced: bool):
+        with self._lock:
+            self._total += 1
+            if coalesced:
+                self._coalesced += 1
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            self._total += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        # A shared call belongs to the event loop that started it
+        key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(key)
+        self._count(coalesced=task is not None)
+
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # Cancelling one caller must not cancel the request for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        self._tasks.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller was
+            # cancelled before the request failed
+            task.exception()
+
+    def stats(self) -> dict:
+        """
+        Return how many calls went through this SingleFlight, how many of
+        them were collapsed into another in-flight call, and how many
+        calls are in flight right now.
+        """
+        with self._lock:
+            return {
+                "calls": self._total,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
@@ -1,9 +1,13 @@
 from os import getenv
-from requests import Session
-from pymacaroons import Macaroon
 from typing import Optional, List
 
-from canonicalwebteam.store_api.base import Base
+from canonicalwebteam.store_api.base import Base, Request
+from canonicalwebteam.store_api.macaroons import (
+    MacaroonRefresher,
+    bound_macaroons,
+    check_macaroons,
+)
+from canonicalwebteam.store_api.transport import build_session
 from canonicalwebteam.exceptions import (
     PublisherMacaroonRefreshRequired,
 )
@@ -11,16 +15,52 @@ from canonicalwebteam.exceptions import (
 DASHBOARD_API_URL = getenv(
     "SNAPSTORE_DASHBOARD_API_URL", "https://dashboard.snapcraft.io/"
 )
+# screenshots and other binary metadata are uploaded through the dashboard,
+# so reads are given longer than on the other gateways
+DASHBOARD_TIMEOUT = (3.05, 30.0)
 
 
-class Dashboard(Base):
-    def __init__(self, session=Session()):
-        super().__init__(session)
+def get_authorization_header(session: dict, refresher=None) -> dict:
+    """
+    Bind root and discharge macaroons and return the authorization header
+    expected by dashboard.snapcraft.io. Bound macaroons are cached, see
+    `macaroons.BoundMacaroonCache`.
 
-        self.config = {
-            1: {"base_url": f"{DASHBOARD_API_URL}dev/api/"},
-            2: {"base_url": f"{DASHBOARD_API_URL}api/v2/"},
-        }
+    Raises PublisherMacaroonRefreshRequired if the macaroons have expired,
+    and asks `refresher` to renew them when they expire soon, see
+    `macaroons.check_macaroons`.
+    """
+    if "macaroon_root" in session:
+        root = session["macaroon_root"]
+        discharge = session["macaroon_discharge"]
+        check_macaroons([root, discharge], session, refresher)
+
+        bound = bound_macaroons.bind(root, discharge)
+
+        return {"Authorization": f"macaroon root={root}, discharge={bound}"}
+    elif "macaroons" in session:
+        return {"Macaroons": session["macaroons"]}
+    return {"Macaroons": ""}
+
+
+def build_config() -> dict:
+    """
+    Return the per API version base URLs of the dashboard
+    """
+    return {
+        1: {"base_url": f"{DASHBOARD_API_URL}dev/api/"},
+        2: {"base_url": f"{DASHBOARD_API_URL}api/v2/"},
+    }
+
+
+class DashboardRequests:
+    """
+    Build the requests sent by `Dashboard` and `AsyncDashboard`, which only
+    differ in how they send them
+    """
+
+    config: dict
+    refresher: Optional[MacaroonRefresher]
 
     def get_endpoint_url(
         self, endpoint: str, api_version: int = 1, is_store: bool = False
@@ -35,22 +75,309 @@ class Dashboard(Base):
         """
         Bind root and discharge macaroons and return the authorization header.
         """
-        if "macaroon_root" in session:
-            root = session["macaroon_root"]
-            discharge = session["macaroon_discharge"]
+        return get_authorization_header(session, self.refresher)
 
-            bound = (
-                Macaroon.deserialize(root)
-                .prepare_for_request(Macaroon.deserialize(discharge))
-                .serialize()
-            )
+    def _get_macaroon_request(self, permissions: List[str]) -> Request:
+        return (
+            "POST",
+            self.get_endpoint_url("tokens", 2),
+            {"json": {"permissions": permissions}},
+        )
+
+    def _get_account_request(self, session: dict) -> Request:
+        headers = self._get_authorization_header(session)
+        return "GET", self.get_endpoint_url("account"), {"headers": headers}
+
+    def _get_agreement_request(self, session: dict) -> Request:
+        headers = self._get_authorization_header(session)
+        return "GET", self.get_endpoint_url("agreement/"), {"headers": headers}
+
+    def _post_agreement_request(self, session: dict, agreed: bool) -> Request:
+        headers = self._get_authorization_header(session)
+
+        json = {"latest_tos_accepted": agreed}
+        return (
+            "POST",
+            self.get_endpoint_url("agreement/"),
+            {"headers": headers, "json": json},
+        )
+
+    def _post_username_request(self, session: dict, username: str) -> Request:
+        headers = self._get_authorization_header(session)
+        json = {"short_namespace": username}
+        return (
+            "PATCH",
+            self.get_endpoint_url("account"),
+            {"headers": headers, "json": json},
+        )
+
+    def _post_register_name_request(
+        self,
+        session: dict,
+        snap_name: str,
+        registrant_comment: str,
+        is_private: str,
+        store: str,
+    ) -> Request:
+        json = {"snap_name": snap_name}
+
+        if registrant_comment:
+            json["registrant_comment"] = registrant_comment
+
+        if is_private:
+            json["is_private"] = is_private
+
+        if store:
+            json["store"] = store
+
+        return (
+            "POST",
+            self.get_endpoint_url("register-name/"),
+            {"headers": self._get_authorization_header(session), "json": json},
+        )
+
+    def _post_register_name_dispute_request(
+        self, session: dict, snap_name: str, claim_comment: str
+    ) -> Request:
+        json = {"snap_name": snap_name, "comment": claim_comment}
+
+        return (
+            "POST",
+            self.get_endpoint_url("register-name-dispute/"),
+            {"headers": self._get_authorization_header(session), "json": json},
+        )
+
+    def _get_snap_info_request(self, session: dict, snap_name: str) -> Request:
+        return (
+            "GET",
+            self.get_endpoint_url(f"snaps/info/{snap_name}"),
+            {"headers": self._get_authorization_header(session)},
+        )
+
+    def _get_package_upload_macaroon_request(
+        self, session: dict, snap_name: str, channels: List[str]
+    ) -> Request:
+        json = {
+            "packages": [{"name": snap_name, "series": "16"}],
+            "permissions": ["package_upload"],
+            "channels": channels,
+        }
+
+        return (
+            "POST",
+            self.get_endpoint_url("acl/"),
+            {"headers": self._get_authorization_header(session), "json": json},
+        )
+
+    def _snap_metadata_request(
+        self, session: dict, snap_id: str, json: Optional[dict]
+    ) -> Request:
+        method = "PUT" if json is not None else "GET"
+
+        return (
+            method,
+            self.get_endpoint_url(f"snaps/{snap_id}/metadata"),
+            {
+                "params": {"conflict_on_update": "true"},
+                "headers": self._get_authorization_header(session),
+                "json": json,
+            },
+        )
+
+    def _snap_screenshots_request(
+        self, session, snap_id, data: Optional[dict], files: Optional[list]
+    ) -> Request:
+        method = "GET"
+        files_array = None
+        headers = self._get_authorization_header(session)
+        headers["Accept"] = "application/json"
+
+        if data:
+            method = "PUT"
+
+            files_array = []
+            if files:
+                for f in files:
+                    files_array.append(
+                        (f.filename, (f.filename, f.stream, f.mimetype))
+                    )
+            else:
+                # API requires a multipart request, but we have no files to
+                files_array.append(("info", ("", data["info"], "")))
+                data = None
+
+        return (
+            method,
+            self.get_endpoint_url(f"snaps/{snap_id}/binary-metadata"),
+            {
+                "params": {"conflict_on_update": "true"},
+                "headers": headers,
+                "data": data,
+                "files": files_array,
+            },
+        )
+
+    def _get_snap_revision_request(
+        self, session: dict, snap_id: str, revision_id: int
+    ) -> Request:
+        return (
+            "GET",
+            self.get_endpoint_url(
+                f"snaps/{snap_id}/revisions/{revision_id}", api_version=2
+            ),
+            {"headers": self._get_authorization_header(session)},
+        )
+
+    def _snap_release_history_request(
+        self, session: dict, snap_name: str, page: int
+    ) -> Request:
+        return (
+            "GET",
+            self.get_endpoint_url(
+                f"snaps/{snap_name}/releases", api_version=2
+            ),
+            {
+                "params": {"page": page},
+                "headers": self._get_authorization_header(session),
+            },
+        )
+
+    def _snap_channel_map_request(
+        self, session: dict, snap_name: str
+    ) -> Request:
+        return (
+            "GET",
+            self.get_endpoint_url(
+                f"snaps/{snap_name}/channel-map", api_version=2
+            ),
+            {"headers": self._get_authorization_header(session)},
+        )
+
+    def _post_snap_release_request(self, session: dict, json: dict) -> Request:
+        return (
+            "POST",
+            self.get_endpoint_url("snap-release/"),
+            {"headers": self._get_authorization_header(session), "json": json},
+        )
+
+    def _post_close_channel_request(
+        self, session: dict, snap_id: str, json: dict
+    ) -> Request:
+        return (
+            "POST",
+            self.get_endpoint_url(f"snaps/{snap_id}/close"),
+            {"headers": self._get_authorization_header(session), "json": json},
+        )
+
+    def _get_publisher_metrics_request(
+        self, session: dict, json: dict
+    ) -> Request:
+        headers = self._get_authorization_header(session)
+        headers["Content-Type"] = "application/json"
+
+        return (
+            "POST",
+            self.get_endpoint_url("snaps/metrics"),
+            {"headers": headers, "json": json},
+        )
+
+    def _get_validation_sets_request(self, session: dict) -> Request:
+        url = self.get_endpoint_url("validation-sets", api_version=2)
+        return "GET", url, {"headers": self._get_authorization_header(session)}
+
+    def _get_validation_set_request(
+        self, session: dict, validation_set_id: str
+    ) -> Request:
+        url = self.get_endpoint_url(
+            f"validation-sets/{validation_set_id}?sequence=all", api_version=2
+        )
+        return "GET", url, {"headers": self._get_authorization_header(session)}
+
+    def _get_stores_request(self, session: dict) -> Request:
+        headers = self._get_authorization_header(session)
+        return "GET", self.get_endpoint_url("account", 1), {"headers": headers}
+
+    def _get_store_snaps_request(
+        self,
+        session: dict,
+        store_id: str,
+        query: Optional[str],
+        allowed_for_inclusion: Optional[str],
+    ) -> Request:
+        headers = self._get_authorization_header(session)
+        params = {}
+
+        if query:
+            params["q"] = query
+
+        if allowed_for_inclusion:
+            params["allowed-for-inclusion"] = allowed_for_inclusion
+
+        return (
+            "GET",
+            self.get_endpoint_url(
+                f"{store_id}/snaps", api_version=2, is_store=True
+            ),
+            {"params": params, "headers": headers},
+        )
+
+    def _store_request(
+        self,
+        method: str,
+        session: dict,
+        store_id: str,
+        endpoint: str = "",
+        json=None,
+    ) -> Request:
+        """
+        Build a request to the brand store `store_id`, or to one of its
+        `endpoint`s (e.g. "users")
+        """
+        headers = self._get_authorization_header(session)
+        path = f"{store_id}/{endpoint}" if endpoint else f"{store_id}"
+        kwargs: dict = {"headers": headers}
+        if json is not None:
+            kwargs["json"] = json
+        return (
+            method,
+            self.get_endpoint_url(path, api_version=2, is_store=True),
+            kwargs,
+        )
+
+
+class Dashboard(DashboardRequests, Base):
+    def __init__(
+        self,
+        session=None,
+        timeout=DASHBOARD_TIMEOUT,
+        coalesce=False,
+        circuit_breaker=None,
+        hedging=None,
+        limiter=None,
+        rate_limiter=None,
+        refresher=None,
+        refresh_coordinator=None,
+    ):
+        if session is None:
+            session = build_session([DASHBOARD_API_URL])
+        super().__init__(
+            session,
+            timeout,
+            coalesce,
+            circuit_breaker,
+            hedging,
+            limiter,
+            rate_limiter,
+        )
+        # Renews macaroons close to expiry, see `MacaroonRefresher`
+        self.refresher = refresher
 
-            return {
-                "Authorization": f"macaroon root={root}, discharge={bound}"
-            }
-        elif "macaroons" in session:
-            return {"Macaroons": session["macaroons"]}
-        return {"Macaroons": ""}
+        self.config = build_config()
+        self.refresh_coordinator = refresh_coordinator
+        if refresh_coordinator is not None:
+            # Refresh expired credentials and replay calls, see
+            # `RefreshCoordinator`
+            refresh_coordinator.bind(self)
 
     def get_macaroon(self, permissions: List[str]) -> str:
         """
@@ -59,10 +386,7 @@ class Dashboard(Base):
             https://dashboard.snapcraft.io/docs/reference/v1/macaroon.html
         Endpoint: [POST] https://dashboard.snapcraft.io/dev/api/acl
         """
-        response: dict = self.session.post(
-            url=self.get_endpoint_url("tokens", 2),
-            json={"permissions": permissions},
-        )
+        response = self._fetch(self._get_macaroon_request(permissions))
 
         return self.process_response(response)["macaroon"]
 
@@ -72,11 +396,9 @@ class Dashboard(Base):
             https://dashboard.snapcraft.io/docs/reference/v1/account.html#get--dev-api-account
         Endpoint: [GET] https://dashboard.snapcraft.io/dev/api/account
         """
-        headers = self._get_authorization_header(session)
-        response = self.session.get(
-            url=self.get_endpoint_url("account"), headers=headers
+        return self.process_response(
+            self._fetch(self._get_account_request(session))
         )
-        return self.process_response(response)
 
     def get_account_keys(self, session: dict) -> list:
         """
@@ -102,10 +424,7 @@ class Dashboard(Base):
             https://dashboard.snapcraft.io/docs/reference/v1/snap.html#release-a-snap-build-to-a-channel
         Endpoint: [GET] https://dashboard.snapcraft.io/dev/api/agreement
         """
-        headers = self._get_authorization_header(session)
-        agreement_response = self.session.get(
-            url=self.get_endpoint_url("agreement/"), headers=headers
-        )
+        agreement_response = self._fetch(self._get_agreement_request(session))
 
         if self._is_macaroon_expired(agreement_response.headers):
             raise PublisherMacaroonRefreshRequired
@@ -118,25 +437,18 @@ class Dashboard(Base):
             https://dashboard.snapcraft.io/docs/reference/v1/snap.html#release-a-snap-build-to-a-channel
         Endpoint: [POST] https://dashboard.snapcraft.io/dev/api/agreement
         """
-        headers = self._get_authorization_header(session)
-
-        json = {"latest_tos_accepted": agreed}
-        agreement_response = self.session.post(
-            url=self.get_endpoint_url("agreement/"), headers=headers, json=json
+        return self.process_response(
+            self._fetch(self._post_agreement_request(session, agreed))
         )
 
-        return self.process_response(agreement_response)
-
     def post_username(self, session: dict, username: str) -> dict:
         """
         Documentation:
             https://dashboard.snapcraft.io/docs/reference/v1/account.html#get--dev-api-account
         Endpoint: [PATCH] https://dashboard.snapcraft.io/dev/api/account
         """
-        headers = self._get_authorization_header(session)
-        json = {"short_namespace": username}
-        username_response = self.session.patch(
-            url=self.get_endpoint_url("account"), headers=headers, json=json
+        username_response = self._fetch(
+            self._post_username_request(session, username)
         )
 
         if username_response.status_code == 204:
@@ -157,25 +469,14 @@ class Dashboard(Base):
             https://dashboard.snapcraft.io/docs/reference/v1/snap.html#register-a-snap-name
         Endpoint: [POST] https://dashboard.snapcraft.io/dev/api/register-name/
         """
-        json = {"snap_name": snap_name}
-
-        if registrant_comment:
-            json["registrant_comment"] = registrant_comment
-
-        if is_private:
-            json["is_private"] = is_private
-
-        if store:
-            json["store"] = store
-
-        response = self.session.post(
-            url=self.get_endpoint_url("register-name/"),
-            headers=self._get_authorization_header(session),
-            json=json,
+        return self.process_response(
+            self._fetch(
+                self._post_register_name_request(
+                    session, snap_name, registrant_comment, is_private, store
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def post_register_name_dispute(
         self, session: dict, snap_name: str, claim_comment: str
     ) -> dict:
@@ -185,16 +486,14 @@ class Dashboard(Base):
         Endpoint: [POST]
             https://dashboard.snapcraft.io/dev/api/register-name-dispute
         """
-        json = {"snap_name": snap_name, "comment": claim_comment}
-
-        response = self.session.post(
-            url=self.get_endpoint_url("register-name-dispute/"),
-            headers=self._get_authorization_header(session),
-            json=json,
+        return self.process_response(
+            self._fetch(
+                self._post_register_name_dispute_request(
+                    session, snap_name, claim_comment
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def get_snap_info(self, session: dict, snap_name: str) -> dict:
         """
         Documentation:
@@ -202,13 +501,10 @@ class Dashboard(Base):
         Endpoint: [GET]
             https://dashboard.snapcraft.io/dev/api/snaps/info/{snap_name}
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(f"snaps/info/{snap_name}"),
-            headers=self._get_authorization_header(session),
+        return self.process_response(
+            self._fetch(self._get_snap_info_request(session, snap_name))
         )
 
-        return self.process_response(response)
-
     def get_package_upload_macaroon(
         self, session: dict, snap_name: str, channels: List[str]
     ) -> dict:
@@ -217,20 +513,14 @@ class Dashboard(Base):
             https://dashboard.snapcraft.io/docs/reference/v1/macaroon.html#request-a-macaroon
         Endpoint: [POST] https://dashboard.snapcraft.io/dev/api/acl/
         """
-        json = {
-            "packages": [{"name": snap_name, "series": "16"}],
-            "permissions": ["package_upload"],
-            "channels": channels,
-        }
-
-        response = self.session.post(
-            url=self.get_endpoint_url("acl/"),
-            headers=self._get_authorization_header(session),
-            json=json,
+        return self.process_response(
+            self._fetch(
+                self._get_package_upload_macaroon_request(
+                    session, snap_name, channels
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def get_snap_id(self, session: dict, snap_name: str) -> str:
         """
         Documentation:
@@ -250,18 +540,10 @@ class Dashboard(Base):
         Endpoint: [PUT]
             https://dashboard.snapcraft.io/dev/api/snaps/{snap_id}/metadata
         """
-        method = "PUT" if json is not None else None
-
-        metadata_response = self.session.request(
-            method=method,
-            url=self.get_endpoint_url(f"snaps/{snap_id}/metadata"),
-            params={"conflict_on_update": "true"},
-            headers=self._get_authorization_header(session),
-            json=json,
+        return self.process_response(
+            self._fetch(self._snap_metadata_request(session, snap_id, json))
         )
 
-        return self.process_response(metadata_response)
-
     def snap_screenshots(
         self,
         session,
@@ -275,36 +557,12 @@ class Dashboard(Base):
         Endpoint: [GET, PUT]
             https://dashboard.snapcraft.io/dev/api/snaps/{snap_id}/binary-metadata
         """
-        method = "GET"
-        files_array = None
-        headers = self._get_authorization_header(session)
-        headers["Accept"] = "application/json"
-
-        if data:
-            method = "PUT"
-
-            files_array = []
-            if files:
-                for f in files:
-                    files_array.append(
-                        (f.filename, (f.filename, f.stream, f.mimetype))
-                    )
-            else:
-                # API requires a multipart request, but we have no files to
-                files_array.append(("info", ("", data["info"], "")))
-                data = None
-
-        screenshot_response = self.session.request(
-            method=method,
-            url=self.get_endpoint_url(f"snaps/{snap_id}/binary-metadata"),
-            params={"conflict_on_update": "true"},
-            headers=headers,
-            data=data,
-            files=files_array,
+        return self.process_response(
+            self._fetch(
+                self._snap_screenshots_request(session, snap_id, data, files)
+            )
         )
 
-        return self.process_response(screenshot_response)
-
     def get_snap_revision(
         self, session: dict, snap_id: str, revision_id: int
     ) -> dict:
@@ -314,15 +572,12 @@ class Dashboard(Base):
         Endpoint: [GET]
             https://dashboard.snapcraft.io/api/v2/snaps/{snap_id}/revisions/{revision_id}
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"snaps/{snap_id}/revisions/{revision_id}", api_version=2
-            ),
-            headers=self._get_authorization_header(session),
+        return self.process_response(
+            self._fetch(
+                self._get_snap_revision_request(session, snap_id, revision_id)
+            )
         )
 
-        return self.process_response(response)
-
     def snap_release_history(
         self, session: dict, snap_name: str, page: int = 1
     ) -> dict:
@@ -332,16 +587,12 @@ class Dashboard(Base):
         Endpoint: [GET]
             https://dashboard.snapcraft.io/api/v2/snaps/{snap_name}/releases
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"snaps/{snap_name}/releases", api_version=2
-            ),
-            params={"page": page},
-            headers=self._get_authorization_header(session),
+        return self.process_response(
+            self._fetch(
+                self._snap_release_history_request(session, snap_name, page)
+            )
         )
 
-        return self.process_response(response)
-
     def snap_channel_map(self, session: dict, snap_name: str) -> dict:
         """
         Documentation:
@@ -349,29 +600,20 @@ class Dashboard(Base):
         Endpoint: [GET]
             https://dashboard.snapcraft.io/api/v2/snaps/{snap_name}/channel-map
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"snaps/{snap_name}/channel-map", api_version=2
-            ),
-            headers=self._get_authorization_header(session),
+        return self.process_response(
+            self._fetch(self._snap_channel_map_request(session, snap_name))
         )
 
-        return self.process_response(response)
-
     def post_snap_release(self, session: dict, json: dict) -> dict:
         """
         Documentation:
             https://dashboard.snapcraft.io/docs/reference/v1/snap.html#release-a-snap-build-to-a-channel
         Endpoint: [POST] https://dashboard.snapcraft.io/dev/api/snap-release
         """
-        response = self.session.post(
-            url=self.get_endpoint_url("snap-release/"),
-            headers=self._get_authorization_header(session),
-            json=json,
+        return self.process_response(
+            self._fetch(self._post_snap_release_request(session, json))
         )
 
-        return self.process_response(response)
-
     def post_close_channel(
         self, session: dict, snap_id: str, json: dict
     ) -> dict:
@@ -381,31 +623,22 @@ class Dashboard(Base):
         Endpoint: [POST]
             https://dashboard.snapcraft.io/dev/api/snaps/{snap_id}/close
         """
-        response = self.session.post(
-            url=self.get_endpoint_url(f"snaps/{snap_id}/close"),
-            headers=self._get_authorization_header(session),
-            json=json,
+        return self.process_response(
+            self._fetch(
+                self._post_close_channel_request(session, snap_id, json)
+            )
         )
 
-        return self.process_response(response)
-
     def get_publisher_metrics(self, session: dict, json: dict) -> dict:
         """
         Documentation:
             https://dashboard.snapcraft.io/docs/reference/v1/snap.html#fetch-metrics-for-snaps
         Endpoint: [POST] https://dashboard.snapcraft.io/dev/api/snaps/metrics
         """
-        headers = self._get_authorization_header(session)
-        headers["Content-Type"] = "application/json"
-
-        metrics_response = self.session.post(
-            url=self.get_endpoint_url("snaps/metrics"),
-            headers=headers,
-            json=json,
+        return self.process_response(
+            self._fetch(self._get_publisher_metrics_request(session, json))
         )
 
-        return self.process_response(metrics_response)
-
     def get_validation_sets(self, session: dict) -> dict:
         """
         Return a list of validation sets for the current account
@@ -413,11 +646,9 @@ class Dashboard(Base):
             https://dashboard.snapcraft.io/docs/reference/v2/en/validation-sets.html
         Endpoint: [GET] https://dashboard.snapcraft.io/api/v2/validation-sets
         """
-        url = self.get_endpoint_url("validation-sets", api_version=2)
-        response = self.session.get(
-            url, headers=self._get_authorization_header(session)
+        return self.process_response(
+            self._fetch(self._get_validation_sets_request(session))
         )
-        return self.process_response(response)
 
     def get_validation_set(
         self, session: dict, validation_set_id: str
@@ -429,13 +660,11 @@ class Dashboard(Base):
         Endpoint:
             [GET] https://dashboard.snapcraft.io/api/v2/validation-sets/{id}
         """
-        url = self.get_endpoint_url(
-            f"validation-sets/{validation_set_id}?sequence=all", api_version=2
-        )
-        response = self.session.get(
-            url, headers=self._get_authorization_header(session)
+        return self.process_response(
+            self._fetch(
+                self._get_validation_set_request(session, validation_set_id)
+            )
         )
-        return self.process_response(response)
 
     def get_stores(
         self,
@@ -449,13 +678,9 @@ class Dashboard(Base):
 
         :return: A list of stores
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.get(
-            url=self.get_endpoint_url("account", 1), headers=headers
+        account_info = self.process_response(
+            self._fetch(self._get_stores_request(session))
         )
-
-        account_info = self.process_response(response)
         stores = account_info.get("stores", [])
         user_stores = []
 
@@ -474,14 +699,9 @@ class Dashboard(Base):
 
         :return: Store details
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.get(
-            url=self.get_endpoint_url(store_id, api_version=2, is_store=True),
-            headers=headers,
-        )
-
-        return self.process_response(response)["store"]
+        return self.process_response(
+            self._fetch(self._store_request("GET", session, store_id))
+        )["store"]
 
     def get_store_snaps(
         self,
@@ -496,23 +716,13 @@ class Dashboard(Base):
         Endpoint: [GET]
             https://dashboard.snapcraft.io/api/v2/stores/{store_id}/snaps
         """
-        headers = self._get_authorization_header(session)
-        params = {}
-
-        if query:
-            params["q"] = query
-
-        if allowed_for_inclusion:
-            params["allowed-for-inclusion"] = allowed_for_inclusion
-
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"{store_id}/snaps", api_version=2, is_store=True
-            ),
-            params=params,
-            headers=headers,
-        )
-        return self.process_response(response).get("snaps", [])
+        return self.process_response(
+            self._fetch(
+                self._get_store_snaps_request(
+                    session, store_id, query, allowed_for_inclusion
+                )
+            )
+        ).get("snaps", [])
 
     def get_store_members(self, session: dict, store_id: str) -> List[dict]:
         """
@@ -520,16 +730,9 @@ class Dashboard(Base):
             https://dashboard.snapcraft.io/docs/reference/v2/en/stores.html#list-the-details-of-a-brand-store
         Endpoint: [GET] https://dashboard.snapcraft.io/api/v2/stores/{store_id}
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"{store_id}", api_version=2, is_store=True
-            ),
-            headers=headers,
-        )
-
-        return self.process_response(response).get("users", [])
+        return self.process_response(
+            self._fetch(self._store_request("GET", session, store_id))
+        ).get("users", [])
 
     def update_store_members(
         self, session: dict, store_id: str, members: dict
@@ -540,18 +743,14 @@ class Dashboard(Base):
         Endpoint: [POST]
             https://dashboard.snapcraft.io/api/v2/stores/{store_id}/users
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"{store_id}/users", api_version=2, is_store=True
-            ),
-            headers=headers,
-            json=members,
+        return self.process_response(
+            self._fetch(
+                self._store_request(
+                    "POST", session, store_id, "users", members
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def invite_store_members(
         self, session: dict, store_id: str, members: dict
     ) -> dict:
@@ -561,18 +760,14 @@ class Dashboard(Base):
         Endpoint: [POST]
             https://dashboard.snapcraft.io/api/v2/stores/{store_id}/invites
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"{store_id}/invites", api_version=2, is_store=True
-            ),
-            headers=headers,
-            json=members,
+        return self.process_response(
+            self._fetch(
+                self._store_request(
+                    "POST", session, store_id, "invites", members
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def change_store_settings(
         self, session: dict, store_id: str, settings: dict
     ) -> dict:
@@ -582,18 +777,14 @@ class Dashboard(Base):
         Endpoint: [PUT]
             https://dashboard.snapcraft.io/api/v2/stores/{store_id}/settings
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.put(
-            url=self.get_endpoint_url(
-                f"{store_id}/settings", api_version=2, is_store=True
-            ),
-            headers=headers,
-            json=settings,
+        return self.process_response(
+            self._fetch(
+                self._store_request(
+                    "PUT", session, store_id, "settings", settings
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def update_store_snaps(
         self, session: dict, store_id: str, snaps: list
     ) -> dict:
@@ -603,18 +794,12 @@ class Dashboard(Base):
         Endpoint: [POST]
             https://dashboard.snapcraft.io/api/v2/stores/{store_id}/snaps
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"{store_id}/snaps", api_version=2, is_store=True
-            ),
-            headers=headers,
-            json=snaps,
+        return self.process_response(
+            self._fetch(
+                self._store_request("POST", session, store_id, "snaps", snaps)
+            )
         )
 
-        return self.process_response(response)
-
     def update_store_invites(
         self, session: dict, store_id: str, invites: list
     ) -> dict:
@@ -624,30 +809,20 @@ class Dashboard(Base):
         Endpoint: [PUT]
             https://dashboard.snapcraft.io/api/v2/stores/{store_id}/invites
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.put(
-            url=self.get_endpoint_url(
-                f"{store_id}/invites", api_version=2, is_store=True
-            ),
-            headers=headers,
-            json=invites,
+        return self.process_response(
+            self._fetch(
+                self._store_request(
+                    "PUT", session, store_id, "invites", invites
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def get_store_invites(self, session: dict, store_id: str) -> List[dict]:
         """
         Documentation:
             https://dashboard.snapcraft.io/docs/reference/v2/en/stores.html#list-the-details-of-a-brand-store
         Endpoint: [GET] https://dashboard.snapcraft.io/api/v2/stores/{store_id}
         """
-        headers = self._get_authorization_header(session)
-
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"{store_id}", api_version=2, is_store=True
-            ),
-            headers=headers,
-        )
-        return self.process_response(response).get("invites", [])
+        return self.process_response(
+            self._fetch(self._store_request("GET", session, store_id))
+        ).get("invites", [])
@@ -1,7 +1,18 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from math import ceil
 from os import getenv
-from typing import Optional
-from requests import Session
-from canonicalwebteam.store_api.base import Base
+from typing import Deque, Dict, Iterable, Iterator, Optional, Union
+
+from canonicalwebteam.exceptions import (
+    StoreApiError,
+    StoreApiResourceNotFound,
+    StoreApiResponseErrorList,
+)
+from canonicalwebteam.store_api.base import Base, Request
+from canonicalwebteam.store_api.timeouts import DEFAULT_TIMEOUT
+from canonicalwebteam.store_api.transport import build_session
 
 DEVICEGW_URL = getenv("DEVICEGW_URL", "https://api.snapcraft.io/")
 DEVICEGW_URL_STAGING = getenv(
@@ -9,55 +20,130 @@ DEVICEGW_URL_STAGING = getenv(
 )
 
 
-class DeviceGW(Base):
-    def __init__(
-        self, namespace, session=Session(), store=None, staging=False
-    ):
-        super().__init__(session)
-        if staging:
-            self.config = {
-                1: {
-                    "base_url": f"{DEVICEGW_URL_STAGING}api/v1/{namespace}s/",
-                    "headers": {"X-Ubuntu-Series": "16"},
-                },
-                2: {
-                    "base_url": f"{DEVICEGW_URL_STAGING}v2/{namespace}s/",
-                    "headers": {"Snap-Device-Series": "16"},
-                },
-            }
+def build_config(namespace, store=None, staging=False) -> dict:
+    """
+    Return the per API version base URLs and headers for the device gateway
+    """
+    base_url = DEVICEGW_URL_STAGING if staging else DEVICEGW_URL
+    config: dict = {
+        1: {
+            "base_url": f"{base_url}api/v1/{namespace}s/",
+            "headers": {"X-Ubuntu-Series": "16"},
+        },
+        2: {
+            "base_url": f"{base_url}v2/{namespace}s/",
+            "headers": {"Snap-Device-Series": "16"},
+        },
+    }
+
+    if store:
+        config[1]["headers"].update({"X-Ubuntu-Store": store})
+        config[2]["headers"].update({"Snap-Device-Store": store})
+
+    return config
+
+
+# Number of info requests sent at once by `get_items_details`
+BATCH_MAX_WORKERS = int(getenv("DEVICEGW_BATCH_MAX_WORKERS", "10"))
+
+ItemsDetails = Dict[str, Union[dict, StoreApiError]]
+
+
+def search_page_items(body: dict) -> list:
+    """
+    Return the packages in a page of search results
+    """
+    return body.get("_embedded", {}).get("clickindex:package", [])
+
+
+def has_next_search_page(body: dict, page: int, size: int) -> bool:
+    """
+    Return whether there are more search results after `page`, based on
+    the total number of results or, without it, the `next` link
+    """
+    if "total" in body:
+        return page < ceil(body["total"] / size)
+    return "next" in body.get("_links", {})
+
+
+def last_search_page(body: dict, page: int, size: int) -> int:
+    """
+    Return the last page of search results known to exist from `page`:
+    the last one given the total number of results or, without it, the
+    next page if there is a `next` link
+    """
+    if "total" in body:
+        return ceil(body["total"] / size)
+    return page + 1 if "next" in body.get("_links", {}) else page
+
+
+def build_refresh_payload(
+    names: Iterable[str], channel: Optional[str] = None, fields: list = []
+) -> dict:
+    """
+    Return the body of a refresh request installing every package in
+    `names`, which the device gateway answers in a single response
+    """
+    actions = []
+    for index, name in enumerate(names):
+        action = {
+            "action": "install",
+            "instance-key": str(index),
+            "name": name,
+        }
+        if channel:
+            action["channel"] = channel
+        actions.append(action)
+
+    return {"context": [], "actions": actions, "fields": fields}
+
+
+def parse_refresh_results(names: Iterable[str], body: dict) -> ItemsDetails:
+    """
+    Map each package name to its `snap` object from a refresh response, or
+    to the exception describing why it could not be installed
+    """
+    results: ItemsDetails = {}
+    for result in body.get("results", []):
+        name = result.get("name")
+        error = result.get("error")
+        if result.get("result") != "error":
+            results[name] = result["snap"]
+        elif error and error.get("code", "").endswith("not-found"):
+            results[name] = StoreApiResourceNotFound(error.get("message"))
         else:
-            self.config = {
-                1: {
-                    "base_url": f"{DEVICEGW_URL}api/v1/{namespace}s/",
-                    "headers": {"X-Ubuntu-Series": "16"},
-                },
-                2: {
-                    "base_url": f"{DEVICEGW_URL}v2/{namespace}s/",
-                    "headers": {"Snap-Device-Series": "16"},
-                },
-            }
+            results[name] = StoreApiResponseErrorList(
+                "The api returned a list of errors", 200, [error]
+            )
+
+    for name in names:
+        if name not in results:
+            results[name] = StoreApiResourceNotFound(f"{name} not found")
+
+    return results
+
 
-        if store:
-            self.config[1]["headers"].update({"X-Ubuntu-Store": store})
-            self.config[2]["headers"].update({"Snap-Device-Store": store})
+class DeviceGWRequests:
+    """
+    Build the requests sent by `DeviceGW` and `AsyncDeviceGW`, which only
+    differ in how they send them
+    """
+
+    config: dict
 
     def get_endpoint_url(self, endpoint, api_version=1) -> str:
         base_url = self.config[api_version]["base_url"]
         return f"{base_url}{endpoint}"
 
-    def search(
+    def _search_request(
         self,
         search: str,
-        size: int = 100,
-        page: int = 1,
-        category: Optional[str] = None,
-        arch: str = "wide",
-        api_version: int = 1,
-    ) -> dict:
-        """
-        Documentation: https://api.snapcraft.io/docs/search.html#snap_search
-        Endpoint:  https://api.snapcraft.io/api/v1/snaps/search
-        """
+        size: int,
+        page: int,
+        category: Optional[str],
+        arch: str,
+        api_version: int,
+    ) -> Request:
         url = self.get_endpoint_url("search", api_version)
         headers = self.config[api_version].get("headers", {}).copy()
 
@@ -100,23 +186,17 @@ class DeviceGW(Base):
         if category:
             params["section"] = category
 
-        return self.process_response(
-            self.session.get(url, params=params, headers=headers)
-        )
+        return "GET", url, {"params": params, "headers": headers}
 
-    def find(
+    def _find_request(
         self,
-        query: str = "",
-        category: str = "",
-        architecture: str = "",
-        publisher: str = "",
-        featured: str = "",
-        fields: list = [],
-    ) -> dict:
-        """
-        Documentation: https://api.snapcraft.io/docs/search.html#snaps_find
-        Endpoint: [GET] https://api.snapcraft.io/v2/{namespace}/find
-        """
+        query: str,
+        category: str,
+        architecture: str,
+        publisher: str,
+        featured: str,
+        fields: list,
+    ) -> Request:
         url = self.get_endpoint_url("find", 2)
         headers = self.config[2].get("headers")
         params = {"q": query}
@@ -130,24 +210,248 @@ class DeviceGW(Base):
             params["publisher"] = publisher
         if featured:
             params["featured"] = featured
-        response = self.session.get(url, params=params, headers=headers)
-        return self.process_response(response)
+        return "GET", url, {"params": params, "headers": headers}
 
-    def get_all_items(self, size: int, api_version: int = 1) -> dict:
+    def _get_all_items_request(self, size: int, api_version: int) -> Request:
+        url = self.get_endpoint_url("search", api_version)
+        return (
+            "GET",
+            url,
+            {
+                "params": {"scope": "wide", "size": size},
+                "headers": self.config[api_version].get("headers"),
+            },
+        )
+
+    def _get_item_details_request(
+        self,
+        name: str,
+        channel: Optional[str],
+        fields: list,
+        api_version: int,
+    ) -> Request:
+        url = self.get_endpoint_url("info/" + name, api_version)
+        params = {}
+        if fields:
+            params = {"fields": ",".join(fields)}
+        headers = self.config[api_version].get("headers")
+
+        if channel:
+            params["channel"] = channel
+        return "GET", url, {"params": params, "headers": headers}
+
+    def _get_items_details_bulk_request(
+        self, names: list, fields: list, channel: Optional[str]
+    ) -> Request:
+        url = self.get_endpoint_url("refresh", 2)
+        headers = self.config[2].get("headers", {}).copy()
+        headers.update({"Content-Type": "application/json"})
+        return (
+            "POST",
+            url,
+            {
+                "headers": headers,
+                "json": build_refresh_payload(names, channel, fields),
+            },
+        )
+
+    def _get_snap_details_request(
+        self, name: str, channel: Optional[str], fields: list
+    ) -> Request:
+        # this method is only available in API version 1
+        api_version = 1
+        url = self.get_endpoint_url("details/" + name, api_version=api_version)
+        params = {}
+        if fields:
+            params = {"fields": ",".join(fields)}
+        # Having an empty channel string tells details endpoint to
+        # not filter by channel. Having None and not including the channel
+        # parameter makes the endpoint default to latest/stable channel
+        if channel is not None:
+            params["channel"] = channel
+        headers = self.config[api_version].get("headers")
+        return "GET", url, {"params": params, "headers": headers}
+
+    def _get_public_metrics_request(
+        self, json: dict, api_version: int
+    ) -> Request:
+        url = self.get_endpoint_url("metrics")
+
+        headers = self.config[api_version].get("headers", {})
+        headers.update({"Content-Type": "application/json"})
+        return "POST", url, {"headers": headers, "json": json}
+
+    def _get_categories_request(self, api_version: int, type: str) -> Request:
+        url = self.get_endpoint_url("categories", api_version)
+        return (
+            "GET",
+            url,
+            {
+                "headers": self.config[api_version].get("headers"),
+                "params": {"type": type},
+            },
+        )
+
+    def _get_resource_revisions_request(
+        self, name: str, resource_name: str, api_version: int
+    ) -> Request:
+        url = self.get_endpoint_url(
+            f"resources/{name}/{resource_name}/revisions", api_version
+        )
+        return "GET", url, {"headers": self.config[api_version].get("headers")}
+
+    def _get_featured_snaps_request(
+        self, api_version: int, fields: str, headers: dict
+    ) -> Request:
+        url = self.get_endpoint_url("search")
+        default_headers = self.config[api_version].get("headers", {})
+
+        merged_headers = {**default_headers, **headers}
+
+        params = {
+            "scope": "wide",
+            "arch": "wide",
+            "confinement": "strict,classic,devmode",
+            "fields": fields,
+            "section": "featured",
+        }
+        return "GET", url, {"params": params, "headers": merged_headers}
+
+
+class DeviceGW(DeviceGWRequests, Base):
+    def __init__(
+        self,
+        namespace,
+        session=None,
+        store=None,
+        staging=False,
+        timeout=DEFAULT_TIMEOUT,
+        coalesce=False,
+        circuit_breaker=None,
+        hedging=None,
+        limiter=None,
+        rate_limiter=None,
+    ):
+        if session is None:
+            session = build_session(
+                [DEVICEGW_URL_STAGING if staging else DEVICEGW_URL]
+            )
+        super().__init__(
+            session,
+            timeout,
+            coalesce,
+            circuit_breaker,
+            hedging,
+            limiter,
+            rate_limiter,
+        )
+        self.config = build_config(namespace, store, staging)
+
+    def search(
+        self,
+        search: str,
+        size: int = 100,
+        page: int = 1,
+        category: Optional[str] = None,
+        arch: str = "wide",
+        api_version: int = 1,
+    ) -> dict:
         """
         Documentation: https://api.snapcraft.io/docs/search.html#snap_search
         Endpoint:  https://api.snapcraft.io/api/v1/snaps/search
         """
-        url = self.get_endpoint_url("search", api_version)
+        return self.process_response(
+            self._fetch(
+                self._search_request(
+                    search, size, page, category, arch, api_version
+                )
+            )
+        )
+
+    def iter_search(
+        self,
+        search: str = "",
+        category: Optional[str] = None,
+        size: int = 100,
+        arch: str = "wide",
+        api_version: int = 1,
+        prefetch: int = 1,
+    ) -> Iterator[dict]:
+        """
+        Yield every package matching a `search` across all pages of
+        results. Use `category` to list a category (e.g. "featured") and
+        "publisher:<name>" as `search` to list a publisher's packages.
+
+        While a page is being consumed, the next `prefetch` pages are
+        fetched in the background (0 fetches each page on demand). Closing
+        the generator, e.g. by breaking out of the loop, cancels the
+        fetches that haven't started yet. Without the total number of
+        results, only the next page is fetched ahead, if there is one.
+
+        Documentation: https://api.snapcraft.io/docs/search.html#snap_search
+        Endpoint:  https://api.snapcraft.io/api/v1/snaps/search
+        """
+
+        def fetch(page):
+            return self.search(search, size, page, category, arch, api_version)
+
+        page, body = 1, fetch(1)
+        pending: Deque[Future] = deque()
+        pool = ThreadPoolExecutor(max(prefetch, 1))
+        try:
+            while True:
+                items = search_page_items(body)
+                if not items or not has_next_search_page(body, page, size):
+                    yield from items
+                    return
+
+                requested = page + len(pending)
+                last_page = last_search_page(body, page, size)
+                while len(pending) < prefetch and requested < last_page:
+                    requested += 1
+                    # Fetched in a copy of the caller's context, so that
+                    # `store_deadline` and `store_timeout` still apply
+                    pending.append(
+                        pool.submit(copy_context().run, fetch, requested)
+                    )
+
+                yield from items
 
+                page += 1
+                body = pending.popleft().result() if pending else fetch(page)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def find(
+        self,
+        query: str = "",
+        category: str = "",
+        architecture: str = "",
+        publisher: str = "",
+        featured: str = "",
+        fields: list = [],
+    ) -> dict:
+        """
+        Documentation: https://api.snapcraft.io/docs/search.html#snaps_find
+        Endpoint: [GET] https://api.snapcraft.io/v2/{namespace}/find
+        """
         return self.process_response(
-            self.session.get(
-                url,
-                params={"scope": "wide", "size": size},
-                headers=self.config[api_version].get("headers"),
+            self._fetch(
+                self._find_request(
+                    query, category, architecture, publisher, featured, fields
+                )
             )
         )
 
+    def get_all_items(self, size: int, api_version: int = 1) -> dict:
+        """
+        Documentation: https://api.snapcraft.io/docs/search.html#snap_search
+        Endpoint:  https://api.snapcraft.io/api/v1/snaps/search
+        """
+        return self.process_response(
+            self._fetch(self._get_all_items_request(size, api_version))
+        )
+
     def get_category_items(
         self,
         category: str,
@@ -212,20 +516,74 @@ class DeviceGW(Base):
         Endpoint: [GET]
             https://api.snapcraft.io/v2/{name_space}/info/{package_name}
         """
-        url = self.get_endpoint_url("info/" + name, api_version)
-        params = {}
-        if fields:
-            params = {"fields": ",".join(fields)}
-        headers = self.config[api_version].get("headers")
+        return self.process_response(
+            self._fetch(
+                self._get_item_details_request(
+                    name, channel, fields, api_version
+                )
+            )
+        )
 
-        if channel:
-            params["channel"] = channel
-        response = self.session.get(
-            url,
-            params=params,
-            headers=headers,
+    def get_items_details(
+        self,
+        names: Iterable[str],
+        fields: list = [],
+        channel: Optional[str] = None,
+        max_workers: int = BATCH_MAX_WORKERS,
+        bulk: bool = False,
+    ) -> ItemsDetails:
+        """
+        Fetch the details of many packages at once.
+
+        By default this sends one info request per package, at most
+        `max_workers` at a time, so results are the same as calling
+        `get_item_details` for each name. With `bulk=True` a single refresh
+        request is sent instead; results are then the refresh endpoint's
+        `snap` objects, which support a different set of `fields`.
+
+        Returns a mapping of package name to its details, or to the
+        StoreApiError (e.g. StoreApiResourceNotFound) raised for that
+        package, so one failure doesn't fail the whole batch.
+
+        Documentation: https://api.snapcraft.io/docs/info.html
+            https://api.snapcraft.io/docs/refresh.html
+        Endpoint: [GET]
+            https://api.snapcraft.io/v2/{name_space}/info/{package_name}
+        Endpoint: [POST] https://api.snapcraft.io/v2/{name_space}/refresh
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+
+        if bulk:
+            return self._get_items_details_bulk(names, fields, channel)
+
+        def get_details(name):
+            try:
+                return self.get_item_details(name, channel, fields)
+            except StoreApiError as error:
+                return error
+
+        # Every request runs in a copy of the caller's context, so they
+        # all honour its `store_deadline` and `store_timeout`
+        with ThreadPoolExecutor(min(max_workers, len(names))) as pool:
+            futures = [
+                pool.submit(copy_context().run, get_details, name)
+                for name in names
+            ]
+            return {
+                name: future.result() for name, future in zip(names, futures)
+            }
+
+    def _get_items_details_bulk(
+        self, names: list, fields: list, channel: Optional[str]
+    ) -> ItemsDetails:
+        body = self.process_response(
+            self._fetch(
+                self._get_items_details_bulk_request(names, fields, channel)
+            )
         )
-        return self.process_response(response)
+        return parse_refresh_results(names, body)
 
     def get_snap_details(
         self,
@@ -238,38 +596,17 @@ class DeviceGW(Base):
         Endpoint: [GET]
             https://api.snapcraft.io/api/v1/{name_space}/details/{package_name}
         """
-        # this method is only available in API version 1
-        api_version = 1
-        url = self.get_endpoint_url("details/" + name, api_version=api_version)
-        params = {}
-        if fields:
-            params = {"fields": ",".join(fields)}
-        # Having an empty channel string tells details endpoint to
-        # not filter by channel. Having None and not including the channel
-        # parameter makes the endpoint default to latest/stable channel
-        if channel is not None:
-            params["channel"] = channel
-        headers = self.config[api_version].get("headers")
-
-        response = self.session.get(
-            url,
-            params=params,
-            headers=headers,
+        return self.process_response(
+            self._fetch(self._get_snap_details_request(name, channel, fields))
         )
-        return self.process_response(response)
 
     def get_public_metrics(self, json: dict, api_version: int = 1) -> dict:
         """
         Documentation: https://api.snapcraft.io/docs/metrics.html
         Endpoint: https://api.snapcraft.io/api/v1/snaps/metrics
         """
-        url = self.get_endpoint_url("metrics")
-
-        headers = self.config[api_version].get("headers", {})
-        headers.update({"Content-Type": "application/json"})
-
         return self.process_response(
-            self.session.post(url, headers=headers, json=json)
+            self._fetch(self._get_public_metrics_request(json, api_version))
         )
 
     def get_categories(
@@ -279,13 +616,8 @@ class DeviceGW(Base):
         Documentation: https://api.snapcraft.io/docs/categories.html
         Endpoint: https://api.snapcraft.io/v2/{name_space}/categories
         """
-        url = self.get_endpoint_url("categories", api_version)
         return self.process_response(
-            self.session.get(
-                url,
-                headers=self.config[api_version].get("headers"),
-                params={"type": type},
-            )
+            self._fetch(self._get_categories_request(api_version, type))
         )
 
     def get_resource_revisions(
@@ -297,14 +629,11 @@ class DeviceGW(Base):
         Endpoint:
             https://api.snapcraft.io/v2/charms/resources/{package_name}/{resource_name}/revisions
         """
-        url = self.get_endpoint_url(
-            f"resources/{name}/{resource_name}/revisions", api_version
-        )
-
         return self.process_response(
-            self.session.get(
-                url,
-                headers=self.config[api_version].get("headers"),
+            self._fetch(
+                self._get_resource_revisions_request(
+                    name, resource_name, api_version
+                )
             )
         )["revisions"]
 
@@ -316,19 +645,8 @@ class DeviceGW(Base):
             https://docs.google.com/document/d/1UAybxuZyErh3ayqb4nzL3T4BbvMtnmKKEPu-ixcCj_8/edit
         Endpoint: https://api.snapcraft.io/api/v1/snaps/search
         """
-        url = self.get_endpoint_url("search")
-        default_headers = self.config[api_version].get("headers", {})
-
-        merged_headers = {**default_headers, **headers}
-
-        params = {
-            "scope": "wide",
-            "arch": "wide",
-            "confinement": "strict,classic,devmode",
-            "fields": fields,
-            "section": "featured",
-        }
-
         return self.process_response(
-            self.session.get(url, params=params, headers=merged_headers)
+            self._fetch(
+                self._get_featured_snaps_request(api_version, fields, headers)
+            )
         )
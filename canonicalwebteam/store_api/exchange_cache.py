@@ -0,0 +1,117 @@
+import json
+import logging
+import threading
+from os import getenv
+from time import time
+from typing import Optional, Union
+
+from canonicalwebteam.store_api.cache_cipher import CACHE_KEY, CacheCipher
+from canonicalwebteam.store_api.macaroons import (
+    EXPIRY_MARGIN,
+    serialized_expiry,
+)
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE_CACHE_KEY = getenv("STORE_API_EXCHANGE_CACHE_KEY", CACHE_KEY)
+EXCHANGE_CACHE_TTL = int(getenv("STORE_API_EXCHANGE_CACHE_TTL", "3600"))
+
+
+class ExchangeCache:
+    """
+    Remember the macaroons returned by the publisher gateway token exchange
+    endpoints in a `RedisCache`, so that credentials exchanged by one
+    worker aren't exchanged again by the others.
+
+    Entries are keyed by an HMAC of the endpoint and the credentials sent to
+    it, never by the credentials themselves, and encrypted at rest with
+    NaCl's SecretBox, see `CacheCipher`. Both keys are derived from
+    `secret`, which defaults to the STORE_API_EXCHANGE_CACHE_KEY, or
+    STORE_API_CACHE_KEY, environment variable. Entries are kept until the
+    exchanged macaroon expires, or for at most `max_ttl` seconds. Entries
+    that can't be decrypted, e.g. after the secret changed, are treated as
+    misses.
+    """
+
+    def __init__(
+        self,
+        cache,
+        secret: Union[str, bytes, None] = None,
+        max_ttl: int = EXCHANGE_CACHE_TTL,
+    ):
+        if secret is None:
+            secret = EXCHANGE_CACHE_KEY
+        if not secret:
+            raise ValueError(
+                "ExchangeCache needs a secret, see "
+                "STORE_API_EXCHANGE_CACHE_KEY or STORE_API_CACHE_KEY"
+            )
+        self.cache = cache
+        self.max_ttl = max_ttl
+        self._cipher = CacheCipher(secret, "store-api")
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _cache_key(self, endpoint: str, headers: dict, body: dict):
+        credentials = json.dumps([endpoint, headers, body], sort_keys=True)
+        return (
+            "token-exchange",
+            {"credentials": self._cipher.hash(credentials)},
+        )
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def get(self, endpoint: str, headers: dict, body: dict) -> Optional[str]:
+        """
+        Return the macaroon cached for this exchange, or None
+        """
+        encrypted = self.cache.get(self._cache_key(endpoint, headers, body))
+        if encrypted is None:
+            self._count(False)
+            return None
+
+        try:
+            entry = self._cipher.decrypt(encrypted)
+        except ValueError as e:
+            logger.warning("Could not decrypt exchanged macaroon: %s", e)
+            self._count(False)
+            return None
+
+        # The fallback cache of RedisCache ignores per-entry TTLs
+        if entry["expires"] <= time():
+            self._count(False)
+            return None
+        self._count(True)
+        return entry["macaroon"]
+
+    def set(self, endpoint: str, headers: dict, body: dict, macaroon: str):
+        """
+        Cache the macaroon returned by this exchange until it expires
+        """
+        now = time()
+        expires = now + self.max_ttl
+        expiry = serialized_expiry(macaroon)
+        if expiry is not None:
+            expires = min(expires, expiry - EXPIRY_MARGIN)
+        ttl = int(expires - now)
+        if ttl <= 0:
+            return
+
+        self.cache.set(
+            self._cache_key(endpoint, headers, body),
+            self._cipher.encrypt({"macaroon": macaroon, "expires": expires}),
+            ttl=ttl,
+        )
+
+    def stats(self) -> dict:
+        """
+        Return how many exchanges were served from the cache or not
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses}
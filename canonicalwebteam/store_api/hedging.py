@@ -0,0 +1,223 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextvars import copy_context
+from time import monotonic
+from typing import Awaitable, Callable, Deque, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Only requests that are safe to send twice are hedged
+HEDGED_METHODS = ("GET", "HEAD")
+
+
+class HedgePolicy:
+    """
+    Hedge slow idempotent requests: when the first attempt hasn't answered
+    after the `percentile` latency of recent requests (clamped between
+    `min_delay` and `max_delay`), a second identical request is sent.
+    Until `min_samples` latencies are known, `max_delay` is used. The
+    delay runs from when the first attempt actually starts.
+
+    Hedges are capped at `budget_ratio` of the requests made through the
+    policy, so a slow upstream doesn't get twice the traffic.
+
+    The first response wins. With asyncio, the losing attempt is
+    cancelled right away. Threaded callers have both attempts sent from a
+    pool owned by the policy, and wait for the first of them to answer;
+    the losing attempt can't be interrupted and its response is
+    discarded. At most `max_workers` attempts run on the pool at once:
+    beyond that, callers send their request themselves, without hedging,
+    rather than waiting for a thread.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        min_delay: float = 0.01,
+        max_delay: float = 1.0,
+        budget_ratio: float = 0.05,
+        window_size: int = 200,
+        min_samples: int = 20,
+        max_workers: int = 32,
+    ):
+        if not 0 < percentile <= 100:
+            raise ValueError("The percentile must be between 0 and 100")
+        if max_delay < min_delay:
+            raise ValueError("The maximum delay must be at least the minimum")
+
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window_size)
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Threads of the pool free for an attempt, so that attempts are
+        # never queued
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def delay(self) -> float:
+        """
+        Return how long to wait for the first attempt before hedging
+        """
+        with self._lock:
+            if len(self._latencies) < max(1, self.min_samples):
+                return self.max_delay
+            latencies = sorted(self._latencies)
+
+        index = round(self.percentile / 100 * (len(latencies) - 1))
+        return min(self.max_delay, max(self.min_delay, latencies[index]))
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _start(self):
+        with self._lock:
+            self._requests += 1
+
+    def _try_hedge(self) -> bool:
+        with self._lock:
+            if self._hedged >= self.budget_ratio * self._requests:
+                return False
+            self._hedged += 1
+            return True
+
+    def _won(self):
+        with self._lock:
+            self._hedge_wins += 1
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        started = monotonic()
+        result = fn()
+        self.record_latency(monotonic() - started)
+        return result
+
+    def _attempt(self, fn: Callable[[], T]) -> T:
+        try:
+            return self._timed(fn)
+        finally:
+            self._slots.release()
+
+    def _submit(self, fn: Callable[[], T]) -> "Future[T]":
+        """
+        Send an attempt from the pool, once one of its slots is taken
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="store-api-hedge"
+                )
+            pool = self._pool
+        # Attempts run in a copy of the caller's context, so that
+        # `store_deadline` and `store_timeout` still apply
+        try:
+            return pool.submit(copy_context().run, self._attempt, fn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        Call `fn`, sending a request, and call it again if it is too slow
+        """
+        self._start()
+        if not self._slots.acquire(blocking=False):
+            # Every thread of the pool is busy
+            return self._timed(fn)
+        primary = self._submit(fn)
+        done, _ = wait([primary], timeout=self.delay())
+        if done or not self._slots.acquire(blocking=False):
+            return primary.result()
+        if not self._try_hedge():
+            self._slots.release()
+            return primary.result()
+
+        hedge = self._submit(fn)
+        pending = {primary, hedge}
+        errors: List[BaseException] = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    errors.append(error)
+                    continue
+                # The losing attempt can only be dropped if not yet sent
+                for loser in pending:
+                    loser.cancel()
+                if future is hedge:
+                    self._won()
+                return future.result()
+
+        raise errors[0]
+
+    async def _atimed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        started = monotonic()
+        result = await fn()
+        self.record_latency(monotonic() - started)
+        return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        asyncio counterpart of `call`
+        """
+        self._start()
+        primary = asyncio.ensure_future(self._atimed(fn))
+        pending = {primary}
+        errors: List[BaseException] = []
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.delay())
+            if done or not self._try_hedge():
+                return await primary
+
+            hedge = asyncio.ensure_future(self._atimed(fn))
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is not None:
+                        errors.append(error)
+                        continue
+                    if task is hedge:
+                        self._won()
+                    return task.result()
+        finally:
+            # The losing attempt, or every attempt if the caller was
+            # cancelled
+            for task in pending:
+                task.cancel()
+
+        raise errors[0]
+
+    def stats(self) -> dict:
+        """
+        Return how many requests went through the policy, how many of them
+        were hedged, how many hedges answered first, and the current delay
+        """
+        delay = self.delay()
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "hedged": self._hedged,
+                "hedge_wins": self._hedge_wins,
+                "hedge_rate": (
+                    self._hedged / self._requests if self._requests else 0.0
+                ),
+                "delay": delay,
+            }
@@ -0,0 +1,304 @@
+import asyncio
+import threading
+from collections import deque
+from time import monotonic
+from typing import Awaitable, Callable, Deque, Dict, NoReturn, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+from canonicalwebteam.exceptions import StoreApiConcurrencyLimitError
+from canonicalwebteam.store_api.circuit_breaker import endpoint_group
+
+T = TypeVar("T")
+
+# Weight of the latest latency in the smoothed latency of an endpoint group
+SMOOTHING = 0.2
+
+
+class _HostLimit:
+    def __init__(self, limit: float, window_size: int):
+        self.condition = threading.Condition()
+        self.limit = limit
+        self.in_flight = 0
+        self.queued = 0
+        self.shed = 0
+        self.window_size = window_size
+        # Recent latencies of each endpoint group, since some endpoints of
+        # a host are much slower than others, and their moving average
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.smoothed: Dict[str, float] = {}
+        # When the limit was last decreased
+        self.decreased_at = float("-inf")
+        # asyncio callers waiting for a slot, woken from any thread
+        self.async_waiters: Deque[
+            Tuple[asyncio.AbstractEventLoop, asyncio.Future]
+        ] = deque()
+
+    def group_latencies(self, group: str) -> Deque[float]:
+        latencies = self.latencies.get(group)
+        if latencies is None:
+            latencies = self.latencies[group] = deque(maxlen=self.window_size)
+        return latencies
+
+    def is_slow(
+        self, group: str, latency: float, tolerance: float, min_samples: int
+    ) -> bool:
+        """
+        Record the `latency` of a call to `group`, returning whether calls
+        to it are now more than `tolerance` times slower than usual: the
+        moving average of their latencies against the median of the window
+        (once it has `min_samples` latencies), so that jitter and a single
+        slow call don't count
+        """
+        latencies = self.group_latencies(group)
+        smoothed = self.smoothed.get(group, latency)
+        smoothed += SMOOTHING * (latency - smoothed)
+        self.smoothed[group] = smoothed
+        slow = False
+        if len(latencies) >= max(1, min_samples):
+            ordered = sorted(latencies)
+            slow = smoothed > ordered[len(ordered) // 2] * tolerance
+        latencies.append(latency)
+        return slow
+
+    def has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def wake(self):
+        self.condition.notify()
+        while self.async_waiters:
+            loop, waiter = self.async_waiters.popleft()
+            if not waiter.done():
+                loop.call_soon_threadsafe(_set_waiter, waiter)
+                return
+
+
+class _Slot:
+    """
+    A request in flight to `host_limit`, to an endpoint in `group`, sent
+    at the `monotonic` time `started`
+    """
+
+    def __init__(self, host_limit: _HostLimit, group: str):
+        self.host_limit = host_limit
+        self.group = group
+        self.started = monotonic()
+
+
+def _set_waiter(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AdaptiveLimiter:
+    """
+    Limit the number of requests in flight to each host, adjusting the
+    limit from what the host can take (additive increase, multiplicative
+    decrease):
+    - every call that succeeds while the limit is in use raises it by
+      `1 / limit`, i.e. by about one per round of `limit` calls
+    - a call that fails (connection errors, timeouts, 429 and 5xx
+      responses), or after which the moving average of latencies to its
+      endpoint group (see `endpoint_group`) is more than
+      `latency_tolerance` times their recent median, multiplies it by
+      `backoff`. Only calls sent after the last decrease can decrease it
+      again, so the limit drops at most once per round trip.
+
+    The limit stays between `min_limit` and `max_limit`. When a host is at
+    its limit, calls wait up to `queue_timeout` seconds for a slot, and at
+    most `max_queue` calls wait at once. Calls that can't get a slot raise
+    StoreApiConcurrencyLimitError without being sent.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff: float = 0.9,
+        latency_tolerance: float = 2.0,
+        queue_timeout: float = 1.0,
+        max_queue: int = 100,
+        window_size: int = 100,
+        min_samples: int = 10,
+        group_fn: Callable[[str], str] = endpoint_group,
+    ):
+        if not min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "The initial limit must be between the minimum and maximum"
+            )
+        if not 0 < backoff < 1:
+            raise ValueError("The backoff must be between 0 and 1")
+
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.group_fn = group_fn
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostLimit] = {}
+
+    def _host(self, url: str) -> Tuple[str, _HostLimit]:
+        host = urlsplit(url).netloc
+        with self._lock:
+            limit = self._hosts.get(host)
+            if limit is None:
+                limit = self._hosts[host] = _HostLimit(
+                    self.initial_limit, self.window_size
+                )
+            return host, limit
+
+    def _shed(self, host: str, limit: _HostLimit) -> NoReturn:
+        limit.shed += 1
+        raise StoreApiConcurrencyLimitError(
+            f"Too many requests in flight to {host} "
+            f"(limit {int(limit.limit)})"
+        )
+
+    def acquire(self, url: str) -> _Slot:
+        """
+        Take a slot for a request to `url`, waiting for one if needed
+        """
+        host, limit = self._host(url)
+        with limit.condition:
+            if not limit.has_slot():
+                if limit.queued >= self.max_queue:
+                    self._shed(host, limit)
+                limit.queued += 1
+                try:
+                    available = limit.condition.wait_for(
+                        limit.has_slot, self.queue_timeout
+                    )
+                finally:
+                    limit.queued -= 1
+                if not available:
+                    self._shed(host, limit)
+            limit.in_flight += 1
+        return _Slot(limit, self.group_fn(url))
+
+    async def aacquire(self, url: str) -> _Slot:
+        """
+        asyncio counterpart of `acquire`
+        """
+        host, limit = self._host(url)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        queued = False
+        try:
+            while True:
+                with limit.condition:
+                    if limit.has_slot():
+                        limit.in_flight += 1
+                        return _Slot(limit, self.group_fn(url))
+                    if not queued:
+                        if limit.queued >= self.max_queue:
+                            self._shed(host, limit)
+                        limit.queued += 1
+                        queued = True
+                    waiter = loop.create_future()
+                    limit.async_waiters.append((loop, waiter))
+
+                remaining = deadline - loop.time()
+                try:
+                    await asyncio.wait_for(waiter, max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    with limit.condition:
+                        self._shed(host, limit)
+        finally:
+            if queued:
+                with limit.condition:
+                    limit.queued -= 1
+
+    def release(self, slot: _Slot, latency: float, failed: bool):
+        """
+        Give back a slot taken by `acquire`, adjusting the host's limit
+        from the outcome of the request
+        """
+        limit = slot.host_limit
+        with limit.condition:
+            in_use = limit.in_flight * 2 >= limit.limit
+            limit.in_flight -= 1
+
+            slow = not failed and limit.is_slow(
+                slot.group, latency, self.latency_tolerance, self.min_samples
+            )
+
+            previous = int(limit.limit)
+            if failed or slow:
+                # Calls in flight when the limit was decreased were sent
+                # under the previous limit, and say nothing of the new one
+                if slot.started >= limit.decreased_at:
+                    limit.limit = max(
+                        self.min_limit, limit.limit * self.backoff
+                    )
+                    limit.decreased_at = monotonic()
+            elif in_use:
+                limit.limit = min(
+                    self.max_limit, limit.limit + 1 / limit.limit
+                )
+
+            for _ in range(max(1, int(limit.limit) - previous)):
+                limit.wake()
+
+    def call(self, url: str, fn: Callable[[], T]) -> T:
+        """
+        Call `fn`, sending a request to `url`, within the host's limit
+        """
+        slot = self.acquire(url)
+        started = monotonic()
+        try:
+            response = fn()
+        except BaseException:
+            self.release(slot, monotonic() - started, failed=True)
+            raise
+        self.release(slot, monotonic() - started, _failed(response))
+        return response
+
+    async def acall(self, url: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        asyncio counterpart of `call`
+        """
+        slot = await self.aacquire(url)
+        started = monotonic()
+        try:
+            response = await fn()
+        except asyncio.CancelledError:
+            # Says nothing about the host, just give the slot back
+            limit = slot.host_limit
+            with limit.condition:
+                limit.in_flight -= 1
+                limit.wake()
+            raise
+        except BaseException:
+            self.release(slot, monotonic() - started, failed=True)
+            raise
+        self.release(slot, monotonic() - started, _failed(response))
+        return response
+
+    def stats(self) -> dict:
+        """
+        Return the current limit, requests in flight, calls waiting for a
+        slot and calls shed of each host
+        """
+        with self._lock:
+            hosts = dict(self._hosts)
+
+        stats = {}
+        for host, limit in hosts.items():
+            with limit.condition:
+                stats[host] = {
+                    "limit": int(limit.limit),
+                    "in_flight": limit.in_flight,
+                    "queued": limit.queued,
+                    "shed": limit.shed,
+                }
+        return stats
+
+
+def _failed(response) -> bool:
+    status_code = getattr(response, "status_code", 0)
+    return status_code == 429 or status_code >= 500
@@ -0,0 +1,299 @@
+import base64
+import binascii
+import json
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timezone
+from functools import lru_cache
+from hashlib import sha256
+from os import getenv
+from time import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from canonicalwebteam.exceptions import PublisherMacaroonRefreshRequired
+from canonicalwebteam.lazy_imports import lazy_module
+
+logger = logging.getLogger(__name__)
+
+cachetools = lazy_module("cachetools")
+pymacaroons = lazy_module("pymacaroons")
+
+MACAROON_CACHE_SIZE = int(getenv("STORE_API_MACAROON_CACHE_SIZE", "1024"))
+MACAROON_CACHE_TTL = int(getenv("STORE_API_MACAROON_CACHE_TTL", "3600"))
+# Macaroons expiring within this many seconds are treated as expired, to
+# allow for clock skew and the time the request takes
+EXPIRY_MARGIN = float(getenv("STORE_API_MACAROON_EXPIRY_MARGIN", "0"))
+
+
+def _parse_time(value: str) -> Optional[float]:
+    # fromisoformat only takes "Z" and nanoseconds from Python 3.11
+    value = value.strip()
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def caveat_expiry(caveat_id: str) -> Optional[float]:
+    """
+    Return the timestamp after which a first-party caveat no longer holds,
+    or None when it isn't a time caveat. Both the bakery
+    "time-before <time>" and the SSO "<location>|expires|<time>" forms are
+    understood.
+    """
+    if caveat_id.startswith("time-before "):
+        return _parse_time(caveat_id.split(" ", 1)[1])
+
+    parts = caveat_id.split("|")
+    if len(parts) == 3 and parts[1] == "expires":
+        return _parse_time(parts[2])
+    return None
+
+
+def macaroon_expiry(macaroons: Iterable) -> Optional[float]:
+    """
+    Return the earliest expiry of the first-party time caveats of the
+    given deserialized macaroons, or None when they have none
+    """
+    expiries = []
+    for macaroon in macaroons:
+        for caveat in macaroon.first_party_caveats():
+            expiry = caveat_expiry(caveat.caveat_id)
+            if expiry is not None:
+                expiries.append(expiry)
+    return min(expiries, default=None)
+
+
+def _deserialize(serialized: str) -> List:
+    """
+    Deserialize a macaroon, or the base64 JSON list of macaroons that the
+    publisher gateway hands out. Tokens that aren't macaroons give an empty
+    list.
+    """
+    try:
+        return [pymacaroons.Macaroon.deserialize(serialized)]
+    except Exception:
+        pass
+
+    try:
+        padded = serialized + "=" * (-len(serialized) % 4)
+        decoded = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, binascii.Error):
+        return []
+    if isinstance(decoded, dict):
+        decoded = [decoded]
+    if not isinstance(decoded, list):
+        return []
+
+    serializer = pymacaroons.serializers.JsonSerializer()
+    try:
+        return [
+            pymacaroons.Macaroon.deserialize(json.dumps(m), serializer)
+            for m in decoded
+        ]
+    except Exception:
+        return []
+
+
+@lru_cache(maxsize=MACAROON_CACHE_SIZE)
+def serialized_expiry(serialized: str) -> Optional[float]:
+    """
+    Return the earliest time caveat expiry of a serialized macaroon, or
+    None if it has none or can't be parsed. Results are cached, since a
+    macaroon's caveats never change.
+    """
+    return macaroon_expiry(_deserialize(serialized))
+
+
+def tokens_expiry(tokens: Iterable[str]) -> Optional[float]:
+    """
+    Return the earliest expiry of the serialized macaroons `tokens`
+    """
+    expiries = [serialized_expiry(token) for token in tokens if token]
+    return min((e for e in expiries if e is not None), default=None)
+
+
+def check_macaroons(
+    tokens: Iterable[str],
+    session=None,
+    refresher: Optional["MacaroonRefresher"] = None,
+):
+    """
+    Raise PublisherMacaroonRefreshRequired without calling the API when
+    the serialized macaroons `tokens` have expired. When they expire soon,
+    ask `refresher` to renew `session` in the background.
+    """
+    tokens = list(tokens)
+    expiry = tokens_expiry(tokens)
+    if expiry is None:
+        return
+    if expiry <= time() + EXPIRY_MARGIN:
+        raise PublisherMacaroonRefreshRequired
+    if refresher is not None:
+        refresher.maybe_refresh(tokens, expiry, session)
+
+
+class MacaroonRefresher:
+    """
+    Renew macaroons before they expire: when a gateway builds the
+    authorization header of a session whose macaroons expire within
+    `refresh_before` seconds, `refresh_fn(session)` is called in a
+    background thread. The application does the renewal and stores the
+    new macaroons, e.g. by exchanging a new discharge.
+
+    A session is refreshed at most once per `retry_interval` seconds, and
+    errors raised by `refresh_fn` are logged.
+
+    Example:
+        def renew(session):
+            ...
+
+        dashboard = Dashboard(refresher=MacaroonRefresher(renew))
+    """
+
+    def __init__(
+        self,
+        refresh_fn: Callable,
+        refresh_before: float = 300.0,
+        retry_interval: float = 30.0,
+        max_workers: int = 1,
+    ):
+        self.refresh_fn = refresh_fn
+        self.refresh_before = refresh_before
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        # Hash of the macaroons -> when they can be refreshed again
+        self._attempts: Dict[str, float] = {}
+        self._pool = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="store-api-macaroon-refresh"
+        )
+        self._refreshed = 0
+        self._failed = 0
+
+    def maybe_refresh(self, tokens: List[str], expiry: float, session):
+        now = time()
+        if expiry - now > self.refresh_before:
+            return
+
+        key = sha256("\n".join(tokens).encode()).hexdigest()
+        with self._lock:
+            if self._attempts.get(key, 0) > now:
+                return
+            # Drop attempts past their retry interval
+            self._attempts = {
+                k: until for k, until in self._attempts.items() if until > now
+            }
+            self._attempts[key] = now + self.retry_interval
+
+        self._pool.submit(copy_context().run, self._refresh, session)
+
+    def _refresh(self, session):
+        try:
+            self.refresh_fn(session)
+        except Exception:
+            logger.exception("Macaroon refresh failed")
+            with self._lock:
+                self._failed += 1
+            return
+        with self._lock:
+            self._refreshed += 1
+
+    def stats(self) -> dict:
+        """
+        Return how many refreshes succeeded and failed
+        """
+        with self._lock:
+            return {"refreshed": self._refreshed, "failed": self._failed}
+
+
+class BoundMacaroonCache:
+    """
+    Remember discharge macaroons bound to their root macaroon, since
+    binding deserializes both macaroons and signs the discharge on every
+    request while the pair doesn't change for a whole user session.
+
+    Pairs are keyed by a hash of the serialized macaroons and kept in a
+    thread-safe LRU of `maxsize` entries, until the earliest time caveat of
+    the pair expires or for at most `max_ttl` seconds. Expired pairs are
+    bound on every call and never cached.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = MACAROON_CACHE_SIZE,
+        max_ttl: float = MACAROON_CACHE_TTL,
+    ):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._lock = threading.Lock()
+        self._cache = None
+        self._hits = 0
+        self._misses = 0
+
+    def _get_cache(self):
+        if self._cache is None:
+            # Entries are (bound discharge, expiry timestamp)
+            self._cache = cachetools.TLRUCache(
+                maxsize=self.maxsize,
+                ttu=lambda key, value, now: value[1],
+                timer=time,
+            )
+        return self._cache
+
+    def bind(self, root: str, discharge: str) -> str:
+        """
+        Return the `discharge` macaroon bound to `root`, serialized
+        """
+        key = sha256(f"{root}\n{discharge}".encode()).hexdigest()
+        with self._lock:
+            cached = self._get_cache().get(key)
+            if cached is not None:
+                self._hits += 1
+                return cached[0]
+            self._misses += 1
+
+        root_macaroon = pymacaroons.Macaroon.deserialize(root)
+        discharge_macaroon = pymacaroons.Macaroon.deserialize(discharge)
+        bound = root_macaroon.prepare_for_request(
+            discharge_macaroon
+        ).serialize()
+
+        now = time()
+        expires = now + self.max_ttl
+        expiry = macaroon_expiry([root_macaroon, discharge_macaroon])
+        if expiry is not None:
+            expires = min(expires, expiry)
+        if expires > now:
+            with self._lock:
+                self._get_cache()[key] = (bound, expires)
+        return bound
+
+    def clear(self):
+        with self._lock:
+            if self._cache is not None:
+                self._cache.clear()
+
+    def stats(self) -> dict:
+        """
+        Return how many bindings were served from the cache or computed,
+        and how many pairs are cached
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size": len(self._cache) if self._cache is not None else 0,
+            }
+
+
+# Shared by every gateway of the process
+bound_macaroons = BoundMacaroonCache()
@@ -1,24 +1,40 @@
 from os import getenv
 from typing import Optional, Union
-from requests import Session
 
-from canonicalwebteam.store_api.base import Base
-from canonicalwebteam.store_api.dashboard import Dashboard
+from canonicalwebteam.store_api.base import Base, Request
+from canonicalwebteam.store_api.dashboard import get_authorization_header
+from canonicalwebteam.store_api.macaroons import (
+    MacaroonRefresher,
+    check_macaroons,
+)
+from canonicalwebteam.store_api.timeouts import DEFAULT_TIMEOUT
+from canonicalwebteam.store_api.transport import build_session
 
 PUBLISHERGW_URL = getenv("PUBLISHERGW_URL", "https://api.charmhub.io")
 VALID_NAMESPACE = ["charm", "snap"]
 CHARMSTORE_VALID_PACKAGE_TYPES = ["charm", "bundle"]
-dashboard_authorization_header = Dashboard()._get_authorization_header
+dashboard_authorization_header = get_authorization_header
 
 
-class PublisherGW(Base):
-    def __init__(self, name_space: str, session=Session()):
-        super().__init__(session)
-        self.name_space = name_space
-        self.config = {
-            1: {"base_url": f"{PUBLISHERGW_URL}/v1"},
-            2: {"base_url": f"{PUBLISHERGW_URL}/v2"},
-        }
+def build_config() -> dict:
+    """
+    Return the per API version base URLs of the publisher gateway
+    """
+    return {
+        1: {"base_url": f"{PUBLISHERGW_URL}/v1"},
+        2: {"base_url": f"{PUBLISHERGW_URL}/v2"},
+    }
+
+
+class PublisherGWRequests:
+    """
+    Build the requests sent by `PublisherGW` and `AsyncPublisherGW`, which
+    only differ in how they send them
+    """
+
+    config: dict
+    name_space: str
+    refresher: Optional[MacaroonRefresher]
 
     def get_endpoint_url(
         self, endpoint: str, version: int = 1, has_name_space: bool = False
@@ -28,24 +44,28 @@ class PublisherGW(Base):
             return f"{base_url}/{self.name_space}/{endpoint}".rstrip("/")
         return f"{base_url}/{endpoint}".rstrip("/")
 
-    # SEARCH
-    def find(
-        self,
-        query: str = "",
-        category: str = "",
-        publisher: str = "",
-        type: Optional[str] = None,
-        provides: list = [],
-        requires: list = [],
-        fields: list = [],
-    ) -> dict:
+    def _get_authorization_header(self, session: str) -> dict:
         """
-        Given a search term, return an array of matching search results.
-        v2 API only.
-
-        Documentation: https://api.snapcraft.io/docs/charms.html#charm_find
-        Endpoint: https://api.charmhub.io/v2/{name_space}/find
+        Return the formatted Authorization header for the publisher API.
         """
+        check_macaroons([session], session, self.refresher)
+        return {"Authorization": f"Macaroon {session}"}
+
+    def _get_dev_token_authorization_header(self, session: dict):
+        check_macaroons([session["developer_token"]], session, self.refresher)
+        return {"Authorization": f"Macaroon {session['developer_token']}"}
+
+    # SEARCH
+    def _find_request(
+        self,
+        query: str,
+        category: str,
+        publisher: str,
+        type: Optional[str],
+        provides: list,
+        requires: list,
+        fields: list,
+    ) -> Request:
         url = self.get_endpoint_url(f"{self.name_space}s/find", 2)
         headers = self.config[2].get("headers")
         params = {
@@ -63,8 +83,485 @@ class PublisherGW(Base):
         if requires:
             params["requires"] = ",".join(requires)
 
+        return "GET", url, {"params": params, "headers": headers}
+
+    # CATEGORIES
+    def _get_categories_request(self, api_version: int, type: str) -> Request:
+        url = self.get_endpoint_url("charms/categories", api_version)
+        return (
+            "GET",
+            url,
+            {
+                "headers": self.config[api_version].get("headers"),
+                "params": {"type": type},
+            },
+        )
+
+    # AUTH AND MACAROONS
+    def _get_macaroon_request(self) -> Request:
+        return "GET", self.get_endpoint_url("tokens"), {}
+
+    def _issue_macaroon_request(
+        self,
+        permissions: list,
+        description: Optional[list],
+        ttl: Optional[list],
+    ) -> Request:
+        data = {"permissions": permissions}
+
+        if description:
+            data["description"] = description
+
+        if ttl:
+            data["ttl"] = ttl
+
+        return "POST", self.get_endpoint_url("tokens"), {"json": data}
+
+    def _issue_usso_macaroon_request(
+        self,
+        ttl: int,
+        permissions: list,
+        channels: Optional[list],
+        packages: Optional[list],
+    ) -> Request:
+        if not permissions:
+            raise ValueError("permissions must contain at least one entry")
+
+        data = {"ttl": ttl, "permissions": permissions}
+
+        if channels is not None:
+            data["channels"] = channels
+
+        if packages is not None:
+            data["packages"] = packages
+
+        return "POST", self.get_endpoint_url("tokens/usso"), {"json": data}
+
+    def _exchange_request(
+        self, endpoint: str, headers: dict, json: dict
+    ) -> Request:
+        return (
+            "POST",
+            self.get_endpoint_url(endpoint),
+            {"headers": headers, "json": json},
+        )
+
+    def _usso_authorization_header(
+        self, root_macaroon: str, discharge_macaroon: str
+    ) -> dict:
+        return {
+            "Authorization": (
+                "Macaroon "
+                f"root={root_macaroon}, "
+                f"discharge={discharge_macaroon}"
+            )
+        }
+
+    def _macaroon_info_request(self, publisher_auth: str) -> Request:
+        return (
+            "GET",
+            self.get_endpoint_url("tokens/whoami"),
+            {"headers": self._get_authorization_header(publisher_auth)},
+        )
+
+    # PACKAGES MANAGEMENT
+    def _get_account_packages_request(
+        self,
+        publisher_auth: str,
+        package_type: str,
+        include_collaborations: bool,
+    ) -> Request:
+        if (
+            self.name_space == "charms"
+            and package_type not in CHARMSTORE_VALID_PACKAGE_TYPES
+        ):
+            raise ValueError(
+                "Invalid package type. Expected one of: %s"
+                % CHARMSTORE_VALID_PACKAGE_TYPES
+            )
+
+        params = {}
+
+        if include_collaborations:
+            params["include-collaborations"] = "true"
+        return (
+            "GET",
+            self.get_endpoint_url(package_type),
+            {
+                "headers": self._get_authorization_header(publisher_auth),
+                "params": params,
+            },
+        )
+
+    def _get_package_metadata_request(
+        self, session: dict, package_name: str
+    ) -> Request:
+        return (
+            "GET",
+            self.get_endpoint_url(f"{package_name}", has_name_space=True),
+            {"headers": self._get_dev_token_authorization_header(session)},
+        )
+
+    def _update_package_metadata_request(
+        self, publisher_auth: str, package_type: str, name: str, data: dict
+    ) -> Request:
+        if (
+            self.name_space == "charm"
+            and package_type not in CHARMSTORE_VALID_PACKAGE_TYPES
+        ):
+            raise ValueError(
+                "Invalid package type. Expected one of: %s"
+                % CHARMSTORE_VALID_PACKAGE_TYPES
+            )
+
+        return (
+            "PATCH",
+            self.get_endpoint_url(f"{package_type}/{name}"),
+            {
+                "headers": self._get_authorization_header(publisher_auth),
+                "json": data,
+            },
+        )
+
+    def _register_package_name_request(
+        self, publisher_auth: str, data: dict
+    ) -> Request:
+        return (
+            "POST",
+            self.get_endpoint_url("", has_name_space=True),
+            {
+                "headers": self._get_authorization_header(publisher_auth),
+                "json": data,
+            },
+        )
+
+    def _unregister_package_name_request(
+        self, publisher_auth: Union[str, dict], package_name: str
+    ) -> Request:
+        url = self.get_endpoint_url(package_name, has_name_space=True)
+        if self.name_space == "snap":
+            # for Snap packages, `unregister_package` uses SCA's API under the
+            # hood: this means we must pass the authorization header as if
+            # we were calling SCA
+            if not isinstance(publisher_auth, dict):
+                raise TypeError(
+                    "Name space 'snap' requires a 'dict' as 'publisher_auth'"
+                )
+            authorization_header = dashboard_authorization_header(
+                publisher_auth, self.refresher
+            )
+        else:
+            if not isinstance(publisher_auth, str):
+                raise TypeError(
+                    f"Name space '{self.name_space}' requires a 'str' as "
+                    "'publisher_auth'"
+                )
+            authorization_header = self._get_authorization_header(
+                publisher_auth
+            )
+        return "DELETE", url, {"headers": authorization_header}
+
+    def _get_charm_libraries_request(self, package_name: str) -> Request:
+        return (
+            "POST",
+            self.get_endpoint_url("libraries/bulk", has_name_space=True),
+            {"json": [{"charm-name": package_name}]},
+        )
+
+    def _get_charm_library_request(
+        self, charm_name: str, library_id: str, api_version: Optional[int]
+    ) -> Request:
+        params = {}
+
+        if api_version is not None:
+            params["api"] = api_version
+        return (
+            "GET",
+            self.get_endpoint_url(
+                f"charm/libraries/{charm_name}/{library_id}"
+            ),
+            {"params": params},
+        )
+
+    def _get_releases_request(
+        self, publisher_auth: str, package_name: str
+    ) -> Request:
+        return (
+            "GET",
+            self.get_endpoint_url(
+                f"{package_name}/releases", has_name_space=True
+            ),
+            {"headers": self._get_authorization_header(publisher_auth)},
+        )
+
+    def _get_item_details_request(
+        self,
+        name: str,
+        channel: Optional[str],
+        fields: list,
+        api_version: int,
+    ) -> Request:
+        url = self.get_endpoint_url(
+            f"{self.name_space}s/info/{name}", api_version
+        )
+        params = {}
+        if fields:
+            params["fields"] = ",".join(fields)
+        if channel:
+            params["channel"] = channel
+        headers = self.config[api_version].get("headers")
+        return "GET", url, {"params": params, "headers": headers}
+
+    # COLLABORATORS
+    def _collaborators_request(
+        self,
+        method: str,
+        publisher_auth: str,
+        package_name: str,
+        endpoint: str = "",
+        **kwargs,
+    ) -> Request:
+        """
+        Build a request to the collaborators of `package_name`, or to one
+        of their `endpoint`s (e.g. "invites")
+        """
+        url = self.get_endpoint_url(
+            f"{package_name}/collaborators/{endpoint}", has_name_space=True
+        )
+        kwargs["headers"] = self._get_authorization_header(publisher_auth)
+        return method, url, kwargs
+
+    def _invites_request(
+        self, publisher_auth: str, package_name: str, emails: list, action=""
+    ) -> Request:
+        payload: dict = {"invites": []}
+
+        for email in emails:
+            payload["invites"].append({"email": email})
+
+        return self._collaborators_request(
+            "POST",
+            publisher_auth,
+            package_name,
+            f"invites/{action}",
+            json=payload,
+        )
+
+    def _reject_invite_request(
+        self, publisher_auth: str, package_name: str, token: str
+    ) -> Request:
+        return (
+            "POST",
+            self.get_endpoint_url(
+                f"{package_name}/collaborators/invites/reject"
+            ),
+            {
+                "headers": self._get_authorization_header(publisher_auth),
+                "json": {"token": token},
+            },
+        )
+
+    # TRACKS
+    def _create_track_request(
+        self,
+        session: dict,
+        package_name: str,
+        track_name: str,
+        version_pattern: Optional[str],
+        auto_phasing_percentage: Optional[str],
+    ) -> Request:
+        payload = {
+            "name": track_name,
+            "version-pattern": version_pattern,
+            "automatic-phasing-percentage": auto_phasing_percentage,
+        }
+        return (
+            "POST",
+            self.get_endpoint_url(
+                f"{package_name}/tracks", has_name_space=True
+            ),
+            {
+                "headers": self._get_dev_token_authorization_header(session),
+                "json": [payload],
+            },
+        )
+
+    # MODEL SERVICE ADMIN
+    def _brand_request(
+        self,
+        method: str,
+        session: dict,
+        store_id: str,
+        endpoint: str = "",
+        **kwargs,
+    ) -> Request:
+        """
+        Build a request to the brand store `store_id`, or to one of its
+        `endpoint`s (e.g. "model"), with the developer token of `session`
+        """
+        url = self.get_endpoint_url(f"brand/{store_id}/{endpoint}")
+        kwargs["headers"] = self._get_dev_token_authorization_header(session)
+        return method, url, kwargs
+
+    def _create_store_model_request(
+        self, session: dict, store_id: str, name: str, api_key: Optional[str]
+    ) -> Request:
+        if api_key:
+            payload = {"name": name, "api-key": api_key, "series": "16"}
+        else:
+            payload = {"name": name, "series": "16"}
+        return self._brand_request(
+            "POST", session, store_id, "model", json=payload
+        )
+
+    def _get_store_model_serial_logs_request(
+        self, session: dict, store_id: str, model_name: str, params: dict
+    ) -> Request:
+        query_params = {}
+
+        if params["start_time"] is not None:
+            query_params["start-time"] = params["start_time"]
+
+        if params["end_time"] is not None:
+            query_params["end-time"] = params["end_time"]
+
+        if params["page_size"] is not None:
+            query_params["page-size"] = params["page_size"]
+
+        if params["cursor"] is not None:
+            query_params["cursor"] = params["cursor"]
+
+        return self._brand_request(
+            "GET",
+            session,
+            store_id,
+            f"model/{model_name}/serial-log",
+            params=query_params,
+        )
+
+    def _get_store_model_serial_log_request(
+        self,
+        session: dict,
+        store_id: str,
+        model_name: str,
+        serial: str,
+        include_serial_assertion,
+        include_serial_request_assertion,
+    ) -> Request:
+        params = {}
+
+        if include_serial_assertion is not None:
+            params["include-serial-assertion"] = "true"
+
+        if include_serial_request_assertion is not None:
+            params["include-serial-request-assertion"] = "true"
+
+        return self._brand_request(
+            "GET",
+            session,
+            store_id,
+            f"model/{model_name}/serial/{serial}/serial-log",
+            params=params,
+        )
+
+    def _get_remodel_allowlist_request(
+        self, session: dict, store_id: str, params: dict
+    ) -> Request:
+        query_params = {}
+
+        if params["cursor"] is not None:
+            query_params["cursor"] = params["cursor"]
+
+        if params.get("from-model") is not None:
+            query_params["from-model"] = params["from-model"]
+
+        if params.get("to-model") is not None:
+            query_params["to-model"] = params.get("to-model")
+
+        if params["page-size"] is not None:
+            query_params["page-size"] = params["page-size"]
+
+        return self._brand_request(
+            "GET", session, store_id, "remodel-allowlist", params=query_params
+        )
+
+    # FEATURED SNAP AUTOMATION
+    def _featured_snaps_request(
+        self, method: str, publisher_auth: str, json
+    ) -> Request:
+        headers = self._get_authorization_header(publisher_auth)
+        url = self.get_endpoint_url("snap/featured")
+        return method, url, {"headers": headers, "json": json}
+
+
+class PublisherGW(PublisherGWRequests, Base):
+    def __init__(
+        self,
+        name_space: str,
+        session=None,
+        timeout=DEFAULT_TIMEOUT,
+        coalesce=False,
+        circuit_breaker=None,
+        hedging=None,
+        limiter=None,
+        rate_limiter=None,
+        refresher=None,
+        refresh_coordinator=None,
+        exchange_cache=None,
+    ):
+        if session is None:
+            session = build_session([PUBLISHERGW_URL])
+        super().__init__(
+            session,
+            timeout,
+            coalesce,
+            circuit_breaker,
+            hedging,
+            limiter,
+            rate_limiter,
+        )
+        # Renews macaroons close to expiry, see `MacaroonRefresher`
+        self.refresher = refresher
+        self.name_space = name_space
+        self.config = build_config()
+        # Shares exchanged macaroons between workers, see `ExchangeCache`
+        self.exchange_cache = exchange_cache
+        self.refresh_coordinator = refresh_coordinator
+        if refresh_coordinator is not None:
+            # Refresh expired credentials and replay calls, see
+            # `RefreshCoordinator`
+            refresh_coordinator.bind(self)
+
+    # SEARCH
+    def find(
+        self,
+        query: str = "",
+        category: str = "",
+        publisher: str = "",
+        type: Optional[str] = None,
+        provides: list = [],
+        requires: list = [],
+        fields: list = [],
+    ) -> dict:
+        """
+        Given a search term, return an array of matching search results.
+        v2 API only.
+
+        Documentation: https://api.snapcraft.io/docs/charms.html#charm_find
+        Endpoint: https://api.charmhub.io/v2/{name_space}/find
+        """
         return self.process_response(
-            self.session.get(url, params=params, headers=headers)
+            self._fetch(
+                self._find_request(
+                    query,
+                    category,
+                    publisher,
+                    type,
+                    provides,
+                    requires,
+                    fields,
+                )
+            )
         )
 
     # CATEGORIES
@@ -75,33 +572,18 @@ class PublisherGW(Base):
         Documentation: https://api.snapcraft.io/docs/categories.html
         Endpoint: https://api.charmhub.io/v2/{name_space}/categories
         """
-        url = self.get_endpoint_url("charms/categories", api_version)
         return self.process_response(
-            self.session.get(
-                url,
-                headers=self.config[api_version].get("headers"),
-                params={"type": type},
-            )
+            self._fetch(self._get_categories_request(api_version, type))
         )
 
     # AUTH AND MACAROONS
-
-    def _get_authorization_header(self, session: str) -> dict:
-        """
-        Return the formatted Authorization header for the publisher API.
-        """
-        return {"Authorization": f"Macaroon {session}"}
-
-    def _get_dev_token_authorization_header(self, session: dict):
-        return {"Authorization": f"Macaroon {session['developer_token']}"}
-
     def get_macaroon(self) -> str:
         """
         Return existing macaroons for the authenticated account.
         Documentation: https://api.charmhub.io/docs/default.html#get_macaroon
         Endpoint URL: [GET] https://api.charmhub.io/v1/tokens
         """
-        response = self.session.get(url=self.get_endpoint_url("tokens"))
+        response = self._fetch(self._get_macaroon_request())
         return self.process_response(response)["macaroon"]
 
     def issue_macaroon(
@@ -115,17 +597,8 @@ class PublisherGW(Base):
         Documentation: https://api.charmhub.io/docs/default.html#issue_macaroon
         Endpoint URL: [POST] https://api.charmhub.io/v1/tokens
         """
-        data = {"permissions": permissions}
-
-        if description:
-            data["description"] = description
-
-        if ttl:
-            data["ttl"] = ttl
-
-        response = self.session.post(
-            url=self.get_endpoint_url("tokens"),
-            json=data,
+        response = self._fetch(
+            self._issue_macaroon_request(permissions, description, ttl)
         )
         return self.process_response(response)["macaroon"]
 
@@ -140,23 +613,30 @@ class PublisherGW(Base):
         Return a root macaroon to be discharged by Ubuntu SSO.
         Endpoint URL: [POST] https://api.charmhub.io/v1/tokens/usso
         """
-        if not permissions:
-            raise ValueError("permissions must contain at least one entry")
-
-        data = {"ttl": ttl, "permissions": permissions}
+        response = self._fetch(
+            self._issue_usso_macaroon_request(
+                ttl, permissions, channels, packages
+            )
+        )
 
-        if channels is not None:
-            data["channels"] = channels
+        return self.process_response(response)["macaroon"]
 
-        if packages is not None:
-            data["packages"] = packages
+    def _exchange(self, endpoint: str, headers: dict, json: dict) -> str:
+        """
+        Send credentials to a token exchange endpoint and return the
+        exchanged macaroon, from the exchange cache if possible
+        """
+        if self.exchange_cache is not None:
+            cached = self.exchange_cache.get(endpoint, headers, json)
+            if cached is not None:
+                return cached
 
-        response = self.session.post(
-            url=self.get_endpoint_url("tokens/usso"),
-            json=data,
-        )
+        response = self._fetch(self._exchange_request(endpoint, headers, json))
+        macaroon = self.process_response(response)["macaroon"]
 
-        return self.process_response(response)["macaroon"]
+        if self.exchange_cache is not None:
+            self.exchange_cache.set(endpoint, headers, json, macaroon)
+        return macaroon
 
     def exchange_macaroons(self, issued_macaroon: str) -> str:
         """
@@ -165,15 +645,10 @@ class PublisherGW(Base):
             https://api.charmhub.io/docs/default.html#exchange_macaroons
         Endpoint URL: [POST] https://api.charmhub.io/v1/tokens/exchange
         """
-
-        response = self.session.post(
-            url=self.get_endpoint_url("tokens/exchange"),
-            headers={"Macaroons": issued_macaroon},
-            json={},
+        return self._exchange(
+            "tokens/exchange", {"Macaroons": issued_macaroon}, {}
         )
 
-        return self.process_response(response)["macaroon"]
-
     def exchange_usso_macaroons(
         self,
         root_macaroon: str,
@@ -188,20 +663,12 @@ class PublisherGW(Base):
         if client_description is not None:
             data["client-description"] = client_description
 
-        response = self.session.post(
-            url=self.get_endpoint_url("tokens/usso/exchange"),
-            headers={
-                "Authorization": (
-                    "Macaroon "
-                    f"root={root_macaroon}, "
-                    f"discharge={discharge_macaroon}"
-                )
-            },
-            json=data,
+        return self._exchange(
+            "tokens/usso/exchange",
+            self._usso_authorization_header(root_macaroon, discharge_macaroon),
+            data,
         )
 
-        return self.process_response(response)["macaroon"]
-
     def exchange_dashboard_macaroons(self, session: dict) -> str:
         """
         Exchange dashboard.snapcraft.io SSO discharged macaroons
@@ -209,13 +676,11 @@ class PublisherGW(Base):
             https://api.charmhub.io/docs/default.html#exchange_dashboard_macaroons
         Endpoint: [POST] https://api.charmhub.io/v1/tokens/dashboard/exchange
         """
-        url = self.get_endpoint_url("tokens/dashboard/exchange")
-        response = self.session.post(
-            url=url,
-            headers=dashboard_authorization_header(session),
-            json={},
+        return self._exchange(
+            "tokens/dashboard/exchange",
+            dashboard_authorization_header(session, self.refresher),
+            {},
         )
-        return self.process_response(response)["macaroon"]
 
     def macaroon_info(self, publisher_auth: str) -> dict:
         """
@@ -223,13 +688,10 @@ class PublisherGW(Base):
         Documentation: https://api.charmhub.io/docs/default.html#macaroon_info
         Endpoint URL: [GET] https://api.charmhub.io/v1/tokens/whoami
         """
-        response = self.session.get(
-            url=self.get_endpoint_url("tokens/whoami"),
-            headers=self._get_authorization_header(publisher_auth),
+        return self.process_response(
+            self._fetch(self._macaroon_info_request(publisher_auth))
         )
 
-        return self.process_response(response)
-
     # PACKAGES MANAGEMENT
     def get_account_packages(
         self,
@@ -252,24 +714,10 @@ class PublisherGW(Base):
         Returns:
             A list of packages
         """
-
-        if (
-            self.name_space == "charms"
-            and package_type not in CHARMSTORE_VALID_PACKAGE_TYPES
-        ):
-            raise ValueError(
-                "Invalid package type. Expected one of: %s"
-                % CHARMSTORE_VALID_PACKAGE_TYPES
+        response = self._fetch(
+            self._get_account_packages_request(
+                publisher_auth, package_type, include_collaborations
             )
-
-        params = {}
-
-        if include_collaborations:
-            params["include-collaborations"] = "true"
-        response = self.session.get(
-            url=self.get_endpoint_url(package_type),
-            headers=self._get_authorization_header(publisher_auth),
-            params=params,
         )
         packages = self.process_response(response)["results"]
 
@@ -295,13 +743,12 @@ class PublisherGW(Base):
         Returns:
             Package general metadata
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(f"{package_name}", has_name_space=True),
-            headers=self._get_dev_token_authorization_header(session),
+        processed_response = self.process_response(
+            self._fetch(
+                self._get_package_metadata_request(session, package_name)
+            )
         )
 
-        processed_response = self.process_response(response)
-
         if "metadata" not in processed_response:
             return processed_response
 
@@ -328,23 +775,13 @@ class PublisherGW(Base):
         Returns:
             Package general metadata with changes applied
         """
-
-        if (
-            self.name_space == "charm"
-            and package_type not in CHARMSTORE_VALID_PACKAGE_TYPES
-        ):
-            raise ValueError(
-                "Invalid package type. Expected one of: %s"
-                % CHARMSTORE_VALID_PACKAGE_TYPES
+        return self.process_response(
+            self._fetch(
+                self._update_package_metadata_request(
+                    publisher_auth, package_type, name, data
+                )
             )
-
-        response = self.session.patch(
-            url=self.get_endpoint_url(f"{package_type}/{name}"),
-            headers=self._get_authorization_header(publisher_auth),
-            json=data,
-        )
-
-        return self.process_response(response)["metadata"]
+        )["metadata"]
 
     def register_package_name(self, publisher_auth: str, data: dict) -> dict:
         """
@@ -359,15 +796,12 @@ class PublisherGW(Base):
         Returns:
             Newly registered name id
         """
-
-        response = self.session.post(
-            url=self.get_endpoint_url("", has_name_space=True),
-            headers=self._get_authorization_header(publisher_auth),
-            json=data,
+        return self.process_response(
+            self._fetch(
+                self._register_package_name_request(publisher_auth, data)
+            )
         )
 
-        return self.process_response(response)
-
     def unregister_package_name(
         self, publisher_auth: Union[str, dict], package_name: str
     ) -> dict:
@@ -384,32 +818,9 @@ class PublisherGW(Base):
             The package name ID if successful
             Otherwise, returns an error list
         """
-        url = self.get_endpoint_url(package_name, has_name_space=True)
-        if self.name_space == "snap":
-            # for Snap packages, `unregister_package` uses SCA's API under the
-            # hood: this means we must pass the authorization header as if
-            # we were calling SCA
-            if not isinstance(publisher_auth, dict):
-                raise TypeError(
-                    "Name space 'snap' requires a 'dict' as 'publisher_auth'"
-                )
-            authorization_header = dashboard_authorization_header(
-                publisher_auth
-            )
-        else:
-            if not isinstance(publisher_auth, str):
-                raise TypeError(
-                    f"Name space '{self.name_space}' requires a 'str' as "
-                    "'publisher_auth'"
-                )
-            authorization_header = self._get_authorization_header(
-                publisher_auth
-            )
-        response = self.session.delete(
-            url=url,
-            headers=authorization_header,
+        return self._fetch(
+            self._unregister_package_name_request(publisher_auth, package_name)
         )
-        return response
 
     def get_charm_libraries(self, package_name: str) -> dict:
         """
@@ -419,14 +830,10 @@ class PublisherGW(Base):
         Endpoint URL: [POST]
         https://api.charmhub.io/v1/{name_space}/libraries/bulk
         """
-
-        response = self.session.post(
-            url=self.get_endpoint_url("libraries/bulk", has_name_space=True),
-            json=[{"charm-name": package_name}],
+        return self.process_response(
+            self._fetch(self._get_charm_libraries_request(package_name))
         )
 
-        return self.process_response(response)
-
     def get_charm_library(
         self,
         charm_name: str,
@@ -445,19 +852,14 @@ class PublisherGW(Base):
             library_id: ID of the library
             api_version: API version to use
         """
-        params = {}
-
-        if api_version is not None:
-            params["api"] = api_version
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"charm/libraries/{charm_name}/{library_id}"
-            ),
-            params=params,
+        return self.process_response(
+            self._fetch(
+                self._get_charm_library_request(
+                    charm_name, library_id, api_version
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def get_releases(self, publisher_auth: str, package_name: str) -> dict:
         """
         List of all releases for a package.
@@ -470,13 +872,11 @@ class PublisherGW(Base):
             publisher_auth: Serialized macaroon to consume the API.
             name: Name of the package
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"{package_name}/releases", has_name_space=True
-            ),
-            headers=self._get_authorization_header(publisher_auth),
+        return self.process_response(
+            self._fetch(
+                self._get_releases_request(publisher_auth, package_name)
+            )
         )
-        return self.process_response(response)
 
     def get_item_details(
         self,
@@ -490,20 +890,11 @@ class PublisherGW(Base):
         Endpoint: [GET]
             https://api.charmhub.io/api/v2/{name_space}/info/{package_name}
         """
-        url = self.get_endpoint_url(
-            f"{self.name_space}s/info/{name}", api_version
-        )
-        params = {}
-        if fields:
-            params["fields"] = ",".join(fields)
-        if channel:
-            params["channel"] = channel
-        headers = self.config[api_version].get("headers")
         return self.process_response(
-            self.session.get(
-                url,
-                params=params,
-                headers=headers,
+            self._fetch(
+                self._get_item_details_request(
+                    name, channel, fields, api_version
+                )
             )
         )
 
@@ -523,13 +914,13 @@ class PublisherGW(Base):
             name_space: Namespace of the package, can be 'snap' or 'charm'.
             package_name: Name of the package
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"{package_name}/collaborators", has_name_space=True
-            ),
-            headers=self._get_authorization_header(publisher_auth),
+        return self.process_response(
+            self._fetch(
+                self._collaborators_request(
+                    "GET", publisher_auth, package_name
+                )
+            )
         )
-        return self.process_response(response)
 
     def get_pending_invites(
         self, publisher_auth: str, package_name: str
@@ -546,13 +937,13 @@ class PublisherGW(Base):
             name_space: Namespace of the package, can be 'snap' or 'charm'.
             package_name: Name of the package
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"{package_name}/collaborators/invites", has_name_space=True
-            ),
-            headers=self._get_authorization_header(publisher_auth),
+        return self.process_response(
+            self._fetch(
+                self._collaborators_request(
+                    "GET", publisher_auth, package_name, "invites"
+                )
+            )
         )
-        return self.process_response(response)
 
     def invite_collaborators(
         self, publisher_auth: str, package_name: str, emails: list
@@ -570,19 +961,11 @@ class PublisherGW(Base):
             package_name: Name of the package
             emails: List of emails to invite
         """
-        payload: dict = {"invites": []}
-
-        for email in emails:
-            payload["invites"].append({"email": email})
-
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"{package_name}/collaborators/invites", has_name_space=True
-            ),
-            headers=self._get_authorization_header(publisher_auth),
-            json=payload,
+        return self.process_response(
+            self._fetch(
+                self._invites_request(publisher_auth, package_name, emails)
+            )
         )
-        return self.process_response(response)
 
     def revoke_invites(
         self, publisher_auth: str, package_name: str, emails: list
@@ -599,20 +982,11 @@ class PublisherGW(Base):
             name: Name of the package
             emails: List of emails to revoke
         """
-        payload: dict = {"invites": []}
-
-        for email in emails:
-            payload["invites"].append({"email": email})
-
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"{package_name}/collaborators/invites/revoke",
-                has_name_space=True,
-            ),
-            headers=self._get_authorization_header(publisher_auth),
-            json=payload,
+        return self._fetch(
+            self._invites_request(
+                publisher_auth, package_name, emails, "revoke"
+            )
         )
-        return response
 
     def accept_invite(
         self, publisher_auth: str, package_name: str, token: str
@@ -629,13 +1003,14 @@ class PublisherGW(Base):
             name: Name of the package
             token: Invite token
         """
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"{package_name}/collaborators/invites/accept",
-                has_name_space=True,
-            ),
-            headers=self._get_authorization_header(publisher_auth),
-            json={"token": token},
+        response = self._fetch(
+            self._collaborators_request(
+                "POST",
+                publisher_auth,
+                package_name,
+                "invites/accept",
+                json={"token": token},
+            )
         )
         if not response.ok:
             self.process_response(response)
@@ -656,14 +1031,9 @@ class PublisherGW(Base):
             name: Name of the package
             token: Invite token
         """
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"{package_name}/collaborators/invites/reject"
-            ),
-            headers=self._get_authorization_header(publisher_auth),
-            json={"token": token},
+        return self._fetch(
+            self._reject_invite_request(publisher_auth, package_name, token)
         )
-        return response
 
     # TRACKS
     def create_track(
@@ -688,20 +1058,15 @@ class PublisherGW(Base):
             version_pattern: Version pattern for the track (optional)
             auto_phasing_percentage: phasing percentage for track (optional)
         """
-
-        payload = {
-            "name": track_name,
-            "version-pattern": version_pattern,
-            "automatic-phasing-percentage": auto_phasing_percentage,
-        }
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"{package_name}/tracks", has_name_space=True
-            ),
-            headers=self._get_dev_token_authorization_header(session),
-            json=[payload],
+        return self._fetch(
+            self._create_track_request(
+                session,
+                package_name,
+                track_name,
+                version_pattern,
+                auto_phasing_percentage,
+            )
         )
-        return response
 
     # MODEL SERVICE ADMIN
     def get_store_models(self, session: dict, store_id: str) -> dict:
@@ -710,13 +1075,10 @@ class PublisherGW(Base):
             https://api.charmhub.io/docs/model-service-admin.html#read_models
         Endpoint: [GET] https://api.charmhub.io/v1/brand/{store_id}/model
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(f"brand/{store_id}/model"),
-            headers=self._get_dev_token_authorization_header(session),
+        return self.process_response(
+            self._fetch(self._brand_request("GET", session, store_id, "model"))
         )
 
-        return self.process_response(response)
-
     def create_store_model(
         self,
         session: dict,
@@ -729,18 +1091,14 @@ class PublisherGW(Base):
             https://api.charmhub.io/docs/model-service-admin.html#create_model
         Endpoint: [POST] https://api.charmhub.io/v1/brand/{store_id}/model
         """
-        if api_key:
-            payload = {"name": name, "api-key": api_key, "series": "16"}
-        else:
-            payload = {"name": name, "series": "16"}
-        response = self.session.post(
-            url=self.get_endpoint_url(f"brand/{store_id}/model"),
-            headers=self._get_dev_token_authorization_header(session),
-            json=payload,
+        return self.process_response(
+            self._fetch(
+                self._create_store_model_request(
+                    session, store_id, name, api_key
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def update_store_model(
         self, session: dict, store_id: str, model_name: str, api_key: str
     ) -> dict:
@@ -750,14 +1108,18 @@ class PublisherGW(Base):
         Endpoint: [PATCH]
             https://api.charmhub.io/v1/brand/{store_id}/model/{model_name}
         """
-        response = self.session.patch(
-            url=self.get_endpoint_url(f"brand/{store_id}/model/{model_name}"),
-            headers=self._get_dev_token_authorization_header(session),
-            json={"api-key": api_key},
+        return self.process_response(
+            self._fetch(
+                self._brand_request(
+                    "PATCH",
+                    session,
+                    store_id,
+                    f"model/{model_name}",
+                    json={"api-key": api_key},
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def get_store_model_serial_logs(
         self, session: dict, store_id: str, model_name: str, params: dict
     ) -> dict:
@@ -768,32 +1130,14 @@ class PublisherGW(Base):
             https://api.charmhub.io/v1/brand/{store_id}/model/{model_name}/serial-log
 
         """
-        request_url = self.get_endpoint_url(
-            f"brand/{store_id}/model/{model_name}/serial-log"
-        )
-
-        query_params = {}
-
-        if params["start_time"] is not None:
-            query_params["start-time"] = params["start_time"]
-
-        if params["end_time"] is not None:
-            query_params["end-time"] = params["end_time"]
-
-        if params["page_size"] is not None:
-            query_params["page-size"] = params["page_size"]
-
-        if params["cursor"] is not None:
-            query_params["cursor"] = params["cursor"]
-
-        response = self.session.get(
-            url=request_url,
-            headers=self._get_dev_token_authorization_header(session),
-            params=query_params,
+        return self.process_response(
+            self._fetch(
+                self._get_store_model_serial_logs_request(
+                    session, store_id, model_name, params
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def get_store_model_serial_log(
         self,
         session: dict,
@@ -810,26 +1154,19 @@ class PublisherGW(Base):
             https://api.charmhub.io/v1/brand/{store_id}/model/{model_name}/serial/{serial}/serial-log
 
         """
-        request_url = self.get_endpoint_url(
-            f"brand/{store_id}/model/{model_name}/serial/{serial}/serial-log"
-        )
-
-        params = {}
-
-        if include_serial_assertion is not None:
-            params["include-serial-assertion"] = "true"
-
-        if include_serial_request_assertion is not None:
-            params["include-serial-request-assertion"] = "true"
-
-        response = self.session.get(
-            url=request_url,
-            headers=self._get_dev_token_authorization_header(session),
-            params=params,
+        return self.process_response(
+            self._fetch(
+                self._get_store_model_serial_log_request(
+                    session,
+                    store_id,
+                    model_name,
+                    serial,
+                    include_serial_assertion,
+                    include_serial_request_assertion,
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def get_store_model_policies(
         self, session: dict, store_id: str, model_name: str
     ) -> dict:
@@ -839,15 +1176,17 @@ class PublisherGW(Base):
         Endpoint: [GET]
             https://api.charmhub.io/v1/brand/{store_id}/model/<model_name>/serial_policy
         """
-        response = self.session.get(
-            url=self.get_endpoint_url(
-                f"brand/{store_id}/model/{model_name}/serial_policy"
-            ),
-            headers=self._get_dev_token_authorization_header(session),
+        return self.process_response(
+            self._fetch(
+                self._brand_request(
+                    "GET",
+                    session,
+                    store_id,
+                    f"model/{model_name}/serial_policy",
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def create_store_model_policy(
         self,
         session: dict,
@@ -861,16 +1200,18 @@ class PublisherGW(Base):
         Endpoint: [POST]
             https://api.charmhub.io/v1/brand/{store_id}/model/{model_name}/serial_policy
         """
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"brand/{store_id}/model/{model_name}/serial_policy"
-            ),
-            headers=self._get_dev_token_authorization_header(session),
-            json={"signing-key-sha3-384": signing_key},
+        return self.process_response(
+            self._fetch(
+                self._brand_request(
+                    "POST",
+                    session,
+                    store_id,
+                    f"model/{model_name}/serial_policy",
+                    json={"signing-key-sha3-384": signing_key},
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def delete_store_model_policy(
         self,
         session: dict,
@@ -884,28 +1225,26 @@ class PublisherGW(Base):
         Endpoint: [DELETE]
             https://api.charmhub.io/v1/brand/{store_id}/model/{model_name}/serial_policy/{serial_policy_revision}
         """
-        url = self.get_endpoint_url(
-            f"brand/{store_id}/model/{model_name}/serial_policy/{rev}"
-        )
-        response = self.session.delete(
-            url=url,
-            headers=self._get_dev_token_authorization_header(session),
+        return self._fetch(
+            self._brand_request(
+                "DELETE",
+                session,
+                store_id,
+                f"model/{model_name}/serial_policy/{rev}",
+            )
         )
 
-        return response
-
     def get_store_signing_keys(self, session: dict, store_id: str) -> dict:
         """
         Documentation:
             https://api.charmhub.io/docs/model-service-admin.html#read_signing_keys
         Endpoint: [GET] https://api.charmhub.io/v1/brand/{store_id}/signing_key
         """
-        headers = self._get_dev_token_authorization_header(session)
-        response = self.session.get(
-            url=self.get_endpoint_url(f"brand/{store_id}/signing_key"),
-            headers=headers,
+        return self.process_response(
+            self._fetch(
+                self._brand_request("GET", session, store_id, "signing_key")
+            )
         )
-        return self.process_response(response)
 
     def create_store_signing_key(
         self, session: dict, store_id: str, name: str
@@ -916,13 +1255,17 @@ class PublisherGW(Base):
         Endpoint: [POST]
             https://api.charmhub.io/v1/brand/{store_id}/signing_key
         """
-        headers = self._get_dev_token_authorization_header(session)
-        response = self.session.post(
-            url=self.get_endpoint_url(f"brand/{store_id}/signing_key"),
-            headers=headers,
-            json={"name": name},
+        return self.process_response(
+            self._fetch(
+                self._brand_request(
+                    "POST",
+                    session,
+                    store_id,
+                    "signing_key",
+                    json={"name": name},
+                )
+            )
         )
-        return self.process_response(response)
 
     def delete_store_signing_key(
         self, session: dict, store_id: str, signing_key_sha3_384: str
@@ -933,17 +1276,15 @@ class PublisherGW(Base):
         Endpoint: [DELETE]
             https://api.charmhub.io/v1/brand/{store_id}/signing_key/<signing_key_sha3_384}
         """
-        headers = self._get_dev_token_authorization_header(session)
-        url = self.get_endpoint_url(
-            f"brand/{store_id}/signing_key/{signing_key_sha3_384}"
-        )
-        response = self.session.delete(
-            url=url,
-            headers=headers,
+        return self._fetch(
+            self._brand_request(
+                "DELETE",
+                session,
+                store_id,
+                f"signing_key/{signing_key_sha3_384}",
+            )
         )
 
-        return response
-
     def get_remodel_allowlist(
         self, session: dict, store_id: str, params: dict
     ) -> dict:
@@ -955,28 +1296,12 @@ class PublisherGW(Base):
             [GET]
             https://api.charmhub.io/v1/brand/{store_id}/remodel-allowlist
         """
-        query_params = {}
-
-        if params["cursor"] is not None:
-            query_params["cursor"] = params["cursor"]
-
-        if params.get("from-model") is not None:
-            query_params["from-model"] = params["from-model"]
-
-        if params.get("to-model") is not None:
-            query_params["to-model"] = params.get("to-model")
-
-        if params["page-size"] is not None:
-            query_params["page-size"] = params["page-size"]
-
-        response = self.session.get(
-            url=self.get_endpoint_url(f"brand/{store_id}/remodel-allowlist"),
-            headers=self._get_dev_token_authorization_header(session),
-            params=query_params,
+        return self.process_response(
+            self._fetch(
+                self._get_remodel_allowlist_request(session, store_id, params)
+            )
         )
 
-        return self.process_response(response)
-
     def create_remodel_allowlist(
         self, session: dict, store_id: str, allowlist: list[dict]
     ) -> dict:
@@ -987,16 +1312,18 @@ class PublisherGW(Base):
         Endpoint: [POST]
             https://api.charmhub.io/v1/brand/{store_id}/remodel-allowlist
         """
-        payload = {"allowlist": allowlist}
-
-        response = self.session.post(
-            url=self.get_endpoint_url(f"brand/{store_id}/remodel-allowlist"),
-            headers=self._get_dev_token_authorization_header(session),
-            json=payload,
+        return self.process_response(
+            self._fetch(
+                self._brand_request(
+                    "POST",
+                    session,
+                    store_id,
+                    "remodel-allowlist",
+                    json={"allowlist": allowlist},
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def update_remodel_allowlist(
         self, session: dict, store_id: str, allowlist: list[dict]
     ) -> dict:
@@ -1007,16 +1334,18 @@ class PublisherGW(Base):
         Endpoint: [PATCH]
             https://api.charmhub.io/v1/brand/{store_id}/remodel-allowlist
         """
-        payload = {"allowlist": allowlist}
-
-        response = self.session.patch(
-            url=self.get_endpoint_url(f"brand/{store_id}/remodel-allowlist"),
-            headers=self._get_dev_token_authorization_header(session),
-            json=payload,
+        return self.process_response(
+            self._fetch(
+                self._brand_request(
+                    "PATCH",
+                    session,
+                    store_id,
+                    "remodel-allowlist",
+                    json={"allowlist": allowlist},
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def delete_remodel_allowlist(
         self, session: dict, store_id: str, allowlist: list[dict]
     ) -> dict:
@@ -1027,31 +1356,27 @@ class PublisherGW(Base):
         Endpoint: [POST]
             https://api.charmhub.io/v1/brand/{store_id}/remodel-allowlist/delete
         """
-        payload = {"allowlist": allowlist}
-
-        response = self.session.post(
-            url=self.get_endpoint_url(
-                f"brand/{store_id}/remodel-allowlist/delete"
-            ),
-            headers=self._get_dev_token_authorization_header(session),
-            json=payload,
+        return self.process_response(
+            self._fetch(
+                self._brand_request(
+                    "POST",
+                    session,
+                    store_id,
+                    "remodel-allowlist/delete",
+                    json={"allowlist": allowlist},
+                )
+            )
         )
 
-        return self.process_response(response)
-
     def get_brand(self, session: dict, store_id: str) -> dict:
         """
         Documentation:
             https://api.charmhub.io/docs/model-service-admin.html#read_brand
         Endpoint: [GET] https://api.charmhub.io/v1/brand/{store_id}
         """
-        headers = self._get_dev_token_authorization_header(session)
-        url = self.get_endpoint_url(f"brand/{store_id}")
-        response = self.session.get(
-            url=url,
-            headers=headers,
+        return self.process_response(
+            self._fetch(self._brand_request("GET", session, store_id))
         )
-        return self.process_response(response)
 
     # FEATURED SNAP AUTOMATION
     def delete_featured_snaps(
@@ -1062,10 +1387,9 @@ class PublisherGW(Base):
             https://docs.google.com/document/d/1UAybxuZyErh3ayqb4nzL3T4BbvMtnmKKEPu-ixcCj_8
         Endpoint: [DELETE] https://api.charmhub.io/v1/snap/featured
         """
-        headers = self._get_authorization_header(publisher_auth)
-        url = self.get_endpoint_url("snap/featured")
-        response = self.session.delete(url=url, headers=headers, json=packages)
-        return response
+        return self._fetch(
+            self._featured_snaps_request("DELETE", publisher_auth, packages)
+        )
 
     def update_featured_snaps(self, publisher_auth: str, snaps: list) -> dict:
         """
@@ -1073,11 +1397,6 @@ class PublisherGW(Base):
             https://docs.google.com/document/d/1UAybxuZyErh3ayqb4nzL3T4BbvMtnmKKEPu-ixcCj_8
         Endpoint: [PUT] https://api.charmhub.io/v1/{name_space}/featured
         """
-        headers = self._get_authorization_header(publisher_auth)
-        url = self.get_endpoint_url("snap/featured")
-        response = self.session.put(
-            url=url,
-            headers=headers,
-            json=snaps,
+        return self._fetch(
+            self._featured_snaps_request("PUT", publisher_auth, snaps)
         )
-        return response
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import threading
+from time import monotonic, sleep
+from typing import Callable, Dict, NoReturn, Optional
+
+from canonicalwebteam.exceptions import (
+    StoreApiRateLimitError,
+    StoreApiTimeoutError,
+)
+from canonicalwebteam.lazy_imports import lazy_module
+from canonicalwebteam.store_api.circuit_breaker import endpoint_group
+from canonicalwebteam.store_api.timeouts import current_deadline
+
+logger = logging.getLogger(__name__)
+
+redis = lazy_module("redis")
+
+# Token bucket kept in a hash, refilled from the Redis clock so that every
+# worker agrees on the time. Returns "0" when a token was taken, otherwise
+# the seconds until one is available, as a string since Lua numbers are
+# truncated to integers on the way back
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated',
+    tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class _Bucket:
+    def __init__(self, tokens: float):
+        self.tokens = tokens
+        self.updated = monotonic()
+        self.allowed = 0
+        self.waited = 0
+        self.rejected = 0
+
+
+class RateLimiter:
+    """
+    Limit the rate of requests to each endpoint group (see
+    `endpoint_group`) with a token bucket: `rate` requests per second on
+    average, with bursts of up to `burst` requests.
+
+    When a `RedisCache` is given and Redis is available, the buckets are
+    kept in Redis under `name` and updated by a Lua script, so the rate
+    applies to every worker sharing the cache. Use a different `name` for
+    each gateway with its own budget. If Redis fails, a bucket local to the
+    process is used instead, so the rate then applies per process, until
+    the cache finds Redis available again.
+
+    A request over the rate waits for a token for up to `max_wait`
+    seconds, or raises StoreApiRateLimitError without being sent. With a
+    `max_wait` of 0, requests fail fast. The wait is also bounded by the
+    current `store_deadline`: a request that can't get a token before it
+    raises StoreApiTimeoutError without being sent.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 20,
+        max_wait: float = 1.0,
+        cache=None,
+        name: str = "store-api",
+        group_fn: Callable[[str], str] = endpoint_group,
+    ):
+        if rate <= 0:
+            raise ValueError("The rate must be greater than 0")
+        if burst < 1:
+            raise ValueError("The burst must be at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.name = name
+        self.group_fn = group_fn
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+
+        self.cache = cache
+        if cache is not None:
+            self._prefix = f"{cache.namespace}:rate-limit:{name}"
+            self._take_script = cache.client.register_script(_TAKE_SCRIPT)
+
+    def _bucket(self, group: str) -> _Bucket:
+        bucket = self._buckets.get(group)
+        if bucket is None:
+            bucket = self._buckets[group] = _Bucket(self.burst)
+        return bucket
+
+    def _take_local(self, group: str) -> float:
+        with self._lock:
+            bucket = self._bucket(group)
+            now = monotonic()
+            bucket.tokens = min(
+                self.burst,
+                bucket.tokens + (now - bucket.updated) * self.rate,
+            )
+            bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / self.rate
+
+    def _take(self, group: str) -> float:
+        """
+        Take a token for `group`, returning 0 or else the seconds until
+        one is available
+        """
+        if self.cache is not None and self.cache.redis_available:
+            try:
+                return float(
+                    self._take_script(
+                        keys=[f"{self._prefix}:{group}"],
+                        args=[self.rate, self.burst],
+                    )
+                )
+            except redis.RedisError as e:
+                logger.error("Redis rate limit error: %s", e)
+                self.cache.record_error(e)
+        return self._take_local(group)
+
+    def _count(self, group: str, outcome: str):
+        with self._lock:
+            bucket = self._bucket(group)
+            setattr(bucket, outcome, getattr(bucket, outcome) + 1)
+
+    def _reject(self, group: str, wait: float) -> NoReturn:
+        self._count(group, "rejected")
+        raise StoreApiRateLimitError(
+            f"Rate limit reached for {group}", retry_after=wait
+        )
+
+    async def _atake(self, group: str) -> float:
+        if self.cache is None:
+            return self._take_local(group)
+        # Redis calls block, keep them off the event loop
+        return await asyncio.to_thread(self._take, group)
+
+    def _check_wait(
+        self,
+        group: str,
+        wait: float,
+        deadline: float,
+        store_deadline: Optional[float],
+    ) -> float:
+        """
+        Return `wait` if the request can wait that long for a token
+        """
+        if not wait:
+            return wait
+        ready = monotonic() + wait
+        if ready > deadline:
+            self._reject(group, wait)
+        if store_deadline is not None and ready >= store_deadline:
+            self._count(group, "rejected")
+            raise StoreApiTimeoutError(
+                f"Store request deadline exceeded waiting for {group}"
+            )
+        return wait
+
+    def acquire(self, url: str):
+        """
+        Take a token for a request to `url`, waiting for one if needed
+        """
+        group = self.group_fn(url)
+        deadline = monotonic() + self.max_wait
+        store_deadline = current_deadline()
+        waited = False
+        while True:
+            wait = self._check_wait(
+                group, self._take(group), deadline, store_deadline
+            )
+            if not wait:
+                break
+            waited = True
+            sleep(wait)
+        self._count(group, "waited" if waited else "allowed")
+
+    async def aacquire(self, url: str):
+        """
+        asyncio counterpart of `acquire`
+        """
+        group = self.group_fn(url)
+        deadline = monotonic() + self.max_wait
+        store_deadline = current_deadline()
+        waited = False
+        while True:
+            wait = self._check_wait(
+                group, await self._atake(group), deadline, store_deadline
+            )
+            if not wait:
+                break
+            waited = True
+            await asyncio.sleep(wait)
+        self._count(group, "waited" if waited else "allowed")
+
+    def stats(self) -> dict:
+        """
+        Return how many requests to each endpoint group this process sent
+        right away, sent after waiting and rejected
+        """
+        with self._lock:
+            return {
+                group: {
+                    "allowed": bucket.allowed,
+                    "waited": bucket.waited,
+                    "rejected": bucket.rejected,
+                }
+                for group, bucket in self._buckets.items()
+            }
@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from typing import Optional, Tuple, Union
+
+from canonicalwebteam.exceptions import StoreApiTimeoutError
+
+# (connect, read) in seconds, as accepted by requests
+Timeout = Tuple[float, float]
+
+DEFAULT_TIMEOUT: Timeout = (3.05, 10.0)
+
+_deadline: ContextVar[Optional[float]] = ContextVar(
+    "store_deadline", default=None
+)
+_timeout_override: ContextVar[Optional[Timeout]] = ContextVar(
+    "store_timeout", default=None
+)
+
+
+def _as_tuple(timeout: Union[float, Timeout]) -> Timeout:
+    if isinstance(timeout, tuple):
+        return timeout
+    return (timeout, timeout)
+
+
+@contextmanager
+def store_deadline(seconds: float):
+    """
+    Limit the total time spent on store requests made inside the block,
+    including composite calls that make several requests. Requests started
+    after the deadline raise StoreApiTimeoutError without touching the
+    network. Nested deadlines can only shorten the enclosing one.
+
+    Example:
+        with store_deadline(0.8):
+            snap_id = dashboard.get_snap_id(session, "test-snap")
+    """
+    deadline = monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def store_timeout(timeout: Union[float, Timeout]):
+    """
+    Override the gateways' default (connect, read) timeouts for the
+    requests made inside the block. A single number is used for both.
+
+    Example:
+        with store_timeout((3.05, 60)):
+            dashboard.snap_screenshots(session, snap_id, data, files)
+    """
+    token = _timeout_override.set(_as_tuple(timeout))
+    try:
+        yield
+    finally:
+        _timeout_override.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """
+    Return the `monotonic` time at which the current `store_deadline`
+    ends, or `None` outside of one.
+
+    Raises:
+        StoreApiTimeoutError: if the current deadline has already passed
+    """
+    deadline = _deadline.get()
+    if deadline is not None and deadline <= monotonic():
+        raise StoreApiTimeoutError("Store request deadline exceeded")
+    return deadline
+
+
+def resolve_timeout(default: Union[float, Timeout]) -> Timeout:
+    """
+    Return the (connect, read) timeout for a request about to be sent,
+    shortened to fit in the current deadline.
+
+    Raises:
+        StoreApiTimeoutError: if the current deadline has already passed
+    """
+    connect, read = _timeout_override.get() or _as_tuple(default)
+
+    deadline = _deadline.get()
+    if deadline is not None:
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            raise StoreApiTimeoutError("Store request deadline exceeded")
+        connect, read = min(connect, remaining), min(read, remaining)
+
+    return (connect, read)
@@ -0,0 +1,385 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+from time import monotonic, sleep
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from canonicalwebteam.exceptions import PublisherMacaroonRefreshRequired
+from canonicalwebteam.lazy_imports import lazy_module
+from canonicalwebteam.store_api.cache_cipher import CACHE_KEY, CacheCipher
+from canonicalwebteam.store_api.coalescing import SingleFlight
+from canonicalwebteam.stores_web_redis.utility import RELEASE_LOCK_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+redis = lazy_module("redis")
+
+# Requests that can be sent again without changing the outcome
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+# Parameter names of the gateway methods taking the user's credentials
+CREDENTIAL_PARAMETERS = ("session", "publisher_auth")
+
+# HTTP methods of the requests sent by the gateway call being tracked
+_sent_methods: ContextVar[Optional[List[str]]] = ContextVar(
+    "sent_methods", default=None
+)
+
+
+def record_request(method: str):
+    """
+    Note that a request is being sent, see `track_requests`
+    """
+    sent = _sent_methods.get()
+    if sent is not None:
+        sent.append(method.upper())
+
+
+@contextmanager
+def track_requests():
+    """
+    Collect the HTTP methods of the requests gateways send in this context
+    """
+    sent: List[str] = []
+    token = _sent_methods.set(sent)
+    try:
+        yield sent
+    finally:
+        _sent_methods.reset(token)
+
+
+def _replayable(sent: List[str]) -> bool:
+    # Nothing was sent when the credentials were found expired locally
+    return all(method in IDEMPOTENT_METHODS for method in sent)
+
+
+def credential_key(credential) -> str:
+    """
+    Return a hash identifying `credential`, a token or a session dict
+    """
+    if not isinstance(credential, str):
+        credential = json.dumps(credential, sort_keys=True, default=str)
+    return sha256(credential.encode()).hexdigest()
+
+
+class RefreshCoordinator:
+    """
+    Refresh expired credentials once, however many calls find out at the
+    same time, and replay the calls with the new credentials.
+
+    `refresh_fn(credential)` is supplied by the application: it gets the
+    session dict or token that was refused and returns new ones of the
+    same kind (and typically stores them for the user). It can be a
+    coroutine function for asyncio gateways.
+
+    Concurrent refreshes of the same credential are collapsed into one in
+    each process. When a `RedisCache` is given, a Redis lock makes sure a
+    single worker refreshes it: the others wait up to `wait_timeout`
+    seconds for the new credential, shared through the cache for
+    `result_ttl` seconds, and refresh it themselves if none shows up. The
+    lock expires after `lock_timeout` seconds in case its holder dies.
+    Shared credentials are encrypted with a key derived from `secret`,
+    which defaults to the STORE_API_CACHE_KEY environment variable, see
+    `CacheCipher`.
+
+    Gateway calls that raise PublisherMacaroonRefreshRequired are replayed
+    once with the new credential, provided every request they sent was
+    idempotent.
+    """
+
+    def __init__(
+        self,
+        refresh_fn: Callable,
+        cache=None,
+        lock_timeout: float = 10.0,
+        wait_timeout: float = 10.0,
+        result_ttl: int = 60,
+        poll_interval: float = 0.05,
+        secret: Union[str, bytes, None] = None,
+    ):
+        self.refresh_fn = refresh_fn
+        self.cache = cache
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._singleflight = SingleFlight()
+        self._lock = threading.Lock()
+        # Credential hash -> (new credential, expiry), for callers arriving
+        # just after the refresh when no cache is given
+        self._results: Dict[str, Tuple[object, float]] = {}
+        self._refreshes = 0
+        self._replays = 0
+
+        self._cipher = None
+        if cache is not None:
+            secret = secret or CACHE_KEY
+            if not secret:
+                raise ValueError(
+                    "RefreshCoordinator needs a secret to share credentials "
+                    "through a cache, see STORE_API_CACHE_KEY"
+                )
+            self._cipher = CacheCipher(secret, "refresh")
+            self._release = cache.client.register_script(RELEASE_LOCK_SCRIPT)
+
+    def _shared(self) -> bool:
+        """
+        Whether workers share refreshes through a Redis lock, which
+        follows the health of the cache
+        """
+        return self.cache is not None and self.cache.redis_available
+
+    def _redis_error(self, error: Exception):
+        logger.error("Redis token refresh error: %s", error)
+        self.cache.record_error(error)
+
+    def _cache_key(self, key: str):
+        return ("token-refresh", {"credential": key})
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.cache.namespace}:token-refresh-lock:{key}"
+
+    def _get_result(self, key: str):
+        if self._cipher is not None:
+            encrypted = self.cache.get(self._cache_key(key))
+            if encrypted is None:
+                return None
+            try:
+                return self._cipher.decrypt(encrypted)["credential"]
+            except ValueError as e:
+                logger.warning("Could not decrypt refreshed credential: %s", e)
+                return None
+
+        with self._lock:
+            result = self._results.get(key)
+        if result is not None and result[1] > monotonic():
+            return result[0]
+        return None
+
+    def _set_result(self, key: str, credential):
+        with self._lock:
+            self._refreshes += 1
+        if self._cipher is not None:
+            self.cache.set(
+                self._cache_key(key),
+                self._cipher.encrypt({"credential": credential}),
+                ttl=self.result_ttl,
+            )
+            return
+
+        now = monotonic()
+        with self._lock:
+            self._results = {
+                k: result
+                for k, result in self._results.items()
+                if result[1] > now
+            }
+            self._results[key] = (credential, now + self.result_ttl)
+
+    async def _aget_result(self, key: str):
+        if self._cipher is None:
+            return self._get_result(key)
+        # The cache calls Redis, keep it off the event loop
+        return await asyncio.to_thread(self._get_result, key)
+
+    async def _aset_result(self, key: str, credential):
+        if self._cipher is None:
+            self._set_result(key, credential)
+        else:
+            await asyncio.to_thread(self._set_result, key, credential)
+
+    def _try_lock(self, key: str) -> Optional[str]:
+        """
+        Take the Redis lock of `key`, returning its token, or None if
+        another worker holds it
+        """
+        token = uuid.uuid4().hex
+        locked = self.cache.client.set(
+            self._lock_key(key),
+            token,
+            nx=True,
+            px=int(self.lock_timeout * 1000),
+        )
+        return token if locked else None
+
+    def _unlock(self, key: str, token: str):
+        try:
+            self._release(keys=[self._lock_key(key)], args=[token])
+        except redis.RedisError as e:
+            self._redis_error(e)
+
+    def _refresh_once(self, key: str, credential):
+        result = self._get_result(key)
+        if result is not None:
+            return result
+        new_credential = self.refresh_fn(credential)
+        self._set_result(key, new_credential)
+        return new_credential
+
+    async def _arefresh_once(self, key: str, credential):
+        result = await self._aget_result(key)
+        if result is not None:
+            return result
+        new_credential = self.refresh_fn(credential)
+        if inspect.isawaitable(new_credential):
+            new_credential = await new_credential
+        await self._aset_result(key, new_credential)
+        return new_credential
+
+    def _refresh_shared(self, key: str, credential):
+        if not self._shared():
+            return self._refresh_once(key, credential)
+
+        deadline = monotonic() + self.wait_timeout
+        try:
+            while True:
+                token = self._try_lock(key)
+                if token is not None:
+                    try:
+                        return self._refresh_once(key, credential)
+                    finally:
+                        self._unlock(key, token)
+
+                result = self._get_result(key)
+                if result is not None:
+                    return result
+                if monotonic() >= deadline:
+                    logger.warning("Timed out waiting for a token refresh")
+                    break
+                sleep(self.poll_interval)
+        except redis.RedisError as e:
+            self._redis_error(e)
+
+        return self._refresh_once(key, credential)
+
+    async def _arefresh_shared(self, key: str, credential):
+        if not self._shared():
+            return await self._arefresh_once(key, credential)
+
+        deadline = monotonic() + self.wait_timeout
+        try:
+            while True:
+                # Redis calls block, keep them off the event loop
+                token = await asyncio.to_thread(self._try_lock, key)
+                if token is not None:
+                    try:
+                        return await self._arefresh_once(key, credential)
+                    finally:
+                        await asyncio.to_thread(self._unlock, key, token)
+
+                result = await self._aget_result(key)
+                if result is not None:
+                    return result
+                if monotonic() >= deadline:
+                    logger.warning("Timed out waiting for a token refresh")
+                    break
+                await asyncio.sleep(self.poll_interval)
+        except redis.RedisError as e:
+            self._redis_error(e)
+
+        return await self._arefresh_once(key, credential)
+
+    def refresh(self, credential):
+        """
+        Return new credentials for `credential`, refreshing it only if no
+        other caller is doing it
+        """
+        key = credential_key(credential)
+        return self._singleflight.do(
+            key, lambda: self._refresh_shared(key, credential)
+        )
+
+    async def arefresh(self, credential):
+        """
+        asyncio counterpart of `refresh`
+        """
+        key = credential_key(credential)
+        return await self._singleflight.ado(
+            key, lambda: self._arefresh_shared(key, credential)
+        )
+
+    def _count_replay(self):
+        with self._lock:
+            self._replays += 1
+
+    def wrap(self, fn: Callable, position: int) -> Callable:
+        """
+        Return `fn`, a gateway method taking the credential as its
+        `position`th argument, replaying it after a refresh when it raises
+        PublisherMacaroonRefreshRequired
+        """
+        parameter = list(inspect.signature(fn).parameters)[position]
+
+        def with_credential(args, kwargs, credential):
+            if parameter in kwargs:
+                return args, dict(kwargs, **{parameter: credential})
+            args = list(args)
+            args[position] = credential
+            return tuple(args), kwargs
+
+        def credential_of(args, kwargs):
+            if parameter in kwargs:
+                return kwargs[parameter]
+            return args[position]
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with track_requests() as sent:
+                    try:
+                        return await fn(*args, **kwargs)
+                    except PublisherMacaroonRefreshRequired:
+                        if not _replayable(sent):
+                            raise
+                new_credential = await self.arefresh(
+                    credential_of(args, kwargs)
+                )
+                self._count_replay()
+                args, kwargs = with_credential(args, kwargs, new_credential)
+                return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track_requests() as sent:
+                try:
+                    return fn(*args, **kwargs)
+                except PublisherMacaroonRefreshRequired:
+                    if not _replayable(sent):
+                        raise
+            new_credential = self.refresh(credential_of(args, kwargs))
+            self._count_replay()
+            args, kwargs = with_credential(args, kwargs, new_credential)
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    def bind(self, gateway):
+        """
+        Wrap every public method of `gateway` that takes credentials, see
+        `wrap`
+        """
+        for name, method in inspect.getmembers(gateway, inspect.ismethod):
+            if name.startswith("_"):
+                continue
+            parameters = list(inspect.signature(method).parameters)
+            for position, parameter in enumerate(parameters):
+                if parameter in CREDENTIAL_PARAMETERS:
+                    setattr(gateway, name, self.wrap(method, position))
+                    break
+
+    def stats(self) -> dict:
+        """
+        Return how many refreshes this process ran and how many calls
+        were replayed
+        """
+        with self._lock:
+            return {"refreshes": self._refreshes, "replays": self._replays}
@@ -0,0 +1,138 @@
+import threading
+from os import getenv
+from typing import Iterable
+from urllib.parse import urlsplit
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+# urllib3 only keeps 10 connections per host by default, anything above
+# that is opened and thrown away after each request
+POOL_CONNECTIONS = int(getenv("STORE_API_POOL_CONNECTIONS", "10"))
+POOL_MAXSIZE = int(getenv("STORE_API_POOL_MAXSIZE", "50"))
+POOL_BLOCK = getenv("STORE_API_POOL_BLOCK", "false").lower() == "true"
+
+
+class PoolAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with a configurable connection pool that keeps track of
+    how busy the pool is.
+
+    Args:
+        pool_connections: Number of per-host connection pools to cache.
+        pool_maxsize: Maximum number of connections kept open per host.
+        pool_block: When all `pool_maxsize` connections are busy, wait for
+            one to be released (`True`) or open a throwaway connection
+            (`False`).
+        keep_alive: Reuse connections between requests. When `False`,
+            every request asks the server to close the connection.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        pool_block: bool = POOL_BLOCK,
+        keep_alive: bool = True,
+    ):
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests = 0
+        self._saturated = 0
+        super().__init__(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+
+    def add_headers(self, request, **kwargs):
+        if not self.keep_alive:
+            request.headers["Connection"] = "close"
+
+    def send(self, request, *args, **kwargs):
+        with self._stats_lock:
+            self._requests += 1
+            self._in_flight += 1
+            if self._in_flight > self.pool_maxsize:
+                # every pooled connection is busy: this request either
+                # waits for one or opens a connection that won't be reused
+                self._saturated += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+        try:
+            return super().send(request, *args, **kwargs)
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of the pool usage
+        """
+        connections_opened = 0
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is not None:
+                connections_opened += pool.num_connections
+
+        with self._stats_lock:
+            return {
+                "pool_maxsize": self.pool_maxsize,
+                "pool_block": self.pool_block,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "requests": self._requests,
+                "saturated": self._saturated,
+                "connections_opened": connections_opened,
+            }
+
+
+def build_session(
+    base_urls: Iterable[str] = (),
+    pool_connections: int = POOL_CONNECTIONS,
+    pool_maxsize: int = POOL_MAXSIZE,
+    pool_block: bool = POOL_BLOCK,
+    keep_alive: bool = True,
+) -> Session:
+    """
+    Return a new requests Session with a dedicated connection pool for each
+    gateway host in `base_urls`. Any other host is served by an adapter
+    with the same settings.
+
+    See `PoolAdapter` for the meaning of the pool arguments.
+    """
+    session = Session()
+    prefixes = {"https://", "http://"}
+    for base_url in base_urls:
+        url = urlsplit(base_url)
+        prefixes.add(f"{url.scheme}://{url.netloc}/")
+
+    for prefix in prefixes:
+        session.mount(
+            prefix,
+            PoolAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                keep_alive=keep_alive,
+            ),
+        )
+    return session
+
+
+def pool_stats(session) -> dict:
+    """
+    Return the pool usage of every `PoolAdapter` mounted on `session`,
+    keyed by URL prefix. Sessions not created by `build_session` have no
+    stats.
+    """
+    adapters = getattr(session, "adapters", {})
+    return {
+        prefix: adapter.stats()
+        for prefix, adapter in adapters.items()
+        if isinstance(adapter, PoolAdapter)
+    }
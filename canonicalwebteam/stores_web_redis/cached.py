@@ -0,0 +1,216 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import threading
+from hashlib import sha256
+from typing import Callable, Dict, Optional
+
+from canonicalwebteam.store_api.token_refresh import (
+    CREDENTIAL_PARAMETERS,
+    credential_key,
+)
+from canonicalwebteam.stores_web_redis.utility import (
+    RedisCache,
+    SafeJSONEncoder,
+)
+
+logger = logging.getLogger(__name__)
+
+# Read-only gateway endpoints and how long their responses are cached, in
+# seconds. Methods taking credentials are cached per credential.
+DEVICEGW_METHODS = {
+    "search": 300,
+    "find": 300,
+    "get_all_items": 300,
+    "get_category_items": 300,
+    "get_featured_items": 300,
+    "get_publisher_items": 300,
+    "get_item_details": 300,
+    "get_snap_details": 300,
+    "get_categories": 3600,
+    "get_resource_revisions": 300,
+    "get_featured_snaps": 300,
+}
+PUBLISHERGW_METHODS = {
+    "find": 300,
+    "get_categories": 3600,
+    "get_item_details": 300,
+    "get_charm_libraries": 300,
+    "get_charm_library": 300,
+    "get_releases": 60,
+    "get_package_metadata": 60,
+}
+CACHEABLE_METHODS: Dict[str, Dict[str, int]] = {
+    "DeviceGW": DEVICEGW_METHODS,
+    "AsyncDeviceGW": DEVICEGW_METHODS,
+    "PublisherGW": PUBLISHERGW_METHODS,
+    "AsyncPublisherGW": PUBLISHERGW_METHODS,
+}
+
+# One cache per namespace, created on first use
+_caches: Dict[str, RedisCache] = {}
+_caches_lock = threading.Lock()
+_MISS = object()
+
+
+def get_cache(namespace: str, maxsize: int = 1000) -> RedisCache:
+    """
+    Return the RedisCache shared by the cached functions of `namespace`
+    """
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = RedisCache(namespace, maxsize)
+        return _caches[namespace]
+
+
+def method_key(func: Callable, args: tuple, kwargs: dict) -> tuple:
+    """
+    Return the cache key of calling `func` with `args` and `kwargs`: its
+    qualified name and a hash of its arguments, defaults included, so that
+    equivalent calls share a key. Credentials are hashed separately and a
+    gateway is identified by its config (store, namespace and URLs).
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+
+    scope = None
+    if "self" in arguments:
+        scope = getattr(arguments.pop("self"), "config", None)
+    for name in CREDENTIAL_PARAMETERS:
+        if name in arguments:
+            arguments[name] = credential_key(arguments[name])
+
+    canonical = json.dumps(
+        [scope, arguments], sort_keys=True, cls=SafeJSONEncoder
+    )
+    return (
+        func.__qualname__,
+        {"args": sha256(canonical.encode()).hexdigest()},
+    )
+
+
+def cached(
+    namespace: str = "store-api",
+    ttl: int = 300,
+    key: Optional[Callable] = None,
+    cache: Optional[RedisCache] = None,
+):
+    """
+    Decorator caching the JSON results of `func` in a RedisCache for `ttl`
+    seconds. Exceptions are never cached.
+
+    Args:
+        namespace (str, optional): The namespace of the RedisCache, shared
+            by every function decorated with the same one. Defaults to
+            "store-api".
+        ttl (int, optional): How long results are cached, in seconds.
+        key (Callable, optional): A function called with the arguments of
+            `func` returning its cache key, a string or a
+            `(base_key, parts)` tuple. Defaults to `method_key`.
+        cache (RedisCache, optional): The cache to use instead of the one
+            of `namespace`.
+
+    Returns:
+        Callable: The decorator. The decorated function has an
+            `invalidate(*args, **kwargs)` attribute dropping the result of
+            a call from the cache. When `func` is a coroutine function, so
+            is the decorated version.
+    """
+
+    def decorator(func):
+        def get_key(args, kwargs):
+            if key is not None:
+                return key(*args, **kwargs)
+            return method_key(func, args, kwargs)
+
+        def get_store():
+            return cache if cache is not None else get_cache(namespace)
+
+        def lookup(cache_key):
+            serialized = get_store().get(cache_key)
+            if serialized is None:
+                return _MISS
+            try:
+                return json.loads(serialized)
+            except ValueError as e:
+                logger.error("Cached result decoding error: %s", e)
+                return _MISS
+
+        def store(cache_key, result):
+            try:
+                serialized = json.dumps(result, cls=SafeJSONEncoder)
+            except (TypeError, ValueError) as e:
+                logger.error("Serialization error: %s", e)
+                return
+            get_store().set(cache_key, serialized, ttl=ttl)
+
+        def invalidate(*args, **kwargs):
+            get_store().delete(get_key(args, kwargs))
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = get_key(args, kwargs)
+                # Redis calls block, keep them off the event loop
+                result = await asyncio.to_thread(lookup, cache_key)
+                if result is _MISS:
+                    result = await func(*args, **kwargs)
+                    await asyncio.to_thread(store, cache_key, result)
+                return result
+
+            async_wrapper.invalidate = invalidate  # type: ignore
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = get_key(args, kwargs)
+            result = lookup(cache_key)
+            if result is _MISS:
+                result = func(*args, **kwargs)
+                store(cache_key, result)
+            return result
+
+        wrapper.invalidate = invalidate  # type: ignore
+        return wrapper
+
+    return decorator
+
+
+def cache_gateway(
+    gateway,
+    namespace: str = "store-api",
+    cache: Optional[RedisCache] = None,
+    methods: Optional[Dict[str, int]] = None,
+):
+    """
+    Cache the read-only methods of `gateway`, see `CACHEABLE_METHODS`, or
+    the given `methods` mapping method names to TTLs. Returns `gateway`.
+    """
+    if methods is None:
+        methods = {}
+        for cls in reversed(type(gateway).__mro__):
+            methods.update(CACHEABLE_METHODS.get(cls.__name__, {}))
+
+    def gateway_key(function):
+        # Key calls as if made on the class, to include the gateway config
+        return lambda *args, **kwargs: method_key(
+            function, (gateway, *args), kwargs
+        )
+
+    for name, ttl in methods.items():
+        # Wrap the bound method rather than the class function, as methods
+        # may already be wrapped on the instance, e.g. by a
+        # RefreshCoordinator
+        key = gateway_key(getattr(type(gateway), name))
+        setattr(
+            gateway,
+            name,
+            cached(namespace, ttl, key=key, cache=cache)(
+                getattr(gateway, name)
+            ),
+        )
+    return gateway
@@ -1,16 +1,75 @@
 import os
-from cachetools import TTLCache
-import redis
 import json
 import logging
-from typing import Optional, Any, Union
+import math
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from itertools import islice
+from time import monotonic, sleep, time
+from typing import (
+    Optional,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Tuple,
+    Union,
+)
+
+from canonicalwebteam.lazy_imports import lazy_module
+
+# Only imported once a cache is created
+cachetools = lazy_module("cachetools")
+redis = lazy_module("redis")
 
 logger = logging.getLogger(__name__)
 
+# Marks in-process entries not deserialized yet
+_UNDECODED = object()
+
 host = os.getenv("REDIS_DB_HOSTNAME", "localhost")
 port = os.getenv("REDIS_DB_PORT", "6379")
 password = os.getenv("REDIS_DB_PASSWORD", None)
 
+# Delete a lock only if it is still held with the given token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+# How often `get_or_compute` checks whether another worker is done
+COMPUTE_POLL_INTERVAL = 0.05
+# Size of the in-process cache in front of Redis, overridden for a
+# namespace by e.g. REDIS_L1_MAXSIZE_SNAPCRAFT_IO, 0 to disable it
+L1_MAXSIZE = int(os.getenv("REDIS_L1_MAXSIZE", "1024"))
+# Fraction of the TTL of the cache that values are kept in memory for, at
+# most
+L1_TTL_RATIO = float(os.getenv("REDIS_L1_TTL_RATIO", "0.1"))
+# Seconds between pings while Redis is unhealthy, doubling after each
+# failed ping up to the maximum
+PROBE_INTERVAL = float(os.getenv("REDIS_PROBE_INTERVAL", "1.0"))
+MAX_PROBE_INTERVAL = float(os.getenv("REDIS_MAX_PROBE_INTERVAL", "30.0"))
+# States of the connection to Redis, see `RedisCache.health`
+HEALTHY = "healthy"
+UNHEALTHY = "unhealthy"
+RECOVERING = "recovering"
+
+
+def l1_maxsize_for(namespace: str) -> int:
+    """
+    Return the in-process cache size configured for `namespace`
+    """
+    variable = "REDIS_L1_MAXSIZE_" + "".join(
+        c if c.isalnum() else "_" for c in namespace.upper()
+    )
+    return int(os.getenv(variable, L1_MAXSIZE))
+
 
 class SafeJSONEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -31,27 +90,191 @@ class SafeJSONEncoder(json.JSONEncoder):
 
 
 class RedisCache:
-    def __init__(self, namespace: str, maxsize: int, ttl: int = 300):
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int,
+        ttl: int = 300,
+        refresh_timeout: float = 30.0,
+        refresh_workers: int = 2,
+        l1_maxsize: Optional[int] = None,
+        l1_ttl: Optional[float] = None,
+        invalidation: bool = True,
+        probe_interval: float = PROBE_INTERVAL,
+        max_probe_interval: float = MAX_PROBE_INTERVAL,
+    ):
         self.namespace = namespace
-        self.fallback = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.fallback = cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+        # In-process cache of values, keyed by full key: the serialized
+        # value, the monotonic time until which it is kept, and the value
+        # deserialized by the first caller asking for an object
+        if l1_maxsize is None:
+            l1_maxsize = l1_maxsize_for(namespace)
+        self.l1_ttl = ttl * L1_TTL_RATIO if l1_ttl is None else l1_ttl
+        self.l1 = cachetools.TLRUCache(
+            maxsize=max(l1_maxsize, 1),
+            ttu=lambda key, value, now: value[1],
+            timer=monotonic,
+        )
+        self.l1_enabled = l1_maxsize > 0 and self.l1_ttl > 0
+        self._l1_lock = threading.Lock()
+        self._tier_counts = {
+            "l1": {"hits": 0, "misses": 0, "invalidations": 0},
+            "l2": {"hits": 0, "misses": 0},
+        }
+        # Keys written or deleted by any process are announced on this
+        # channel, so that every process drops its in-memory copy
+        self.invalidation_channel = f"{namespace}:l1-invalidate"
+        self.invalidation = invalidation
+        self._invalidation_thread = None
+        # Stale-while-revalidate, see `register_loader`
+        self.refresh_timeout = refresh_timeout
+        self.refresh_workers = refresh_workers
+        self._loaders: Dict[str, Tuple[Callable, int, int]] = {}
+        # Full key -> monotonic time until which the fallback entry is
+        # fresh, or being refreshed
+        self._fresh = cachetools.TLRUCache(
+            maxsize=maxsize,
+            ttu=lambda key, value, now: value,
+            timer=monotonic,
+        )
+        self._refresh_pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._refreshing = 0
+        self._refreshed = 0
+        self._refresh_failed = 0
+        # `get_or_compute` state
+        self._release_lock: Optional[Callable] = None
+        self._computing: set = set()
+        self._compute_counts = {
+            "computed": 0,
+            "early": 0,
+            "stale": 0,
+            "waited": 0,
+        }
+        # Health of the connection to Redis, see `health`
+        self.probe_interval = probe_interval
+        self.max_probe_interval = max_probe_interval
+        self._health_lock = threading.Lock()
+        self._state = HEALTHY
+        self._state_since = time()
+        self._probe_delay = probe_interval
+        self._next_probe = 0.0
+        self._health_counts = {"failovers": 0, "recoveries": 0, "probes": 0}
+
+        self.client = redis.Redis(
+            host=host,
+            port=int(port),
+            password=password,
+            decode_responses=True,
+        )
         try:
-            self.client = redis.Redis(
-                host=host,
-                port=int(port),
-                password=password,
-                decode_responses=True,
-            )
             self.client.ping()
-            self.redis_available = True
         except redis.RedisError as e:
             logger.warning("Redis unavailable: %s", e)
-            self.redis_available = False
+            self._fail_over()
+
+        if self.redis_available and self.l1_enabled and invalidation:
+            self._subscribe_invalidations()
+
+    @property
+    def redis_available(self) -> bool:
+        """
+        Whether Redis is used, rather than the in-process `fallback` cache.
+        While it isn't, it is pinged again in the background.
+        """
+        if self._state == HEALTHY:
+            return True
+        if self._state == UNHEALTHY and monotonic() >= self._next_probe:
+            self._start_probe()
+        return False
+
+    def _fail_over(self) -> bool:
+        with self._health_lock:
+            if self._state != HEALTHY:
+                return False
+            self._state = UNHEALTHY
+            self._state_since = time()
+            self._probe_delay = self.probe_interval
+            self._next_probe = monotonic() + self._probe_delay
+            self._health_counts["failovers"] += 1
+        return True
+
+    def _start_probe(self):
+        with self._health_lock:
+            if self._state != UNHEALTHY or monotonic() < self._next_probe:
+                return
+            self._state = RECOVERING
+            self._health_counts["probes"] += 1
+        threading.Thread(
+            target=self._probe, name="redis-cache-probe", daemon=True
+        ).start()
+
+    def _probe(self):
+        try:
+            self.client.ping()
+        except redis.RedisError as e:
+            logger.debug("Redis still unavailable: %s", e)
+            with self._health_lock:
+                self._state = UNHEALTHY
+                self._probe_delay = min(
+                    self._probe_delay * 2, self.max_probe_interval
+                )
+                # Jittered, so that workers don't all ping at once
+                self._next_probe = monotonic() + self._probe_delay * (
+                    0.5 + random.random() / 2
+                )
+            return
+
+        # Values in memory may have been invalidated while Redis was
+        # unreachable
+        with self._l1_lock:
+            self.l1.clear()
+        if (
+            self.l1_enabled
+            and self.invalidation
+            and self._invalidation_thread is None
+        ):
+            self._subscribe_invalidations()
+        with self._health_lock:
+            self._state = HEALTHY
+            self._state_since = time()
+            self._health_counts["recoveries"] += 1
+        logger.warning("Redis available again")
+
+    def _redis_error(self, operation: str, error: Exception):
+        logger.error("Redis %s error: %s", operation, error)
+        self.record_error(error)
+
+    def record_error(self, error: Exception):
+        """
+        Report an error from a call to `client` made outside of the cache,
+        so that the cache fails over if Redis is unreachable
+        """
+        # Other errors, e.g. wrong types, don't mean Redis is unreachable
+        if isinstance(error, (redis.ConnectionError, redis.TimeoutError)):
+            if self._fail_over():
+                logger.warning("Redis unhealthy, using the fallback cache")
+
+    def health(self) -> dict:
+        """
+        Return the state of the connection to Redis: "healthy", "unhealthy"
+        (using the fallback cache) or "recovering" (being pinged), since
+        when, and how many times this process failed over to the fallback
+        cache, pinged Redis and recovered
+        """
+        with self._health_lock:
+            return {
+                "state": self._state,
+                "since": self._state_since,
+                **self._health_counts,
+            }
 
     def _build_key(
         self, key: Union[str, tuple[str, Optional[dict[str, Any]]]]
     ) -> str:
-        base_key, parts = key if isinstance(key, tuple) else (key, {})
-        key_parts = ":".join(f"{k}-{v}" for k, v in parts.items() if v)
+        base_key, parts = key if isinstance(key, tuple) else (key, None)
+        key_parts = ":".join(f"{k}-{v}" for k, v in (parts or {}).items() if v)
         full_key = (
             f"{self.namespace}:{base_key}:{key_parts}"
             if key_parts
@@ -59,6 +282,20 @@ class RedisCache:
         )
         return full_key
 
+    def _base_key(
+        self, key: Union[str, tuple[str, Optional[dict[str, Any]]]]
+    ) -> str:
+        return key[0] if isinstance(key, tuple) else key
+
+    def _fresh_key(self, full_key: str) -> str:
+        return f"{full_key}:fresh"
+
+    def _stale_ttl(self, key, stale_ttl: Optional[int]) -> int:
+        # Defaults to the stale TTL of the loader registered for the key
+        if stale_ttl is not None:
+            return stale_ttl
+        return self._loaders.get(self._base_key(key), (None, 0, 0))[2]
+
     def _serialize(self, value: Any) -> str:
         if isinstance(value, str):
             return value
@@ -81,24 +318,195 @@ class RedisCache:
             logger.error("Deserialization error: %s", e)
             raise
 
+    def _count_tier(self, tier: str, hit: bool):
+        with self._lock:
+            self._tier_counts[tier]["hits" if hit else "misses"] += 1
+
+    def _drop_l1(self, full_key: str):
+        with self._l1_lock:
+            self.l1.pop(full_key, None)
+
+    def _keep_l1(
+        self,
+        full_key: str,
+        value: Optional[str],
+        ttl,
+        expected_type: type,
+    ) -> Any:
+        """
+        Keep `value`, read from Redis, in memory for `ttl` seconds if set,
+        returning it deserialized to `expected_type`
+        """
+        deserialized = self._deserialize(value, expected_type)
+        if value is not None and ttl:
+            decoded = _UNDECODED if expected_type is str else deserialized
+            with self._l1_lock:
+                self.l1[full_key] = (value, monotonic() + ttl, decoded)
+        return deserialized
+
+    def _l1_value(self, full_key: str, entry: tuple, expected_type: type):
+        """
+        Return the value of an in-process `entry`, deserializing it only
+        once for all the callers asking for an object
+        """
+        serialized, until, decoded = entry
+        if expected_type is str:
+            return serialized
+        if decoded is _UNDECODED:
+            decoded = self._deserialize(serialized, expected_type)
+            with self._l1_lock:
+                # Unless it was replaced or dropped meanwhile
+                if self.l1.get(full_key) is entry:
+                    self.l1[full_key] = (serialized, until, decoded)
+        return decoded
+
+    def _l1_ttl_for(self, pttl: int) -> Optional[float]:
+        # PTTL is -1 for keys without expiry and -2 for missing ones
+        if pttl == -1:
+            return self.l1_ttl
+        if pttl <= 0:
+            return None
+        return min(pttl / 1000, self.l1_ttl)
+
+    def _read_entries(
+        self, keys: list, full_keys: List[str]
+    ) -> List[Tuple[Optional[str], Optional[float]]]:
+        """
+        Read `full_keys` from Redis in a single round trip, returning the
+        serialized value of each, or None, and how long it can be kept in
+        memory: until it expires in Redis, at most `l1_ttl` seconds, and not
+        at all when it is served stale
+        """
+        revalidate = [self._base_key(key) in self._loaders for key in keys]
+        pipeline = self.client.pipeline(transaction=False)
+        for full_key, loaded in zip(full_keys, revalidate):
+            pipeline.get(full_key)
+            if loaded:
+                # Fresh until the marker expires
+                pipeline.get(self._fresh_key(full_key))
+                pipeline.pttl(self._fresh_key(full_key))
+            else:
+                pipeline.pttl(full_key)
+        try:
+            replies = iter(pipeline.execute())
+        except redis.RedisError as e:
+            self._redis_error("get", e)
+            return [(None, None)] * len(keys)
+
+        entries: List[Tuple[Optional[str], Optional[float]]] = []
+        for key, full_key, loaded in zip(keys, full_keys, revalidate):
+            value = next(replies)
+            fresh = next(replies) if loaded else "1"
+            ttl = self._l1_ttl_for(next(replies))
+            if value is not None and fresh != "1":
+                ttl = None
+                if fresh is None:
+                    try:
+                        self._revalidate(key, full_key)
+                    except redis.RedisError as e:
+                        self._redis_error("get", e)
+            entries.append((value, ttl))
+        return entries
+
+    def _subscribe_invalidations(self):
+        try:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(
+                **{self.invalidation_channel: self._on_invalidation}
+            )
+            self._invalidation_thread = pubsub.run_in_thread(
+                sleep_time=1.0,
+                daemon=True,
+                exception_handler=self._on_invalidation_error,
+            )
+        except redis.RedisError as e:
+            self._redis_error("subscribe", e)
+
+    def _on_invalidation(self, message: dict):
+        self._drop_l1(message["data"])
+        with self._lock:
+            self._tier_counts["l1"]["invalidations"] += 1
+
+    def _on_invalidation_error(self, error, pubsub, thread):
+        # Invalidations may have been missed while disconnected. The
+        # connection is reopened on the next read.
+        logger.error("Redis invalidation error: %s", error)
+        self.record_error(error)
+        with self._l1_lock:
+            self.l1.clear()
+        sleep(1.0)
+
+    def _publish_invalidation(self, full_key: str):
+        # Even without an in-process cache here, other processes may have
+        # the key in theirs
+        if not self.invalidation:
+            return
+        try:
+            self.client.publish(self.invalidation_channel, full_key)
+        except redis.RedisError as e:
+            self._redis_error("publish", e)
+
+    def close(self):
+        """
+        Stop listening for invalidations
+        """
+        if self._invalidation_thread is not None:
+            self._invalidation_thread.stop()
+            self._invalidation_thread = None
+
     def get(
         self,
         key: Union[str, tuple[str, Optional[dict[str, Any]]]],
         expected_type: type = str,
     ) -> Any:
+        """
+        Return the value cached for `key`, or None. With the in-process
+        cache enabled, values read from Redis are kept in memory for at
+        most `l1_ttl` seconds, and no longer than in Redis. They are kept
+        deserialized and shared by every caller in the process, so don't
+        modify them.
+        """
         full_key = self._build_key(key)
+        if not self.l1_enabled or not self.redis_available:
+            return self._get_l2(key, full_key, expected_type)
+
+        with self._l1_lock:
+            entry = self.l1.get(full_key)
+        self._count_tier("l1", entry is not None)
+        if entry is not None:
+            return self._l1_value(full_key, entry, expected_type)
+
+        ((value, ttl),) = self._read_entries([key], [full_key])
+        self._count_tier("l2", value is not None)
+        return self._keep_l1(full_key, value, ttl, expected_type)
+
+    def _get_l2(self, key, full_key: str, expected_type: type) -> Any:
+        value = self._read(key, full_key, expected_type)
+        self._count_tier("l2", value is not None)
+        return value
+
+    def _read(self, key, full_key: str, expected_type: type) -> Any:
+        revalidate = self._base_key(key) in self._loaders
         if self.redis_available:
             try:
-                return self._deserialize(
-                    self.client.get(full_key), expected_type
+                if not revalidate:
+                    return self._deserialize(
+                        self.client.get(full_key), expected_type
+                    )
+                value, fresh = self.client.mget(
+                    [full_key, self._fresh_key(full_key)]
                 )
+                if value is not None and fresh is None:
+                    self._revalidate(key, full_key)
+                return self._deserialize(value, expected_type)
             except redis.RedisError as e:
-                logger.error("Redis get error: %s", e)
+                self._redis_error("get", e)
         else:
             try:
-                return self._deserialize(
-                    self.fallback[full_key], expected_type
-                )
+                value = self.fallback[full_key]
+                if revalidate:
+                    self._revalidate(key, full_key)
+                return self._deserialize(value, expected_type)
             except KeyError:
                 return None
             except Exception as e:
@@ -109,27 +517,430 @@ class RedisCache:
         key: Union[str, tuple[str, Optional[dict[str, Any]]]],
         value: Any,
         ttl=300,
+        stale_ttl: Optional[int] = None,
     ):
+        """
+        Cache `value` for `ttl` seconds. With a `stale_ttl`, which defaults
+        to the one of the loader registered for the key, it is then served
+        stale for up to `stale_ttl` more seconds while being refreshed.
+        """
         full_key = self._build_key(key)
         serialized = self._serialize(value)
+        self._drop_l1(full_key)
+        stale_ttl = self._stale_ttl(key, stale_ttl)
         if self.redis_available:
             try:
-                self.client.setex(full_key, ttl, serialized)
+                if not stale_ttl:
+                    self.client.setex(full_key, ttl, serialized)
+                else:
+                    pipeline = self.client.pipeline(transaction=False)
+                    pipeline.setex(full_key, ttl + stale_ttl, serialized)
+                    pipeline.setex(self._fresh_key(full_key), ttl, "1")
+                    pipeline.execute()
+                self._publish_invalidation(full_key)
                 return
             except redis.RedisError as e:
-                logger.error("Redis set error: %s", e)
+                self._redis_error("set", e)
         else:
             try:
                 self.fallback[full_key] = serialized
+                if stale_ttl:
+                    with self._lock:
+                        self._fresh[full_key] = monotonic() + ttl
             except Exception as e:
                 logger.error("Fallback cache set error: %s", e)
 
     def delete(self, key: Union[str, tuple[str, Optional[dict[str, Any]]]]):
         full_key = self._build_key(key)
+        self._drop_l1(full_key)
         if self.redis_available:
             try:
-                self.client.delete(full_key)
+                self.client.delete(full_key, self._fresh_key(full_key))
+                self._publish_invalidation(full_key)
             except redis.RedisError as e:
-                logger.error("Redis delete error: %s", e)
+                self._redis_error("delete", e)
         else:
             self.fallback.pop(full_key, None)
+            with self._lock:
+                self._fresh.pop(full_key, None)
+
+    def get_many(
+        self,
+        keys: Iterable[Union[str, tuple[str, Optional[dict[str, Any]]]]],
+        expected_type: type = str,
+    ) -> List[Any]:
+        """
+        Return the values cached for `keys`, in the same order, with None
+        for missing ones. Keys not in memory are read from Redis in a
+        single round trip.
+        """
+        keys = list(keys)
+        full_keys = [self._build_key(key) for key in keys]
+        values: List[Any]
+        if not self.l1_enabled or not self.redis_available:
+            values = self._read_many(keys, full_keys, expected_type)
+            self._count_tiers("l2", values)
+            return values
+
+        values = [None] * len(keys)
+        missing = []
+        with self._l1_lock:
+            entries = [self.l1.get(full_key) for full_key in full_keys]
+        for i, (full_key, entry) in enumerate(zip(full_keys, entries)):
+            if entry is None:
+                missing.append(i)
+            else:
+                values[i] = self._l1_value(full_key, entry, expected_type)
+        with self._lock:
+            self._tier_counts["l1"]["hits"] += len(keys) - len(missing)
+            self._tier_counts["l1"]["misses"] += len(missing)
+
+        if missing:
+            read = self._read_entries(
+                [keys[i] for i in missing], [full_keys[i] for i in missing]
+            )
+            for i, (value, ttl) in zip(missing, read):
+                values[i] = self._keep_l1(
+                    full_keys[i], value, ttl, expected_type
+                )
+            self._count_tiers("l2", [value for value, _ in read])
+        return values
+
+    def _count_tiers(self, tier: str, values: List[Any]):
+        found = sum(value is not None for value in values)
+        with self._lock:
+            self._tier_counts[tier]["hits"] += found
+            self._tier_counts[tier]["misses"] += len(values) - found
+
+    def _read_many(
+        self, keys: list, full_keys: List[str], expected_type: type
+    ) -> List[Any]:
+        if not self.redis_available:
+            return [
+                self._read(key, full_key, expected_type)
+                for key, full_key in zip(keys, full_keys)
+            ]
+
+        revalidate = [self._base_key(key) in self._loaders for key in keys]
+        fresh_keys = [
+            self._fresh_key(full_key)
+            for full_key, loaded in zip(full_keys, revalidate)
+            if loaded
+        ]
+        try:
+            read = self.client.mget(full_keys + fresh_keys)
+        except redis.RedisError as e:
+            self._redis_error("get", e)
+            return [None] * len(keys)
+
+        fresh = islice(read, len(full_keys), None)
+        values = []
+        for key, full_key, loaded, value in zip(
+            keys, full_keys, revalidate, read
+        ):
+            is_fresh = next(fresh) is not None if loaded else True
+            if value is not None and not is_fresh:
+                try:
+                    self._revalidate(key, full_key)
+                except redis.RedisError as e:
+                    self._redis_error("get", e)
+            values.append(self._deserialize(value, expected_type))
+        return values
+
+    def set_many(
+        self,
+        mapping: Union[
+            Mapping[Any, Any],
+            Iterable[Tuple[Any, Any]],
+        ],
+        ttl=300,
+        stale_ttl: Optional[int] = None,
+    ):
+        """
+        Cache several values for `ttl` seconds, see `set`. `mapping` is a
+        dict or, for keys with parts, a list of `(key, value)` pairs. With
+        Redis, every value is written in a single pipeline.
+        """
+        items = list(mapping.items() if hasattr(mapping, "items") else mapping)
+        if not self.redis_available:
+            for key, value in items:
+                self.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+            return
+
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in items:
+            full_key = self._build_key(key)
+            serialized = self._serialize(value)
+            self._drop_l1(full_key)
+            key_stale_ttl = self._stale_ttl(key, stale_ttl)
+            if not key_stale_ttl:
+                pipeline.setex(full_key, ttl, serialized)
+            else:
+                pipeline.setex(full_key, ttl + key_stale_ttl, serialized)
+                pipeline.setex(self._fresh_key(full_key), ttl, "1")
+            if self.invalidation:
+                pipeline.publish(self.invalidation_channel, full_key)
+        try:
+            pipeline.execute()
+        except redis.RedisError as e:
+            self._redis_error("set", e)
+
+    def register_loader(
+        self,
+        base_key: str,
+        loader: Callable[[Any], Any],
+        ttl: int = 300,
+        stale_ttl: int = 60,
+    ):
+        """
+        Serve the keys starting with `base_key` stale while revalidating:
+        entries are fresh for `ttl` seconds, then returned as they are for up
+        to `stale_ttl` more seconds while `loader(key)` gets a new value in
+        the background. A single worker refreshes each entry, and failed
+        refreshes are retried after `refresh_timeout` seconds.
+
+        Without Redis, entries are also dropped after the fallback TTL.
+        """
+        self._loaders[base_key] = (loader, ttl, stale_ttl)
+
+    def _revalidate(self, key, full_key: str):
+        """
+        Refresh a stale entry in the background, unless another worker is
+        doing it
+        """
+        if self.redis_available:
+            claimed = self.client.set(
+                self._fresh_key(full_key),
+                "refreshing",
+                nx=True,
+                px=int(self.refresh_timeout * 1000),
+            )
+            if not claimed:
+                return
+        else:
+            with self._lock:
+                if full_key in self._fresh:
+                    return
+                self._fresh[full_key] = monotonic() + self.refresh_timeout
+
+        with self._lock:
+            self._refreshing += 1
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(
+                    self.refresh_workers,
+                    thread_name_prefix="redis-cache-refresh",
+                )
+            pool = self._refresh_pool
+        pool.submit(copy_context().run, self._refresh, key)
+
+    def _refresh(self, key):
+        loader, ttl, stale_ttl = self._loaders[self._base_key(key)]
+        try:
+            value = loader(key)
+        except Exception:
+            logger.exception("Cache refresh failed")
+            with self._lock:
+                self._refresh_failed += 1
+            return
+        self.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+        with self._lock:
+            self._refreshed += 1
+
+    def revalidation_stats(self) -> dict:
+        """
+        Return how many refreshes of stale entries this process started,
+        completed and failed
+        """
+        with self._lock:
+            return {
+                "started": self._refreshing,
+                "refreshed": self._refreshed,
+                "failed": self._refresh_failed,
+            }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._compute_counts[name] += 1
+
+    def _get_entry(self, full_key: str) -> Optional[dict]:
+        if self.redis_available:
+            try:
+                serialized = self.client.get(full_key)
+            except redis.RedisError as e:
+                self._redis_error("get", e)
+                return None
+        else:
+            serialized = self.fallback.get(full_key)
+        if serialized is None:
+            return None
+
+        try:
+            entry = json.loads(serialized)
+        except (TypeError, ValueError) as e:
+            logger.error("Deserialization error: %s", e)
+            return None
+        # The fallback cache doesn't know the TTL of each entry
+        if not isinstance(entry, dict) or entry.get("expires", 0) <= time():
+            return None
+        return entry
+
+    def _recompute_early(self, entry: dict, beta: float) -> bool:
+        # XFetch: the longer the value took to compute, the earlier
+        # recomputing it becomes likely. 1 - random() is never 0.
+        return (
+            time() - entry["delta"] * beta * math.log(1 - random.random())
+            >= entry["expires"]
+        )
+
+    def _lock_compute(
+        self, full_key: str, lock_timeout: float
+    ) -> Optional[str]:
+        if self.redis_available:
+            token = uuid.uuid4().hex
+            try:
+                locked = self.client.set(
+                    f"{full_key}:lock",
+                    token,
+                    nx=True,
+                    px=int(lock_timeout * 1000),
+                )
+                return token if locked else None
+            except redis.RedisError as e:
+                self._redis_error("lock", e)
+
+        with self._lock:
+            if full_key in self._computing:
+                return None
+            self._computing.add(full_key)
+        return "local"
+
+    def _unlock_compute(self, full_key: str, token: str):
+        if token == "local":
+            with self._lock:
+                self._computing.discard(full_key)
+            return
+
+        try:
+            release = self._release_lock
+            if release is None:
+                release = self.client.register_script(RELEASE_LOCK_SCRIPT)
+                self._release_lock = release
+            release(keys=[f"{full_key}:lock"], args=[token])
+        except redis.RedisError as e:
+            self._redis_error("lock", e)
+
+    def _compute(
+        self,
+        full_key: str,
+        loader: Callable[[], Any],
+        ttl: int,
+        expected_type: type,
+    ):
+        started = monotonic()
+        serialized = self._serialize(loader())
+        self._count("computed")
+        entry = json.dumps(
+            {
+                "value": serialized,
+                "delta": monotonic() - started,
+                "expires": time() + ttl,
+            }
+        )
+        # Returned as later calls will read it from the cache
+        value = self._deserialize(serialized, expected_type)
+        if self.redis_available:
+            try:
+                self.client.setex(full_key, ttl, entry)
+                return value
+            except redis.RedisError as e:
+                self._redis_error("set", e)
+        self.fallback[full_key] = entry
+        return value
+
+    def get_or_compute(
+        self,
+        key: Union[str, tuple[str, Optional[dict[str, Any]]]],
+        loader: Callable[[], Any],
+        ttl: int = 300,
+        expected_type: type = str,
+        beta: float = 1.0,
+        lock_timeout: float = 10.0,
+        wait_timeout: float = 1.0,
+    ) -> Any:
+        """
+        Return the value cached for `key`, computing it with `loader()` and
+        caching it for `ttl` seconds if there is none.
+
+        Values are recomputed shortly before they expire, with a probability
+        growing as the expiry gets closer and the longer `loader` took
+        (XFetch, a higher `beta` recomputes earlier), so that hot keys don't
+        expire for every worker at once. A lock in Redis, or in this process
+        without Redis, makes a single worker recompute a key: the others
+        serve the previous value, or wait up to `wait_timeout` seconds for
+        the new one before computing it themselves. The lock expires after
+        `lock_timeout` seconds in case its holder dies.
+
+        Values are returned deserialized to `expected_type` whether they
+        were just computed or read from the cache. They are stored along
+        with their expiry and computation time, so keys used with this
+        method should only be read with it.
+        """
+        full_key = self._build_key(key)
+        entry = self._get_entry(full_key)
+        if entry is not None:
+            if not self._recompute_early(entry, beta):
+                return self._deserialize(entry["value"], expected_type)
+            self._count("early")
+
+        deadline = monotonic() + wait_timeout
+        while True:
+            token = self._lock_compute(full_key, lock_timeout)
+            if token is not None:
+                try:
+                    if entry is None:
+                        # Computed while we were waiting for the lock
+                        entry = self._get_entry(full_key)
+                        if entry is not None:
+                            return self._deserialize(
+                                entry["value"], expected_type
+                            )
+                    return self._compute(full_key, loader, ttl, expected_type)
+                finally:
+                    self._unlock_compute(full_key, token)
+
+            if entry is not None:
+                self._count("stale")
+                return self._deserialize(entry["value"], expected_type)
+            if monotonic() >= deadline:
+                break
+            sleep(COMPUTE_POLL_INTERVAL)
+            entry = self._get_entry(full_key)
+            if entry is not None:
+                self._count("waited")
+                return self._deserialize(entry["value"], expected_type)
+
+        logger.warning("Timed out waiting for %s to be computed", full_key)
+        return self._compute(full_key, loader, ttl, expected_type)
+
+    def compute_stats(self) -> dict:
+        """
+        Return how many values `get_or_compute` computed, recomputed early,
+        served stale while another worker recomputed them, or got after
+        waiting for another worker
+        """
+        with self._lock:
+            return dict(self._compute_counts)
+
+    def tier_stats(self) -> dict:
+        """
+        Return the hits and misses of the in-process cache (l1) and of
+        Redis or its fallback (l2), and how many values are kept in memory
+        """
+        with self._lock:
+            stats = {
+                tier: dict(counts)
+                for tier, counts in self._tier_counts.items()
+            }
+        with self._l1_lock:
+            stats["l1"]["size"] = len(self.l1)
+        return stats
@@ -0,0 +1,112 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, Mock, patch
+from urllib.parse import urlsplit
+
+from pymacaroons import Macaroon
+from pymacaroons.serializers import JsonSerializer
+from redis.exceptions import RedisError
+from requests import Response
+
+from canonicalwebteam.stores_web_redis.utility import RedisCache
+from tests.stub_store import StubStore
+
+
+class FakeClock:
+    """
+    Stand-in for `time.monotonic`, only moving when told to
+    """
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def make_response(body=None, status_code=200, headers=None):
+    """
+    Return a stand-in for a requests Response with a JSON `body`, with the
+    request attributes used by the gateways' error logging
+    """
+    response = Mock(spec=Response)
+    response.status_code = status_code
+    response.ok = status_code < 400
+    response.url = "https://api.snapcraft.io/"
+    response.headers = headers or {}
+    response.cookies = {}
+    response.request = Mock(headers={}, body=None, _cookies={})
+    response.json = MagicMock(return_value={} if body is None else body)
+    return response
+
+
+@patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+def local_cache(mock_redis, maxsize=10):
+    """
+    Return a RedisCache using its in-process fallback
+    """
+    mock_redis.return_value.ping.side_effect = RedisError("Down")
+    return RedisCache("test", maxsize=maxsize)
+
+
+def make_macaroons(expires_in=timedelta(hours=1)):
+    """
+    Return a serialized root macaroon and its discharge from SSO, which
+    expires after `expires_in`
+    """
+    root = Macaroon(location="dashboard", identifier="root", key="root-key")
+    root.add_third_party_caveat("login.ubuntu.com", "caveat-key", "sso")
+    discharge = Macaroon(
+        location="login.ubuntu.com", identifier="sso", key="caveat-key"
+    )
+    expires = datetime.now(timezone.utc) + expires_in
+    discharge.add_first_party_caveat(
+        f"login.ubuntu.com|expires|{expires:%Y-%m-%dT%H:%M:%S.%f}"
+    )
+    return root.serialize(), discharge.serialize()
+
+
+def make_token(expires_in=timedelta(hours=1)):
+    """
+    Return a publisher gateway token: a base64 JSON list of macaroons
+    """
+    macaroon = Macaroon(location="api.charmhub.io", identifier="id", key="k")
+    expires = datetime.now(timezone.utc) + expires_in
+    macaroon.add_first_party_caveat(f"time-before {expires.isoformat()}")
+    serialized = macaroon.serialize(JsonSerializer())
+    return base64.urlsafe_b64encode(
+        json.dumps([json.loads(serialized)]).encode()
+    ).decode()
+
+
+class StubStoreMixin:
+    """
+    Start a `StubStore` for the test case, shared by its tests
+    """
+
+    stub: StubStore
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubStore()
+        cls.stub.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+        super().tearDownClass()
+
+    def use_stub(self, gateway):
+        """
+        Send the requests of `gateway` to the stub store, keeping the
+        paths of its base URLs
+        """
+        for config in gateway.config.values():
+            path = urlsplit(config["base_url"]).path
+            config["base_url"] = f"{self.stub.url}{path}"
+        return gateway
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import unittest
+
+from canonicalwebteam.exceptions import (
+    PublisherMacaroonRefreshRequired,
+    StoreApiConnectionError,
+    StoreApiResourceNotFound,
+    StoreApiResponseErrorList,
+    StoreApiServiceUnavailableError,
+)
+from canonicalwebteam.store_api.async_dashboard import AsyncDashboard
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.async_publishergw import AsyncPublisherGW
+from tests.helpers import StubStoreMixin
+
+
+class AsyncGatewayTestCase(StubStoreMixin, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.stub.routes.clear()
+        self.stub.requests.clear()
+        self.stub.delay = 0.0
+
+
+class AsyncDeviceGWTest(AsyncGatewayTestCase):
+    async def asyncSetUp(self):
+        self.client = self.use_stub(AsyncDeviceGW("snap", store="test-store"))
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_get_item_details(self):
+        self.stub.add("GET", "/v2/snaps/info/test-snap", {"name": "test-snap"})
+
+        response = await self.client.get_item_details(
+            "test-snap", channel="edge", fields=["name", "summary"]
+        )
+
+        self.assertEqual(response, {"name": "test-snap"})
+        request = self.stub.requests[0]
+        self.assertEqual(request["query"]["fields"], ["name,summary"])
+        self.assertEqual(request["query"]["channel"], ["edge"])
+        self.assertEqual(request["headers"]["Snap-Device-Store"], "test-store")
+
+    async def test_search(self):
+        self.stub.add("GET", "/api/v1/snaps/search", {"_embedded": {}})
+
+        response = await self.client.get_category_items("games", size=3)
+
+        self.assertEqual(response, {"_embedded": {}})
+        request = self.stub.requests[0]
+        self.assertEqual(request["query"]["section"], ["games"])
+        self.assertEqual(request["query"]["size"], ["3"])
+        self.assertEqual(request["headers"]["X-Ubuntu-Architecture"], "wide")
+
+    async def test_error_list_mapping(self):
+        self.stub.add(
+            "GET",
+            "/v2/snaps/info/missing",
+            {"error-list": [{"code": "resource-not-found", "message": ""}]},
+            status=404,
+        )
+
+        with self.assertRaises(StoreApiResourceNotFound):
+            await self.client.get_item_details("missing")
+
+    async def test_server_error_mapping(self):
+        self.stub.add("GET", "/v2/snaps/categories", {}, status=503)
+
+        with self.assertRaises(StoreApiServiceUnavailableError):
+            await self.client.get_categories()
+
+    async def test_concurrent_requests(self):
+        self.stub.delay = 0.2
+        for i in range(50):
+            self.stub.add("GET", f"/v2/snaps/info/snap-{i}", {"name": i})
+
+        responses = await asyncio.wait_for(
+            asyncio.gather(
+                *[self.client.get_item_details(f"snap-{i}") for i in range(50)]
+            ),
+            # sequential requests would take 10s
+            timeout=5,
+        )
+
+        self.assertEqual([r["name"] for r in responses], list(range(50)))
+
+    async def test_connection_error(self):
+        client = AsyncDeviceGW("snap")
+        client.config[2]["base_url"] = "http://127.0.0.1:1/v2/snaps/"
+
+        with self.assertRaises(StoreApiConnectionError):
+            await client.get_item_details("test-snap")
+
+        await client.aclose()
+
+
+class AsyncPublisherGWTest(AsyncGatewayTestCase):
+    async def asyncSetUp(self):
+        self.client = AsyncPublisherGW("charm")
+        self.client.config = {
+            1: {"base_url": f"{self.stub.url}/v1"},
+            2: {"base_url": f"{self.stub.url}/v2"},
+        }
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_find_drops_none_params(self):
+        self.stub.add("GET", "/v2/charms/find", {"results": []})
+
+        response = await self.client.find("test", fields=["name"])
+
+        self.assertEqual(response, {"results": []})
+        query = self.stub.requests[0]["query"]
+        self.assertNotIn("type", query)
+        self.assertEqual(query["q"], ["test"])
+        self.assertEqual(query["fields"], ["name"])
+
+    async def test_exchange_usso_macaroons(self):
+        self.stub.add(
+            "POST", "/v1/tokens/usso/exchange", {"macaroon": "test-auth"}
+        )
+
+        macaroon = await self.client.exchange_usso_macaroons(
+            "root", "discharge", client_description="test"
+        )
+
+        self.assertEqual(macaroon, "test-auth")
+        request = self.stub.requests[0]
+        self.assertEqual(
+            request["headers"]["Authorization"],
+            "Macaroon root=root, discharge=discharge",
+        )
+        self.assertEqual(
+            json.loads(request["body"]), {"client-description": "test"}
+        )
+
+    async def test_accept_invite_error(self):
+        self.stub.add(
+            "POST",
+            "/v1/charm/test/collaborators/invites/accept",
+            {"error-list": [{"code": "invalid-token", "message": "Invalid"}]},
+            status=400,
+        )
+
+        with self.assertRaises(StoreApiResponseErrorList) as context:
+            await self.client.accept_invite("auth", "test", "token")
+
+        self.assertEqual(context.exception.status_code, 400)
+
+    async def test_delete_featured_snaps_sends_body(self):
+        self.stub.add("DELETE", "/v1/snap/featured", {}, status=201)
+
+        response = await self.client.delete_featured_snaps(
+            "auth", {"packages": ["test"]}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            json.loads(self.stub.requests[0]["body"]), {"packages": ["test"]}
+        )
+
+
+class AsyncDashboardTest(AsyncGatewayTestCase):
+    async def asyncSetUp(self):
+        self.client = AsyncDashboard()
+        self.client.config = {
+            1: {"base_url": f"{self.stub.url}/dev/api/"},
+            2: {"base_url": f"{self.stub.url}/api/v2/"},
+        }
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_get_snap_id(self):
+        self.stub.add(
+            "GET", "/dev/api/snaps/info/test-snap", {"snap_id": "test-id"}
+        )
+
+        snap_id = await self.client.get_snap_id(
+            {"macaroons": "test"}, "test-snap"
+        )
+
+        self.assertEqual(snap_id, "test-id")
+        self.assertEqual(self.stub.requests[0]["headers"]["Macaroons"], "test")
+
+    async def test_macaroon_refresh_required(self):
+        self.stub.add(
+            "GET",
+            "/dev/api/account",
+            {},
+            status=401,
+            headers={"WWW-Authenticate": "Macaroon needs_refresh=1"},
+        )
+
+        with self.assertRaises(PublisherMacaroonRefreshRequired):
+            await self.client.get_account({"macaroons": "test"})
+
+    async def test_post_username_no_content(self):
+        self.stub.add("PATCH", "/dev/api/account", {}, status=204)
+
+        response = await self.client.post_username(
+            {"macaroons": "test"}, "test-user"
+        )
+
+        self.assertEqual(response, {})
@@ -1,6 +1,9 @@
 import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
 
 from requests import Session
+from requests.exceptions import ConnectionError
 from requests.models import Response, Request
 from typing import Dict, cast
 from unittest.mock import Mock, MagicMock
@@ -14,10 +17,13 @@ from canonicalwebteam.exceptions import (
     StoreApiGatewayTimeoutError,
     StoreApiConnectionError,
     StoreApiResponseError,
+    StoreApiResponseErrorList,
+    StoreApiTooManyRequestsError,
 )
 from canonicalwebteam.store_api.base import (
     Base,
     logger as LOGGER,
+    parse_retry_after,
 )
 
 STATUS_MAPPING = {
@@ -69,6 +75,12 @@ class TestBase(unittest.TestCase):
         with self.assertRaises(StoreApiConnectionError):
             self.client.process_response(response)
 
+    def test_connection_error(self):
+        self.client.session.get.side_effect = ConnectionError("refused")
+
+        with self.assertRaises(StoreApiConnectionError):
+            self.client._request("GET", SAMPLE_URL)
+
     def test_process_response_not_ok(self):
         class NonSerializableClass:
             pass
@@ -135,3 +147,58 @@ class TestBase(unittest.TestCase):
 
         with self.assertRaises(StoreApiResponseError):
             self.client.process_response(response)
+
+    def test_process_response_too_many_requests(self):
+        response = build_response(429)
+        response.headers = {"Retry-After": "12"}
+
+        with self.assertRaises(StoreApiTooManyRequestsError) as context:
+            self.client.process_response(response)
+
+        self.assertEqual(context.exception.retry_after, 12.0)
+        self.assertEqual(context.exception.status_code, 429)
+
+    def test_process_response_too_many_requests_error_list(self):
+        response = build_response(429)
+        error_list = [{"code": "rate-limited", "message": "Slow down"}]
+        response.json.return_value = {"error-list": error_list}
+
+        with self.assertRaises(StoreApiResponseErrorList) as context:
+            self.client.process_response(response)
+
+        self.assertIsInstance(context.exception, StoreApiTooManyRequestsError)
+        self.assertEqual(context.exception.errors, error_list)
+
+        response.json.side_effect = ValueError("Not JSON")
+        with self.assertRaises(StoreApiTooManyRequestsError) as context:
+            self.client.process_response(response)
+        self.assertEqual(context.exception.errors, [])
+
+    def test_process_response_unavailable_retry_after(self):
+        response = build_response(503)
+        with self.assertRaises(StoreApiServiceUnavailableError) as context:
+            self.client.process_response(response)
+        self.assertIsNone(context.exception.retry_after)
+
+        response.headers = {"Retry-After": "3"}
+        with self.assertRaises(StoreApiServiceUnavailableError) as context:
+            self.client.process_response(response)
+        self.assertEqual(context.exception.retry_after, 3.0)
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertEqual(parse_retry_after("-1"), 0.0)
+
+    def test_http_date(self):
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+        delay = parse_retry_after(format_datetime(retry_at, usegmt=True))
+        self.assertTrue(28 <= delay <= 30)
+
+        past = datetime(2000, 1, 1, tzinfo=timezone.utc)
+        self.assertEqual(parse_retry_after(format_datetime(past, True)), 0.0)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
@@ -0,0 +1,208 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+from requests import Session
+
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from canonicalwebteam.store_api.publishergw import PublisherGW
+from canonicalwebteam.stores_web_redis.cached import (
+    cache_gateway,
+    cached,
+    method_key,
+)
+from canonicalwebteam.stores_web_redis.utility import RedisCache
+from tests.helpers import StubStoreMixin, local_cache, make_response
+
+
+class TestMethodKey(unittest.TestCase):
+    def test_defaults_and_keywords_share_a_key(self):
+        def get(name, channel="stable", fields=()):
+            pass
+
+        self.assertEqual(
+            method_key(get, ("test",), {}),
+            method_key(get, (), {"name": "test", "channel": "stable"}),
+        )
+        self.assertNotEqual(
+            method_key(get, ("test",), {}),
+            method_key(get, ("test", "edge"), {}),
+        )
+
+    def test_keyed_by_gateway_config(self):
+        snap = DeviceGW("snap", Mock(spec=Session))
+        store = DeviceGW("snap", Mock(spec=Session), store="test-store")
+
+        self.assertNotEqual(
+            method_key(DeviceGW.find, (snap, "test"), {}),
+            method_key(DeviceGW.find, (store, "test"), {}),
+        )
+
+    def test_credentials_are_hashed(self):
+        base_key, parts = method_key(
+            PublisherGW.get_releases,
+            (PublisherGW("charm", Mock(spec=Session)), "secret-token", "a"),
+            {},
+        )
+
+        self.assertEqual(base_key, "PublisherGW.get_releases")
+        self.assertNotIn("secret-token", parts["args"])
+
+
+class TestCached(unittest.TestCase):
+    def test_read_through(self):
+        calls = Mock(return_value={"name": "test"})
+
+        @cached(ttl=60, cache=local_cache())
+        def get_details(name):
+            return calls(name)
+
+        self.assertEqual(get_details("test"), {"name": "test"})
+        self.assertEqual(get_details(name="test"), {"name": "test"})
+        get_details("other")
+
+        self.assertEqual(calls.call_count, 2)
+
+    def test_exceptions_are_not_cached(self):
+        calls = Mock(side_effect=[ValueError(), ["test"]])
+
+        @cached(cache=local_cache())
+        def get_items():
+            return calls()
+
+        with self.assertRaises(ValueError):
+            get_items()
+        self.assertEqual(get_items(), ["test"])
+        self.assertEqual(get_items(), ["test"])
+
+    def test_custom_key_and_invalidate(self):
+        cache = local_cache()
+        calls = Mock(return_value="value")
+
+        @cached(cache=cache, key=lambda name: ("details", {"name": name}))
+        def get_details(name):
+            return calls()
+
+        get_details("test")
+        self.assertIn("test:details:name-test", cache.fallback)
+
+        get_details.invalidate("test")
+        get_details("test")
+        self.assertEqual(calls.call_count, 2)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_stored_in_redis(self, mock_redis):
+        client = MagicMock()
+        client.get.return_value = None
+        client.pipeline.return_value.execute.return_value = [None, -2]
+        mock_redis.return_value = client
+
+        @cached(namespace="test-namespace", ttl=60)
+        def get_categories():
+            return {"categories": []}
+
+        get_categories()
+
+        key, ttl, value = client.setex.call_args.args
+        self.assertTrue(key.startswith("test-namespace:"))
+        self.assertEqual((ttl, value), (60, '{"categories": []}'))
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_undecodable_entries_are_misses(self, mock_redis):
+        client = MagicMock()
+        client.get.return_value = "{not json"
+        # GET and PTTL replies, read together for the in-process cache
+        client.pipeline.return_value.execute.return_value = [
+            "{not json",
+            60000,
+        ]
+        mock_redis.return_value = client
+
+        @cached(cache=RedisCache("test", maxsize=10))
+        def get_categories():
+            return {"categories": []}
+
+        with self.assertLogs("canonicalwebteam.stores_web_redis.cached"):
+            self.assertEqual(get_categories(), {"categories": []})
+
+
+class TestAsyncCached(unittest.IsolatedAsyncioTestCase):
+    async def test_cache_is_called_off_the_event_loop(self):
+        threads = []
+        cache = Mock()
+        cache.get.side_effect = lambda key: threads.append(
+            threading.current_thread()
+        )
+        cache.set.side_effect = lambda *args, **kwargs: threads.append(
+            threading.current_thread()
+        )
+
+        @cached(cache=cache)
+        async def get_categories():
+            return {"categories": []}
+
+        self.assertEqual(await get_categories(), {"categories": []})
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+class TestCacheGateway(unittest.TestCase):
+    def test_caches_read_endpoints(self):
+        session = Mock(spec=Session)
+        session.get.return_value = make_response()
+        session.post.return_value = make_response()
+        gateway = cache_gateway(DeviceGW("snap", session), cache=local_cache())
+
+        gateway.get_item_details("test", fields=["title"])
+        gateway.get_item_details("test", fields=["title"])
+        gateway.get_categories()
+        gateway.get_categories(api_version=2)
+        gateway.get_public_metrics({})
+        gateway.get_public_metrics({})
+
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(session.post.call_count, 2)
+
+    def test_cached_per_credential(self):
+        session = Mock(spec=Session)
+        session.get.return_value = make_response()
+        gateway = cache_gateway(
+            PublisherGW("charm", session), cache=local_cache()
+        )
+
+        gateway.get_releases("first-token", "test-charm")
+        gateway.get_releases("first-token", package_name="test-charm")
+        gateway.get_releases("second-token", "test-charm")
+
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_custom_methods(self):
+        session = Mock(spec=Session)
+        session.get.return_value = make_response()
+        gateway = cache_gateway(
+            DeviceGW("snap", session),
+            cache=local_cache(),
+            methods={"find": 10},
+        )
+
+        gateway.find("test")
+        gateway.find("test")
+        gateway.get_categories()
+        gateway.get_categories()
+
+        self.assertEqual(session.get.call_count, 3)
+
+
+class TestAsyncCacheGateway(StubStoreMixin, unittest.IsolatedAsyncioTestCase):
+    async def test_caches_read_endpoints(self):
+        self.stub.add("GET", "/v2/snaps/categories", {"categories": []})
+        gateway = self.use_stub(AsyncDeviceGW("snap"))
+        cache_gateway(gateway, cache=local_cache())
+
+        first = await gateway.get_categories()
+        second = await gateway.get_categories()
+
+        self.assertEqual(first, {"categories": []})
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.stub.requests), 1)
@@ -0,0 +1,327 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+from requests import Session
+from requests.exceptions import ConnectionError
+
+from canonicalwebteam.exceptions import (
+    StoreApiCircuitBreaker,
+    StoreApiConcurrencyLimitError,
+    StoreApiResourceNotFound,
+    StoreApiServiceUnavailableError,
+)
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.circuit_breaker import (
+    CircuitBreaker,
+    endpoint_group,
+)
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from canonicalwebteam.store_api.limiter import AdaptiveLimiter
+from canonicalwebteam.stores_web_redis.utility import RedisCache
+from tests.helpers import FakeClock, StubStoreMixin, make_response
+
+URL = "https://dashboard.snapcraft.io/dev/api/snaps/info/test"
+
+
+class TestEndpointGroup(unittest.TestCase):
+    def test_group(self):
+        self.assertEqual(
+            endpoint_group("https://api.snapcraft.io/v2/snaps/info/vlc?a=b"),
+            "api.snapcraft.io/v2/snaps/info",
+        )
+        self.assertEqual(
+            endpoint_group("https://dashboard.snapcraft.io/dev/api/account"),
+            "dashboard.snapcraft.io/dev/api/account",
+        )
+
+    def test_identifiers_are_collapsed(self):
+        for url, group in [
+            (
+                "https://api.charmhub.io/v1/charm/postgresql/releases",
+                "api.charmhub.io/v1/charm/{name}",
+            ),
+            (
+                "https://api.charmhub.io/v1/charm/libraries/bulk",
+                "api.charmhub.io/v1/charm/libraries",
+            ),
+            (
+                "https://api.charmhub.io/v1/snap",
+                "api.charmhub.io/v1/snap",
+            ),
+            (
+                "https://api.charmhub.io/v1/brand/my-store/model",
+                "api.charmhub.io/v1/brand/{name}",
+            ),
+            (
+                "https://dashboard.snapcraft.io/api/v2/"
+                "validation-sets/mBYdWsECuAHqJ5cCTP8JsHn1HHBQdb9S",
+                "dashboard.snapcraft.io/api/v2/validation-sets",
+            ),
+            (
+                "https://example.com/v1/12/mBYdWsECuAHqJ5cCTP8JsHn1HHBQdb9S",
+                "example.com/v1/{id}/{id}",
+            ),
+        ]:
+            self.assertEqual(endpoint_group(url), group)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch(
+            "canonicalwebteam.store_api.circuit_breaker.monotonic", self.clock
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(
+            window_size=4,
+            minimum_calls=4,
+            open_duration=0.05,
+            half_open_calls=2,
+        )
+
+    def call(self, status_code=200, url=URL):
+        return self.breaker.call(
+            url, lambda: make_response(status_code=status_code)
+        )
+
+    def trip(self):
+        for status_code in (200, 200, 503, 500):
+            self.call(status_code)
+
+    def test_opens_on_failure_rate(self):
+        self.call(200)
+        self.call(503)
+        self.call(200)
+        self.assertEqual(self.breaker.stats()[endpoint_group(URL)]["calls"], 3)
+
+        self.call(503)
+
+        fn = Mock()
+        with self.assertRaises(StoreApiCircuitBreaker):
+            self.breaker.call(URL, fn)
+        fn.assert_not_called()
+        stats = self.breaker.stats()[endpoint_group(URL)]
+        self.assertEqual(stats["state"], "open")
+        self.assertEqual(stats["rejected"], 1)
+
+    def test_exceptions_are_failures(self):
+        def fail():
+            raise ConnectionError()
+
+        for _ in range(4):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(URL, fail)
+
+        with self.assertRaises(StoreApiCircuitBreaker):
+            self.call()
+
+    def test_client_errors_are_not_failures(self):
+        for _ in range(8):
+            self.call(404)
+
+        self.assertEqual(self.call(200).status_code, 200)
+
+    def test_opens_on_slow_calls(self):
+        breaker = CircuitBreaker(
+            slow_call_rate_threshold=0.5,
+            slow_call_duration=0.01,
+            minimum_calls=2,
+        )
+
+        def slow():
+            self.clock.advance(0.02)
+            return make_response(status_code=200)
+
+        breaker.call(URL, slow)
+        breaker.call(URL, slow)
+
+        with self.assertRaises(StoreApiCircuitBreaker):
+            breaker.call(URL, slow)
+
+    def test_packages_share_a_circuit(self):
+        for name in ("postgresql", "mysql", "redis"):
+            self.call(url=f"https://api.charmhub.io/v1/charm/{name}")
+
+        self.assertEqual(
+            list(self.breaker.stats()), ["api.charmhub.io/v1/charm/{name}"]
+        )
+
+    def test_groups_are_independent(self):
+        self.trip()
+
+        other = "https://dashboard.snapcraft.io/dev/api/account"
+        self.assertEqual(self.call(url=other).status_code, 200)
+
+    def test_half_open_probes(self):
+        self.trip()
+        self.clock.advance(0.06)
+
+        group = self.breaker.before_call(URL)
+        self.breaker.before_call(URL)
+        self.assertEqual(self.breaker.stats()[group]["state"], "half-open")
+        # Only `half_open_calls` probes go through
+        with self.assertRaises(StoreApiCircuitBreaker):
+            self.call()
+
+        self.breaker.after_call(group, 0.0, failed=False)
+        self.breaker.after_call(group, 0.0, failed=False)
+
+        self.assertEqual(self.breaker.stats()[group]["state"], "closed")
+        self.assertEqual(self.call().status_code, 200)
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        self.clock.advance(0.06)
+
+        self.call(503)
+
+        with self.assertRaises(StoreApiCircuitBreaker):
+            self.call()
+
+
+class TestSharedCircuitBreaker(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_open_circuit_is_shared(self, mock_redis):
+        data = {}
+        client = MagicMock()
+        client.get.side_effect = data.get
+        client.setex.side_effect = lambda key, ttl, value: data.update(
+            {key: value}
+        )
+        client.delete.side_effect = lambda key: data.pop(key, None)
+        mock_redis.return_value = client
+
+        first, second = [
+            CircuitBreaker(
+                minimum_calls=2,
+                sync_interval=0,
+                cache=RedisCache("test", maxsize=10, l1_maxsize=0),
+            )
+            for _ in range(2)
+        ]
+
+        for _ in range(2):
+            first.call(URL, lambda: make_response(status_code=503))
+
+        with self.assertRaises(StoreApiCircuitBreaker):
+            second.call(URL, lambda: make_response(status_code=200))
+        self.assertIn(
+            "test:circuit-breaker:group-dashboard.snapcraft.io/dev/api/snaps",
+            data,
+        )
+
+    def test_cache_is_not_called_under_the_lock(self):
+        breaker = CircuitBreaker(minimum_calls=2, sync_interval=0)
+        circuit = breaker._circuit(endpoint_group(URL))
+        breaker.cache = Mock()
+
+        def unlocked(*args, **kwargs):
+            self.assertFalse(circuit.lock.locked())
+
+        breaker.cache.get.side_effect = unlocked
+        breaker.cache.set.side_effect = unlocked
+        for _ in range(2):
+            breaker.call(URL, lambda: make_response(status_code=503))
+
+        breaker.cache.get.assert_called()
+        breaker.cache.set.assert_called_once()
+
+
+class TestAsyncSharedCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    async def test_cache_is_called_off_the_event_loop(self):
+        breaker = CircuitBreaker(minimum_calls=1, sync_interval=0)
+        threads = []
+        breaker.cache = Mock()
+        breaker.cache.get.side_effect = lambda key: threads.append(
+            threading.current_thread()
+        )
+        breaker.cache.set.side_effect = lambda *args, **kwargs: (
+            threads.append(threading.current_thread())
+        )
+
+        async def fail():
+            return make_response(status_code=503)
+
+        await breaker.acall(URL, fail)
+
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+class TestGatewayCircuitBreaker(unittest.TestCase):
+    def test_fails_fast_when_open(self):
+        session = Mock(spec=Session)
+        session.get.return_value = make_response(status_code=503)
+        client = DeviceGW(
+            "snap",
+            session,
+            circuit_breaker=CircuitBreaker(minimum_calls=2),
+        )
+
+        for _ in range(2):
+            with self.assertRaises(StoreApiServiceUnavailableError):
+                client.get_item_details("test")
+        with self.assertRaises(StoreApiCircuitBreaker):
+            client.get_item_details("test")
+
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(
+            client.circuit_stats()["api.snapcraft.io/v2/snaps/info"]["state"],
+            "open",
+        )
+
+    def test_shed_requests_are_not_failures(self):
+        session = Mock(spec=Session)
+        limiter = AdaptiveLimiter(initial_limit=1, queue_timeout=0)
+        client = DeviceGW(
+            "snap",
+            session,
+            circuit_breaker=CircuitBreaker(minimum_calls=2),
+            limiter=limiter,
+        )
+        limiter.acquire("https://api.snapcraft.io/v2/snaps/info/test")
+
+        for _ in range(3):
+            with self.assertRaises(StoreApiConcurrencyLimitError):
+                client.get_item_details("test")
+
+        session.get.assert_not_called()
+        self.assertEqual(
+            client.circuit_stats()["api.snapcraft.io/v2/snaps/info"]["state"],
+            "closed",
+        )
+
+    def test_no_circuit_breaker_by_default(self):
+        self.assertEqual(
+            DeviceGW("snap", Mock(spec=Session)).circuit_stats(), {}
+        )
+
+
+class TestAsyncGatewayCircuitBreaker(
+    StubStoreMixin, unittest.IsolatedAsyncioTestCase
+):
+    async def test_fails_fast_when_open(self):
+        self.stub.add("GET", "/v2/snaps/info/down", {}, status=503)
+        self.stub.add(
+            "GET",
+            "/v2/snaps/info/missing",
+            {"error-list": [{"code": "resource-not-found", "message": ""}]},
+            status=404,
+        )
+
+        async with AsyncDeviceGW(
+            "snap", circuit_breaker=CircuitBreaker(minimum_calls=3)
+        ) as client:
+            self.use_stub(client)
+
+            with self.assertRaises(StoreApiResourceNotFound):
+                await client.get_item_details("missing")
+            for _ in range(2):
+                with self.assertRaises(StoreApiServiceUnavailableError):
+                    await client.get_item_details("down")
+            with self.assertRaises(StoreApiCircuitBreaker):
+                await client.get_item_details("down")
+
+        self.assertEqual(len(self.stub.requests), 3)
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from requests import Session
+
+from canonicalwebteam.exceptions import (
+    StoreApiResourceNotFound,
+    StoreApiTimeoutError,
+)
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.coalescing import SingleFlight, request_key
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from tests.helpers import StubStoreMixin, make_response
+
+
+class TestRequestKey(unittest.TestCase):
+    def test_same_request(self):
+        self.assertEqual(
+            request_key("GET", "/info", {"params": {"a": 1, "b": 2}}),
+            request_key("get", "/info", {"params": {"b": 2, "a": 1}}),
+        )
+
+    def test_headers_are_part_of_the_key(self):
+        self.assertNotEqual(
+            request_key("GET", "/info", {"headers": {"Store": "a"}}),
+            request_key("GET", "/info", {"headers": {"Store": "b"}}),
+        )
+
+    def test_writes_are_not_coalesced(self):
+        self.assertIsNone(request_key("POST", "/metrics", {}))
+        self.assertIsNone(request_key("GET", "/info", {"json": {}}))
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.singleflight = SingleFlight()
+        self.release = threading.Event()
+
+    def run_concurrently(self, fn, count=5):
+        with ThreadPoolExecutor(count) as pool:
+            futures = [
+                pool.submit(self.singleflight.do, "key", fn)
+                for _ in range(count)
+            ]
+            while self.singleflight.stats()["calls"] < count:
+                time.sleep(0.001)
+            self.release.set()
+        return futures
+
+    def test_result_is_shared(self):
+        fn = Mock(side_effect=lambda: self.release.wait() and {"a": 1})
+
+        futures = self.run_concurrently(fn)
+
+        fn.assert_called_once()
+        self.assertEqual([f.result() for f in futures], [{"a": 1}] * 5)
+        self.assertEqual(
+            self.singleflight.stats(),
+            {"calls": 5, "coalesced": 4, "in_flight": 0},
+        )
+
+    def test_exception_is_shared(self):
+        def fail():
+            self.release.wait()
+            raise StoreApiTimeoutError("Request timed out")
+
+        futures = self.run_concurrently(fail)
+
+        for future in futures:
+            self.assertIsInstance(future.exception(), StoreApiTimeoutError)
+
+    def test_nothing_is_cached(self):
+        fn = Mock(return_value=1)
+
+        self.singleflight.do("key", fn)
+        self.singleflight.do("key", fn)
+
+        self.assertEqual(fn.call_count, 2)
+
+
+class TestGatewayCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.session = Mock(spec=Session)
+
+        def slow_get(**kwargs):
+            self.release.wait()
+            return make_response({"name": "test"})
+
+        self.session.get.side_effect = slow_get
+
+    def test_identical_gets_are_coalesced(self):
+        client = DeviceGW("snap", self.session, coalesce=True)
+
+        with ThreadPoolExecutor(4) as pool:
+            futures = [
+                pool.submit(client.get_item_details, "test", fields=["name"])
+                for _ in range(4)
+            ]
+            while client.coalesce_stats()["calls"] < 4:
+                time.sleep(0.001)
+            self.release.set()
+
+        self.assertEqual(self.session.get.call_count, 1)
+        for future in futures:
+            self.assertEqual(future.result(), {"name": "test"})
+        self.assertEqual(client.coalesce_stats()["coalesced"], 3)
+
+    def test_disabled_by_default(self):
+        self.release.set()
+        client = DeviceGW("snap", self.session)
+
+        client.get_item_details("test")
+        client.get_item_details("test")
+
+        self.assertEqual(self.session.get.call_count, 2)
+        self.assertEqual(client.coalesce_stats(), {})
+
+
+class TestAsyncCoalescing(StubStoreMixin, unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.stub.requests.clear()
+        self.stub.delay = 0.1
+        self.client = self.use_stub(AsyncDeviceGW("snap", coalesce=True))
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_identical_gets_are_coalesced(self):
+        self.stub.add("GET", "/v2/snaps/info/test", {"name": "test"})
+
+        results = await asyncio.gather(
+            *[self.client.get_item_details("test") for _ in range(5)],
+            self.client.get_item_details("test", channel="edge"),
+        )
+
+        self.assertEqual(results, [{"name": "test"}] * 6)
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(self.client.coalesce_stats()["coalesced"], 4)
+
+    async def test_exception_is_shared(self):
+        self.stub.add(
+            "GET",
+            "/v2/snaps/info/missing",
+            {"error-list": [{"code": "resource-not-found", "message": ""}]},
+            status=404,
+        )
+
+        results = await asyncio.gather(
+            *[self.client.get_item_details("missing") for _ in range(3)],
+            return_exceptions=True,
+        )
+
+        self.assertEqual(len(self.stub.requests), 1)
+        for result in results:
+            self.assertIsInstance(result, StoreApiResourceNotFound)
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        self.stub.add("GET", "/v2/snaps/info/test", {"name": "test"})
+
+        first = asyncio.ensure_future(self.client.get_item_details("test"))
+        second = asyncio.ensure_future(self.client.get_item_details("test"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        self.assertEqual(await second, {"name": "test"})
+        self.assertEqual(len(self.stub.requests), 1)
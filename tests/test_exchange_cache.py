@@ -0,0 +1,211 @@
+import json
+import sys
+import threading
+import time
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock, Mock, patch
+
+from requests import Session
+
+from canonicalwebteam.store_api.async_publishergw import AsyncPublisherGW
+from canonicalwebteam.store_api.exchange_cache import ExchangeCache
+from canonicalwebteam.store_api.publishergw import PublisherGW
+from canonicalwebteam.stores_web_redis.utility import RedisCache
+from tests.helpers import (
+    StubStoreMixin,
+    local_cache,
+    make_response,
+    make_token,
+)
+
+HEADERS = {"Macaroons": "issued-macaroon"}
+
+
+class TestExchangeCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ExchangeCache(local_cache(), secret="test-secret")
+
+    def test_round_trip(self):
+        token = make_token()
+        self.cache.set("tokens/exchange", HEADERS, {}, token)
+
+        self.assertEqual(self.cache.get("tokens/exchange", HEADERS, {}), token)
+        self.assertIsNone(
+            self.cache.get("tokens/exchange", {"Macaroons": "other"}, {})
+        )
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_stored_hashed_and_encrypted(self):
+        token = make_token()
+        self.cache.set("tokens/exchange", HEADERS, {}, token)
+
+        ((key, value),) = self.cache.cache.fallback.items()
+        self.assertNotIn("issued-macaroon", key)
+        self.assertNotIn(token, value)
+
+    def test_ttl_bounded_by_expiry(self):
+        redis_cache = Mock()
+        cache = ExchangeCache(redis_cache, secret="test-secret", max_ttl=3600)
+
+        cache.set(
+            "tokens/exchange", HEADERS, {}, make_token(timedelta(days=60))
+        )
+        cache.set(
+            "tokens/exchange", HEADERS, {}, make_token(timedelta(minutes=5))
+        )
+        cache.set("tokens/exchange", HEADERS, {}, "not-a-macaroon")
+
+        ttls = [c.kwargs["ttl"] for c in redis_cache.set.call_args_list]
+        self.assertEqual(ttls[0], 3600)
+        self.assertAlmostEqual(ttls[1], 300, delta=2)
+        self.assertEqual(ttls[2], 3600)
+
+    def test_expired_macaroons_not_cached(self):
+        redis_cache = Mock()
+        cache = ExchangeCache(redis_cache, secret="test-secret")
+
+        cache.set(
+            "tokens/exchange", HEADERS, {}, make_token(timedelta(seconds=-1))
+        )
+
+        redis_cache.set.assert_not_called()
+
+    def test_expired_entries_ignored(self):
+        cache = ExchangeCache(local_cache(), secret="test-secret", max_ttl=1)
+        cache.set("tokens/exchange", HEADERS, {}, "not-a-macaroon")
+
+        with patch(
+            "canonicalwebteam.store_api.exchange_cache.time",
+            return_value=time.time() + 2,
+        ):
+            self.assertIsNone(cache.get("tokens/exchange", HEADERS, {}))
+
+    def test_other_secret_misses(self):
+        self.cache.set("tokens/exchange", HEADERS, {}, "not-a-macaroon")
+        other = ExchangeCache(self.cache.cache, secret="other-secret")
+        # Same key, as if the secret had been rotated
+        other._cipher._hash_key = self.cache._cipher._hash_key
+
+        with self.assertLogs("canonicalwebteam.store_api.exchange_cache"):
+            self.assertIsNone(other.get("tokens/exchange", HEADERS, {}))
+
+    def test_secret_required(self):
+        with patch(
+            "canonicalwebteam.store_api.exchange_cache.EXCHANGE_CACHE_KEY",
+            None,
+        ):
+            with self.assertRaises(ValueError):
+                ExchangeCache(local_cache())
+
+    def test_pynacl_required(self):
+        with patch.dict(sys.modules, {"nacl.secret": None}):
+            with self.assertRaisesRegex(ImportError, "pip install pynacl"):
+                ExchangeCache(local_cache(), secret="test-secret")
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_stored_in_redis(self, mock_redis):
+        client = MagicMock()
+        mock_redis.return_value = client
+        cache = ExchangeCache(
+            RedisCache("test", 10, l1_maxsize=0), secret="test-secret"
+        )
+
+        cache.set("tokens/exchange", HEADERS, {}, "not-a-macaroon")
+        key, ttl, value = client.setex.call_args.args
+        client.get.return_value = value
+
+        self.assertRegex(key, r"^test:token-exchange:credentials-[0-9a-f]+$")
+        self.assertEqual(
+            cache.get("tokens/exchange", HEADERS, {}), "not-a-macaroon"
+        )
+        client.get.assert_called_once_with(key)
+
+
+class TestPublisherGWExchangeCache(unittest.TestCase):
+    def setUp(self):
+        self.session = Mock(spec=Session)
+        self.client = PublisherGW(
+            "charm",
+            self.session,
+            exchange_cache=ExchangeCache(local_cache(), secret="test-secret"),
+        )
+
+    def test_exchange_macaroons_cached(self):
+        self.session.post.return_value = make_response(
+            {"macaroon": "exchanged"}
+        )
+
+        for _ in range(3):
+            macaroon = self.client.exchange_macaroons("issued-macaroon")
+
+        self.assertEqual(macaroon, "exchanged")
+        self.session.post.assert_called_once()
+
+    def test_exchange_usso_macaroons_keyed_by_input(self):
+        self.session.post.side_effect = [
+            make_response({"macaroon": "first"}),
+            make_response({"macaroon": "second"}),
+        ]
+
+        first = self.client.exchange_usso_macaroons("root", "discharge")
+        second = self.client.exchange_usso_macaroons(
+            "root", "discharge", client_description="test"
+        )
+
+        self.assertEqual((first, second), ("first", "second"))
+        self.assertEqual(
+            self.client.exchange_usso_macaroons("root", "discharge"), "first"
+        )
+        self.assertEqual(self.session.post.call_count, 2)
+
+    def test_no_cache_by_default(self):
+        client = PublisherGW("charm", self.session)
+        self.session.post.return_value = make_response(
+            {"macaroon": "exchanged"}
+        )
+
+        client.exchange_macaroons("issued-macaroon")
+        client.exchange_macaroons("issued-macaroon")
+
+        self.assertEqual(self.session.post.call_count, 2)
+
+
+class TestAsyncPublisherGWExchangeCache(
+    StubStoreMixin, unittest.IsolatedAsyncioTestCase
+):
+    def setUp(self):
+        self.stub.requests.clear()
+
+    async def test_exchange_macaroons_cached(self):
+        self.stub.add("POST", "/v1/tokens/exchange", {"macaroon": "exchanged"})
+        client = AsyncPublisherGW(
+            "charm",
+            exchange_cache=ExchangeCache(local_cache(), secret="test-secret"),
+        )
+        self.use_stub(client)
+
+        first = await client.exchange_macaroons("issued-macaroon")
+        second = await client.exchange_macaroons("issued-macaroon")
+
+        self.assertEqual((first, second), ("exchanged", "exchanged"))
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(json.loads(self.stub.requests[0]["body"]), {})
+
+    async def test_cache_is_called_off_the_event_loop(self):
+        self.stub.add("POST", "/v1/tokens/exchange", {"macaroon": "exchanged"})
+        threads = []
+        exchange_cache = Mock()
+        exchange_cache.get.side_effect = lambda *args: threads.append(
+            threading.current_thread()
+        )
+        exchange_cache.set.side_effect = lambda *args: threads.append(
+            threading.current_thread()
+        )
+        client = AsyncPublisherGW("charm", exchange_cache=exchange_cache)
+        self.use_stub(client)
+
+        await client.exchange_macaroons("issued-macaroon")
+
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
@@ -0,0 +1,271 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from requests import Session
+from requests.exceptions import Timeout
+
+from canonicalwebteam.exceptions import StoreApiTimeoutError
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from canonicalwebteam.store_api.hedging import HedgePolicy
+from tests.helpers import StubStoreMixin, make_response
+
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_delay_from_percentile(self):
+        policy = HedgePolicy(percentile=90, min_delay=0.01, min_samples=10)
+        self.assertEqual(policy.delay(), policy.max_delay)
+
+        for latency in range(1, 101):
+            policy.record_latency(latency / 1000)
+
+        self.assertAlmostEqual(policy.delay(), 0.09, places=2)
+
+    def test_delay_is_clamped(self):
+        policy = HedgePolicy(min_delay=0.2, max_delay=0.5, min_samples=1)
+        policy.record_latency(0.001)
+        self.assertEqual(policy.delay(), 0.2)
+        policy = HedgePolicy(min_delay=0.2, max_delay=0.5, min_samples=1)
+        policy.record_latency(3)
+        self.assertEqual(policy.delay(), 0.5)
+
+    def test_bad_values(self):
+        with self.assertRaises(ValueError):
+            HedgePolicy(percentile=0)
+        with self.assertRaises(ValueError):
+            HedgePolicy(min_delay=1, max_delay=0.5)
+
+    def test_hedge_wins(self):
+        policy = HedgePolicy(max_delay=0.01, budget_ratio=1)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(5)
+                return "slow"
+            return "fast"
+
+        # Without waiting for the first attempt
+        self.assertEqual(policy.call(fn), "fast")
+
+        stats = policy.stats()
+        self.assertEqual(stats["hedged"], 1)
+        self.assertEqual(stats["hedge_wins"], 1)
+        self.assertEqual(stats["hedge_rate"], 1.0)
+
+    def test_primary_wins(self):
+        policy = HedgePolicy(max_delay=0.01, budget_ratio=1)
+        hedged = threading.Event()
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                hedged.wait(5)
+                return "first"
+            hedged.set()
+            release.wait(5)
+            return "hedge"
+
+        self.assertEqual(policy.call(fn), "first")
+        self.assertEqual(policy.stats()["hedge_wins"], 0)
+
+    def test_concurrency_is_not_capped(self):
+        policy = HedgePolicy(max_delay=1, max_workers=2)
+        # Every caller must be in its first attempt at once
+        barrier = threading.Barrier(8, timeout=5)
+        threads = set()
+        results = []
+
+        def fn():
+            threads.add(threading.current_thread())
+            barrier.wait()
+            return "ok"
+
+        callers = [
+            threading.Thread(target=lambda: results.append(policy.call(fn)))
+            for _ in range(8)
+        ]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+
+        self.assertEqual(results, ["ok"] * 8)
+        # Callers beyond the pool's threads sent their request themselves
+        self.assertEqual(len(threads - set(callers)), 2)
+        self.assertEqual(policy.stats()["hedged"], 0)
+
+    def test_fast_primary_is_not_hedged(self):
+        policy = HedgePolicy(max_delay=0.5, budget_ratio=1)
+        fn = Mock(return_value="ok")
+
+        self.assertEqual(policy.call(fn), "ok")
+
+        fn.assert_called_once()
+        self.assertEqual(policy.stats()["hedged"], 0)
+
+    def test_budget(self):
+        policy = HedgePolicy(max_delay=0.01, budget_ratio=0.5)
+        fn = Mock(side_effect=lambda: time.sleep(0.03))
+
+        for _ in range(4):
+            policy.call(fn)
+
+        self.assertEqual(policy.stats()["hedged"], 2)
+        self.assertEqual(fn.call_count, 6)
+
+    def test_error_waits_for_other_attempt(self):
+        policy = HedgePolicy(max_delay=0.01, budget_ratio=1)
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.05)
+                raise StoreApiTimeoutError("Request timed out")
+            time.sleep(0.1)
+            return "ok"
+
+        self.assertEqual(policy.call(fn), "ok")
+
+    def test_both_attempts_fail(self):
+        policy = HedgePolicy(max_delay=0.01, budget_ratio=1)
+
+        def fn():
+            time.sleep(0.03)
+            raise StoreApiTimeoutError("Request timed out")
+
+        with self.assertRaises(StoreApiTimeoutError):
+            policy.call(fn)
+
+
+class TestAsyncHedgePolicy(unittest.IsolatedAsyncioTestCase):
+    async def test_loser_is_cancelled(self):
+        policy = HedgePolicy(max_delay=0.01, budget_ratio=1)
+        cancelled = asyncio.Event()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(1)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return len(calls)
+
+        self.assertEqual(await policy.acall(fn), 2)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        self.assertEqual(policy.stats()["hedge_wins"], 1)
+
+    async def test_caller_cancelled(self):
+        policy = HedgePolicy(max_delay=0.01, budget_ratio=1)
+        cancelled = []
+
+        async def fn():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        task = asyncio.ensure_future(policy.acall(fn))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+        self.assertEqual(len(cancelled), 2)
+
+
+class TestGatewayHedging(unittest.TestCase):
+    def test_slow_get_is_hedged(self):
+        session = Mock(spec=Session)
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def get(**kwargs):
+            if session.get.call_count == 1:
+                release.wait(5)
+                return make_response({"name": "slow"})
+            return make_response({"name": "fast"})
+
+        session.get.side_effect = get
+        client = DeviceGW(
+            "snap",
+            session,
+            hedging=HedgePolicy(max_delay=0.02, budget_ratio=1),
+        )
+
+        self.assertEqual(client.get_item_details("test"), {"name": "fast"})
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(client.hedge_stats()["hedge_wins"], 1)
+
+    def test_failed_get_uses_the_hedge(self):
+        session = Mock(spec=Session)
+
+        def get(**kwargs):
+            if session.get.call_count == 1:
+                time.sleep(0.05)
+                raise Timeout("Read timed out")
+            time.sleep(0.1)
+            return make_response({"name": "hedge"})
+
+        session.get.side_effect = get
+        client = DeviceGW(
+            "snap",
+            session,
+            hedging=HedgePolicy(max_delay=0.02, budget_ratio=1),
+        )
+
+        self.assertEqual(client.get_item_details("test"), {"name": "hedge"})
+
+    def test_post_is_not_hedged(self):
+        session = Mock(spec=Session)
+        session.post.side_effect = lambda **kwargs: time.sleep(
+            0.05
+        ) or make_response({})
+        client = DeviceGW(
+            "snap",
+            session,
+            hedging=HedgePolicy(max_delay=0.01, budget_ratio=1),
+        )
+
+        client.get_public_metrics({})
+
+        self.assertEqual(session.post.call_count, 1)
+        self.assertEqual(client.hedge_stats()["requests"], 0)
+
+    def test_no_hedging_by_default(self):
+        self.assertEqual(
+            DeviceGW("snap", Mock(spec=Session)).hedge_stats(), {}
+        )
+
+
+class TestAsyncGatewayHedging(
+    StubStoreMixin, unittest.IsolatedAsyncioTestCase
+):
+    async def test_slow_get_is_hedged(self):
+        self.stub.delay = 0.1
+        self.stub.add("GET", "/v2/snaps/info/test", {"name": "test"})
+
+        async with AsyncDeviceGW(
+            "snap", hedging=HedgePolicy(max_delay=0.02, budget_ratio=1)
+        ) as client:
+            self.use_stub(client)
+            details = await client.get_item_details("test")
+
+        self.assertEqual(details, {"name": "test"})
+        self.assertEqual(client.hedge_stats()["hedged"], 1)
+        self.assertEqual(len(self.stub.requests), 2)
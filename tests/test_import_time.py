@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+import unittest
+
+GATEWAY_MODULES = [
+    "canonicalwebteam.store_api.devicegw",
+    "canonicalwebteam.store_api.publishergw",
+    "canonicalwebteam.store_api.dashboard",
+    "canonicalwebteam.stores_web_redis.utility",
+    "canonicalwebteam.retry_utils",
+]
+# Only imported once a client needs them
+LAZY_MODULES = ["redis", "cachetools", "pymacaroons", "nacl", "httpx"]
+# Time spent running our own modules, excluding their dependencies
+BUDGET_MS = float(os.getenv("STORE_API_IMPORT_BUDGET_MS", "100"))
+
+
+def import_in_subprocess(code: str) -> str:
+    """
+    Run `code` in a fresh interpreter with `-X importtime` and return
+    what it printed on stderr
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stderr
+
+
+def parse_importtime(output: str) -> dict:
+    """
+    Return the self time, in microseconds, of each module in the output of
+    `-X importtime`
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line.replace("import time:", "").split("|")
+        times[module.strip()] = int(self_us)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    def setUp(self):
+        self.times = parse_importtime(
+            import_in_subprocess(
+                "\n".join(f"import {module}" for module in GATEWAY_MODULES)
+            )
+        )
+
+    def test_optional_dependencies_are_lazy(self):
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, self.times)
+
+    def test_import_budget(self):
+        own_ms = (
+            sum(
+                us
+                for module, us in self.times.items()
+                if module.startswith("canonicalwebteam")
+            )
+            / 1000
+        )
+
+        self.assertLess(
+            own_ms,
+            BUDGET_MS,
+            "Importing the gateways got slower, see "
+            "`python -X importtime -c 'import canonicalwebteam.store_api."
+            "publishergw'`",
+        )
+
+    def test_no_clients_built_on_import(self):
+        import_in_subprocess(
+            "import gc\n"
+            "import canonicalwebteam.store_api.publishergw\n"
+            "from canonicalwebteam.store_api.base import Base\n"
+            "assert not any(\n"
+            "    isinstance(o, Base) for o in gc.get_objects()\n"
+            ")\n"
+        )
@@ -0,0 +1,123 @@
+import unittest
+from unittest.mock import Mock
+
+from requests import Session
+
+from canonicalwebteam.exceptions import (
+    StoreApiResourceNotFound,
+    StoreApiResponseErrorList,
+)
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from canonicalwebteam.store_api.timeouts import store_deadline
+from tests.helpers import StubStoreMixin, make_response
+
+NOT_FOUND = {"error-list": [{"code": "resource-not-found", "message": ""}]}
+
+
+class TestGetItemsDetails(unittest.TestCase):
+    def setUp(self):
+        self.session = Mock(spec=Session)
+        self.client = DeviceGW("snap", self.session)
+
+    def test_fan_out(self):
+        def get(url, **kwargs):
+            if url.endswith("/missing"):
+                return make_response(NOT_FOUND, status_code=404)
+            return make_response({"name": url.rsplit("/", 1)[1]})
+
+        self.session.get.side_effect = get
+
+        results = self.client.get_items_details(
+            ["firefox", "missing", "vlc", "firefox"], fields=["name"]
+        )
+
+        self.assertEqual(list(results), ["firefox", "missing", "vlc"])
+        self.assertEqual(results["firefox"], {"name": "firefox"})
+        self.assertEqual(results["vlc"], {"name": "vlc"})
+        self.assertIsInstance(results["missing"], StoreApiResourceNotFound)
+        self.assertEqual(self.session.get.call_count, 3)
+        self.assertEqual(
+            self.session.get.call_args.kwargs["params"], {"fields": "name"}
+        )
+
+    def test_fan_out_honours_deadline(self):
+        self.session.get.return_value = make_response({})
+
+        with store_deadline(5):
+            self.client.get_items_details(["a", "b"])
+
+        for call in self.session.get.call_args_list:
+            self.assertLessEqual(call.kwargs["timeout"][1], 5)
+
+    def test_bulk(self):
+        self.session.post.return_value = make_response(
+            {
+                "results": [
+                    {
+                        "result": "install",
+                        "name": "firefox",
+                        "snap": {"name": "firefox"},
+                    },
+                    {
+                        "result": "error",
+                        "name": "missing",
+                        "error": {"code": "name-not-found", "message": "?"},
+                    },
+                    {
+                        "result": "error",
+                        "name": "private",
+                        "error": {"code": "not-allowed", "message": "?"},
+                    },
+                ]
+            }
+        )
+
+        results = self.client.get_items_details(
+            ["firefox", "missing", "private", "gone"],
+            fields=["name"],
+            channel="edge",
+            bulk=True,
+        )
+
+        self.session.get.assert_not_called()
+        payload = self.session.post.call_args.kwargs["json"]
+        self.assertEqual(payload["fields"], ["name"])
+        self.assertEqual(
+            payload["actions"][0],
+            {
+                "action": "install",
+                "instance-key": "0",
+                "name": "firefox",
+                "channel": "edge",
+            },
+        )
+        self.assertEqual(results["firefox"], {"name": "firefox"})
+        self.assertIsInstance(results["missing"], StoreApiResourceNotFound)
+        self.assertIsInstance(results["private"], StoreApiResponseErrorList)
+        self.assertIsInstance(results["gone"], StoreApiResourceNotFound)
+
+    def test_empty(self):
+        self.assertEqual(self.client.get_items_details([]), {})
+        self.session.get.assert_not_called()
+
+
+class TestAsyncGetItemsDetails(
+    StubStoreMixin, unittest.IsolatedAsyncioTestCase
+):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub.add("GET", "/v2/snaps/info/firefox", {"name": "firefox"})
+        cls.stub.add("GET", "/v2/snaps/info/missing", NOT_FOUND, status=404)
+
+    async def test_fan_out(self):
+        async with AsyncDeviceGW("snap") as client:
+            self.use_stub(client)
+
+            results = await client.get_items_details(
+                ["firefox", "missing"], max_workers=1
+            )
+
+        self.assertEqual(results["firefox"], {"name": "firefox"})
+        self.assertIsInstance(results["missing"], StoreApiResourceNotFound)
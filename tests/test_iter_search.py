@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+
+from requests import Session
+
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from tests.helpers import StubStoreMixin, make_response
+
+
+def make_page(packages, total=None, has_next=False):
+    body = {"_embedded": {"clickindex:package": packages}, "_links": {}}
+    if total is not None:
+        body["total"] = total
+    if has_next:
+        body["_links"]["next"] = {"href": "next"}
+    return body
+
+
+class TestIterSearch(unittest.TestCase):
+    def setUp(self):
+        self.session = Mock(spec=Session)
+        self.client = DeviceGW("snap", self.session)
+        self.pages = {}
+
+        def get(url, params, **kwargs):
+            return make_response(self.pages[params["page"]])
+
+        self.session.get.side_effect = get
+
+    def requested_pages(self):
+        return sorted(
+            call.kwargs["params"]["page"]
+            for call in self.session.get.call_args_list
+        )
+
+    def test_all_pages(self):
+        self.pages = {
+            1: make_page([{"name": "a"}, {"name": "b"}], total=5),
+            2: make_page([{"name": "c"}, {"name": "d"}], total=5),
+            3: make_page([{"name": "e"}], total=5),
+        }
+
+        packages = list(
+            self.client.iter_search(category="games", size=2, prefetch=2)
+        )
+
+        self.assertEqual([p["name"] for p in packages], list("abcde"))
+        self.assertEqual(self.requested_pages(), [1, 2, 3])
+        params = self.session.get.call_args.kwargs["params"]
+        self.assertEqual(params["section"], "games")
+
+    def test_next_link_without_total(self):
+        self.pages = {
+            1: make_page([{"name": "a"}], has_next=True),
+            2: make_page([{"name": "b"}]),
+        }
+
+        packages = list(self.client.iter_search(size=1, prefetch=0))
+
+        self.assertEqual([p["name"] for p in packages], ["a", "b"])
+
+    def test_prefetches_one_page_without_total(self):
+        self.pages = {
+            1: make_page([{"name": "a"}], has_next=True),
+            2: make_page([{"name": "b"}], has_next=True),
+            3: make_page([{"name": "c"}]),
+        }
+
+        packages = list(self.client.iter_search(size=1, prefetch=5))
+
+        self.assertEqual([p["name"] for p in packages], ["a", "b", "c"])
+        # Nothing is requested past the page without a `next` link
+        self.assertEqual(self.requested_pages(), [1, 2, 3])
+
+    def test_prefetches_while_consuming(self):
+        self.pages = {
+            page: make_page([{"name": str(page)}], total=3)
+            for page in (1, 2, 3)
+        }
+
+        prefetched = threading.Event()
+        get = self.session.get.side_effect
+
+        def get_and_signal(**kwargs):
+            if kwargs["params"]["page"] == 2:
+                prefetched.set()
+            return get(**kwargs)
+
+        self.session.get.side_effect = get_and_signal
+
+        packages = self.client.iter_search(size=1, prefetch=1)
+        next(packages)
+
+        # Requested before the first page is consumed
+        self.assertTrue(prefetched.wait(5))
+        self.assertEqual(self.requested_pages(), [1, 2])
+        packages.close()
+
+    def test_early_stop_cancels_fetches(self):
+        release = threading.Event()
+        self.pages = {
+            page: make_page([{"name": str(page)}], total=100)
+            for page in range(1, 101)
+        }
+        get = self.session.get.side_effect
+
+        def slow_get(**kwargs):
+            if kwargs["params"]["page"] > 1:
+                release.wait()
+            return get(**kwargs)
+
+        self.session.get.side_effect = slow_get
+        pools = []
+
+        def make_pool(*args):
+            pools.append(ThreadPoolExecutor(*args))
+            return pools[-1]
+
+        with patch(
+            "canonicalwebteam.store_api.devicegw.ThreadPoolExecutor",
+            side_effect=make_pool,
+        ):
+            packages = self.client.iter_search(size=1, prefetch=5)
+            next(packages)
+            packages.close()
+        release.set()
+        for pool in pools:
+            pool.shutdown(wait=True)
+
+        # Nothing is requested past the pages already being prefetched
+        self.assertLessEqual(self.session.get.call_count, 6)
+        self.assertNotIn(7, self.requested_pages())
+
+
+class TestAsyncIterSearch(StubStoreMixin, unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.stub.requests.clear()
+        self.client = self.use_stub(AsyncDeviceGW("snap"))
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_all_pages(self):
+        self.stub.add(
+            "GET",
+            "/api/v1/snaps/search",
+            make_page([{"name": "a"}, {"name": "b"}], total=6),
+        )
+
+        packages = [
+            package
+            async for package in self.client.iter_search(size=2, prefetch=2)
+        ]
+
+        self.assertEqual(len(packages), 6)
+        pages = sorted(r["query"]["page"][0] for r in self.stub.requests)
+        self.assertEqual(pages, ["1", "2", "3"])
+
+    async def test_prefetches_one_page_without_total(self):
+        self.stub.add(
+            "GET",
+            "/api/v1/snaps/search",
+            make_page([{"name": "a"}], has_next=True),
+        )
+
+        packages = self.client.iter_search(size=1, prefetch=3)
+        async for package in packages:
+            break
+        # Letting the pages fetched ahead reach the store
+        await asyncio.sleep(0.05)
+        await packages.aclose()
+
+        self.assertEqual(package, {"name": "a"})
+        self.assertEqual(len(self.stub.requests), 2)
+
+    async def test_early_stop(self):
+        self.stub.add(
+            "GET",
+            "/api/v1/snaps/search",
+            make_page([{"name": "a"}], total=100),
+        )
+
+        packages = self.client.iter_search(size=1, prefetch=3)
+        async for package in packages:
+            break
+        await packages.aclose()
+
+        self.assertEqual(package, {"name": "a"})
+        self.assertLessEqual(len(self.stub.requests), 4)
@@ -0,0 +1,291 @@
+import asyncio
+import random
+import threading
+import unittest
+from collections import deque
+from unittest.mock import Mock, patch
+
+from requests import Session
+
+from canonicalwebteam.exceptions import StoreApiConcurrencyLimitError
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from canonicalwebteam.store_api.limiter import AdaptiveLimiter
+from tests.helpers import FakeClock, StubStoreMixin, make_response
+
+URL = "https://api.snapcraft.io/v2/snaps/info/test"
+HOST = "api.snapcraft.io"
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_increases_while_in_use(self):
+        limiter = AdaptiveLimiter(initial_limit=2)
+
+        # Rounds of two calls in flight using the whole limit
+        for _ in range(3):
+            first = limiter.acquire(URL)
+            second = limiter.acquire(URL)
+            limiter.release(first, 0.01, failed=False)
+            limiter.release(second, 0.01, failed=False)
+
+        self.assertEqual(limiter.stats()[HOST]["limit"], 3)
+
+    def test_idle_host_does_not_increase(self):
+        limiter = AdaptiveLimiter(initial_limit=10)
+
+        for _ in range(50):
+            limiter.release(limiter.acquire(URL), 0.01, failed=False)
+
+        self.assertEqual(limiter.stats()[HOST]["limit"], 10)
+
+    def test_decreases_on_failure(self):
+        limiter = AdaptiveLimiter(initial_limit=10, backoff=0.5)
+
+        limiter.call(URL, lambda: make_response(status_code=503))
+        self.assertEqual(limiter.stats()[HOST]["limit"], 5)
+
+        def fail():
+            raise ConnectionError()
+
+        with self.assertRaises(ConnectionError):
+            limiter.call(URL, fail)
+        self.assertEqual(limiter.stats()[HOST]["limit"], 2)
+
+        limiter.call(URL, lambda: make_response(status_code=429))
+        limiter.call(URL, lambda: make_response(status_code=429))
+        # Never below the minimum
+        self.assertEqual(limiter.stats()[HOST]["limit"], 1)
+
+    def test_client_errors_are_not_failures(self):
+        limiter = AdaptiveLimiter(initial_limit=10)
+
+        limiter.call(URL, lambda: make_response(status_code=404))
+
+        self.assertEqual(limiter.stats()[HOST]["limit"], 10)
+
+    def test_decreases_on_latency(self):
+        limiter = AdaptiveLimiter(initial_limit=10, backoff=0.5, min_samples=2)
+        for _ in range(2):
+            limiter.release(limiter.acquire(URL), 0.01, failed=False)
+
+        # A single slow call could be jitter
+        limiter.release(limiter.acquire(URL), 0.05, failed=False)
+        self.assertEqual(limiter.stats()[HOST]["limit"], 10)
+
+        limiter.release(limiter.acquire(URL), 0.05, failed=False)
+        self.assertEqual(limiter.stats()[HOST]["limit"], 5)
+
+    def test_jitter_does_not_decrease(self):
+        clock = FakeClock()
+        jitter = random.Random(0)
+        limiter = AdaptiveLimiter(initial_limit=20, queue_timeout=0)
+
+        # A healthy host answering in 40 to 120ms, with the limit in use
+        with patch("canonicalwebteam.store_api.limiter.monotonic", clock):
+            slots = deque(limiter.acquire(URL) for _ in range(20))
+            for _ in range(1000):
+                clock.advance(0.005)
+                latency = jitter.uniform(0.04, 0.12)
+                limiter.release(slots.popleft(), latency, failed=False)
+                slots.append(limiter.acquire(URL))
+
+        stats = limiter.stats()[HOST]
+        self.assertGreaterEqual(stats["limit"], 20)
+        self.assertEqual(stats["shed"], 0)
+
+    def test_decreases_once_per_round_trip(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial_limit=10, backoff=0.5)
+
+        with patch("canonicalwebteam.store_api.limiter.monotonic", clock):
+            slots = [limiter.acquire(URL) for _ in range(10)]
+            clock.advance(0.1)
+            # Failing together, after being sent under the same limit
+            for slot in slots:
+                limiter.release(slot, 0.1, failed=True)
+            self.assertEqual(limiter.stats()[HOST]["limit"], 5)
+
+            clock.advance(0.1)
+            limiter.release(limiter.acquire(URL), 0.1, failed=True)
+
+        self.assertEqual(limiter.stats()[HOST]["limit"], 2)
+
+    def test_latency_is_compared_within_endpoint_groups(self):
+        limiter = AdaptiveLimiter(initial_limit=10, backoff=0.5, min_samples=2)
+        search = "https://api.snapcraft.io/v2/snaps/find?q=test"
+        for _ in range(2):
+            limiter.release(limiter.acquire(URL), 0.01, failed=False)
+            limiter.release(limiter.acquire(search), 0.5, failed=False)
+
+        # As slow as usual for its own endpoint group
+        limiter.release(limiter.acquire(search), 0.5, failed=False)
+
+        self.assertEqual(limiter.stats()[HOST]["limit"], 10)
+
+    def test_hosts_are_independent(self):
+        limiter = AdaptiveLimiter(initial_limit=1, queue_timeout=0)
+        limiter.acquire(URL)
+
+        limiter.acquire("https://dashboard.snapcraft.io/dev/api/")
+
+        self.assertEqual(
+            limiter.stats()["dashboard.snapcraft.io"]["in_flight"], 1
+        )
+
+    def test_waits_for_a_slot(self):
+        limiter = AdaptiveLimiter(initial_limit=1, queue_timeout=1)
+        slot = limiter.acquire(URL)
+        condition = limiter._hosts[HOST].condition
+        wait_for = condition.wait_for
+        queued = []
+
+        def release_while_queued(predicate, timeout):
+            # The condition's lock is reentrant, the slot is given back
+            # while the second call is waiting for it
+            queued.append(limiter.stats()[HOST]["queued"])
+            limiter.release(slot, 0.01, failed=False)
+            return wait_for(predicate, timeout)
+
+        with patch.object(
+            condition, "wait_for", side_effect=release_while_queued
+        ):
+            limiter.acquire(URL)
+
+        self.assertEqual(queued, [1])
+        stats = limiter.stats()[HOST]
+        self.assertEqual(stats["in_flight"], 1)
+        self.assertEqual(stats["queued"], 0)
+
+    def test_sheds_after_queue_timeout(self):
+        limiter = AdaptiveLimiter(initial_limit=1, queue_timeout=0.01)
+        limiter.acquire(URL)
+
+        fn = Mock()
+        with self.assertRaises(StoreApiConcurrencyLimitError):
+            limiter.call(URL, fn)
+
+        fn.assert_not_called()
+        stats = limiter.stats()[HOST]
+        self.assertEqual(stats["shed"], 1)
+        self.assertEqual(stats["queued"], 0)
+
+    def test_sheds_when_queue_is_full(self):
+        limiter = AdaptiveLimiter(initial_limit=1, max_queue=0)
+        limiter.acquire(URL)
+        condition = limiter._hosts[HOST].condition
+
+        with patch.object(condition, "wait_for") as wait_for:
+            with self.assertRaises(StoreApiConcurrencyLimitError):
+                limiter.acquire(URL)
+
+        # Without waiting for the queue timeout
+        wait_for.assert_not_called()
+        self.assertEqual(limiter.stats()[HOST]["shed"], 1)
+
+    def test_invalid_limits(self):
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(initial_limit=0)
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(backoff=1)
+
+
+class TestAsyncAdaptiveLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_waits_for_a_slot(self):
+        limiter = AdaptiveLimiter(initial_limit=1, queue_timeout=1)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return make_response()
+
+        first = asyncio.ensure_future(limiter.acall(URL, slow))
+        second = asyncio.ensure_future(limiter.acall(URL, slow))
+        await asyncio.sleep(0.01)
+        self.assertEqual(limiter.stats()[HOST]["queued"], 1)
+
+        release.set()
+        responses = await asyncio.gather(first, second)
+
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertEqual(limiter.stats()[HOST]["in_flight"], 0)
+
+    async def test_woken_from_a_thread(self):
+        limiter = AdaptiveLimiter(initial_limit=1, queue_timeout=1)
+        slot = limiter.acquire(URL)
+        threading.Timer(
+            0.02, limiter.release, (slot, 0.01), {"failed": False}
+        ).start()
+
+        await limiter.aacquire(URL)
+
+        self.assertEqual(limiter.stats()[HOST]["in_flight"], 1)
+
+    async def test_sheds_after_queue_timeout(self):
+        limiter = AdaptiveLimiter(initial_limit=1, queue_timeout=0.01)
+        await limiter.aacquire(URL)
+
+        with self.assertRaises(StoreApiConcurrencyLimitError):
+            await limiter.aacquire(URL)
+
+        self.assertEqual(limiter.stats()[HOST]["queued"], 0)
+
+    async def test_cancelled_call_gives_back_its_slot(self):
+        limiter = AdaptiveLimiter(initial_limit=10)
+
+        task = asyncio.ensure_future(
+            limiter.acall(URL, lambda: asyncio.sleep(10))
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        stats = limiter.stats()[HOST]
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["limit"], 10)
+
+
+class TestGatewayLimiter(unittest.TestCase):
+    def test_sheds_when_host_is_busy(self):
+        session = Mock(spec=Session)
+        session.get.return_value = make_response()
+        limiter = AdaptiveLimiter(
+            initial_limit=1, max_limit=1, queue_timeout=0.01
+        )
+        client = DeviceGW("snap", session, limiter=limiter)
+
+        client.get_item_details("test")
+        limiter.acquire(URL)
+        with self.assertRaises(StoreApiConcurrencyLimitError):
+            client.get_item_details("test")
+
+        self.assertEqual(session.get.call_count, 1)
+        self.assertEqual(client.limiter_stats()[HOST]["shed"], 1)
+
+    def test_no_limiter_by_default(self):
+        self.assertEqual(
+            DeviceGW("snap", Mock(spec=Session)).limiter_stats(), {}
+        )
+
+
+class TestAsyncGatewayLimiter(
+    StubStoreMixin, unittest.IsolatedAsyncioTestCase
+):
+    async def test_limits_concurrent_requests(self):
+        self.stub.add("GET", "/v2/snaps/info/test", {"name": "test"})
+        self.stub.delay = 0.02
+        limiter = AdaptiveLimiter(initial_limit=2, queue_timeout=5)
+
+        try:
+            async with AsyncDeviceGW("snap", limiter=limiter) as client:
+                self.use_stub(client)
+                results = await asyncio.gather(
+                    *(client.get_item_details("test") for _ in range(6))
+                )
+        finally:
+            self.stub.delay = 0
+
+        self.assertEqual(len(results), 6)
+        stats = client.limiter_stats()[self.stub.url.split("://")[1]]
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["shed"], 0)
@@ -0,0 +1,247 @@
+import os
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from timeit import timeit
+from unittest.mock import Mock, patch
+
+from pymacaroons import Macaroon
+from requests import Session
+
+from canonicalwebteam.exceptions import PublisherMacaroonRefreshRequired
+from canonicalwebteam.store_api.async_publishergw import AsyncPublisherGW
+from canonicalwebteam.store_api.dashboard import (
+    Dashboard,
+    get_authorization_header,
+)
+from canonicalwebteam.store_api.macaroons import (
+    BoundMacaroonCache,
+    MacaroonRefresher,
+    bound_macaroons,
+    caveat_expiry,
+    check_macaroons,
+    serialized_expiry,
+)
+from canonicalwebteam.store_api.publishergw import PublisherGW
+from tests.helpers import FakeClock, make_macaroons, make_token
+
+
+def bind_uncached(root, discharge):
+    return (
+        Macaroon.deserialize(root)
+        .prepare_for_request(Macaroon.deserialize(discharge))
+        .serialize()
+    )
+
+
+class TestCaveatExpiry(unittest.TestCase):
+    def test_sso_expiry(self):
+        self.assertEqual(
+            caveat_expiry("login.ubuntu.com|expires|2030-01-01T00:00:00.000"),
+            datetime(2030, 1, 1, tzinfo=timezone.utc).timestamp(),
+        )
+
+    def test_time_before(self):
+        self.assertEqual(
+            caveat_expiry("time-before 2030-01-01T00:00:00.123456789Z"),
+            datetime(2030, 1, 1, 0, 0, 0, 123456, timezone.utc).timestamp(),
+        )
+
+    def test_other_caveats(self):
+        self.assertIsNone(caveat_expiry("login.ubuntu.com|account|abc"))
+        self.assertIsNone(caveat_expiry("time-before tomorrow"))
+
+
+class TestSerializedExpiry(unittest.TestCase):
+    def test_binary_macaroon(self):
+        _, discharge = make_macaroons(timedelta(hours=1))
+
+        expiry = serialized_expiry(discharge)
+
+        self.assertAlmostEqual(expiry, time.time() + 3600, delta=5)
+
+    def test_publisher_token(self):
+        expiry = serialized_expiry(make_token(timedelta(hours=2)))
+
+        self.assertAlmostEqual(expiry, time.time() + 7200, delta=5)
+
+    def test_not_a_macaroon(self):
+        self.assertIsNone(serialized_expiry("test_session"))
+        self.assertIsNone(serialized_expiry("W10="))
+
+
+class TestCheckMacaroons(unittest.TestCase):
+    def test_expired(self):
+        with self.assertRaises(PublisherMacaroonRefreshRequired):
+            check_macaroons(make_macaroons(timedelta(seconds=-1)))
+
+    def test_valid_or_unknown(self):
+        check_macaroons(make_macaroons())
+        check_macaroons(["test_session"])
+
+    def test_refreshes_close_to_expiry(self):
+        refreshed = threading.Event()
+        refresh_fn = Mock(side_effect=lambda session: refreshed.set())
+        refresher = MacaroonRefresher(refresh_fn, refresh_before=600)
+        session = {"developer_token": make_token(timedelta(minutes=5))}
+
+        for _ in range(3):
+            check_macaroons([session["developer_token"]], session, refresher)
+
+        self.assertTrue(refreshed.wait(1))
+        refresh_fn.assert_called_once_with(session)
+
+    def test_no_refresh_far_from_expiry(self):
+        refresh_fn = Mock()
+        refresher = MacaroonRefresher(refresh_fn, refresh_before=600)
+
+        check_macaroons([make_token()], {}, refresher)
+
+        refresher._pool.shutdown(wait=True)
+        refresh_fn.assert_not_called()
+
+    def test_refresh_errors_are_logged(self):
+        refresher = MacaroonRefresher(
+            Mock(side_effect=ValueError()), refresh_before=600
+        )
+
+        with self.assertLogs("canonicalwebteam.store_api.macaroons"):
+            check_macaroons([make_token(timedelta(minutes=1))], {}, refresher)
+            refresher._pool.shutdown(wait=True)
+
+        self.assertEqual(refresher.stats(), {"refreshed": 0, "failed": 1})
+
+
+class TestGatewayExpiryCheck(unittest.TestCase):
+    def test_dashboard_skips_request(self):
+        session = Mock(spec=Session)
+        client = Dashboard(session)
+        root, discharge = make_macaroons(timedelta(seconds=-1))
+
+        with self.assertRaises(PublisherMacaroonRefreshRequired):
+            client.get_account(
+                {"macaroon_root": root, "macaroon_discharge": discharge}
+            )
+
+        session.get.assert_not_called()
+
+    def test_publisher_gateway_skips_request(self):
+        session = Mock(spec=Session)
+        client = PublisherGW("charm", session)
+
+        with self.assertRaises(PublisherMacaroonRefreshRequired):
+            client.get_releases(
+                make_token(timedelta(seconds=-1)), "test-charm"
+            )
+        with self.assertRaises(PublisherMacaroonRefreshRequired):
+            client.get_store_models(
+                {"developer_token": make_token(timedelta(seconds=-1))},
+                "store-id",
+            )
+
+        session.get.assert_not_called()
+
+
+class TestAsyncGatewayExpiryCheck(unittest.IsolatedAsyncioTestCase):
+    async def test_publisher_gateway_skips_request(self):
+        session = Mock()
+        client = AsyncPublisherGW("charm", session)
+
+        with self.assertRaises(PublisherMacaroonRefreshRequired):
+            await client.get_releases(
+                make_token(timedelta(seconds=-1)), "test-charm"
+            )
+
+        session.request.assert_not_called()
+
+
+class TestBoundMacaroonCache(unittest.TestCase):
+    def test_binds_once(self):
+        cache = BoundMacaroonCache()
+        root, discharge = make_macaroons()
+
+        first = cache.bind(root, discharge)
+        second = cache.bind(root, discharge)
+
+        self.assertEqual(first, bind_uncached(root, discharge))
+        self.assertEqual(second, first)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 1})
+
+    def test_expires_with_the_caveat(self):
+        clock = FakeClock(time.time())
+        cache = BoundMacaroonCache()
+        root, discharge = make_macaroons(timedelta(seconds=60))
+
+        with patch("canonicalwebteam.store_api.macaroons.time", clock):
+            cache.bind(root, discharge)
+            clock.advance(30)
+            cache.bind(root, discharge)
+            clock.advance(31)
+            cache.bind(root, discharge)
+
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_expired_pairs_are_not_cached(self):
+        cache = BoundMacaroonCache()
+        root, discharge = make_macaroons(timedelta(hours=-1))
+
+        cache.bind(root, discharge)
+
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_bounded(self):
+        cache = BoundMacaroonCache(maxsize=2)
+
+        for _ in range(3):
+            cache.bind(*make_macaroons())
+
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_authorization_header(self):
+        bound_macaroons.clear()
+        root, discharge = make_macaroons()
+
+        header = get_authorization_header(
+            {"macaroon_root": root, "macaroon_discharge": discharge}
+        )
+
+        self.assertEqual(
+            header["Authorization"],
+            f"macaroon root={root}, "
+            f"discharge={bind_uncached(root, discharge)}",
+        )
+
+    def test_cached_pairs_are_not_bound_again(self):
+        cache = BoundMacaroonCache()
+        root, discharge = make_macaroons()
+
+        with patch.object(
+            Macaroon,
+            "prepare_for_request",
+            autospec=True,
+            side_effect=Macaroon.prepare_for_request,
+        ) as prepare:
+            for _ in range(5):
+                cache.bind(root, discharge)
+
+        self.assertEqual(prepare.call_count, 1)
+
+
+@unittest.skipUnless(
+    os.getenv("STORE_API_BENCHMARKS"), "set STORE_API_BENCHMARKS=1 to run"
+)
+class TestBindBenchmark(unittest.TestCase):
+    def test_cached_against_uncached(self):
+        cache = BoundMacaroonCache()
+        root, discharge = make_macaroons()
+        calls = 1000
+
+        uncached = timeit(lambda: bind_uncached(root, discharge), number=calls)
+        cached = timeit(lambda: cache.bind(root, discharge), number=calls)
+
+        print(
+            f"\nBinding macaroons: {uncached / calls * 1e6:.1f}us per call "
+            f"uncached, {cached / calls * 1e6:.1f}us cached"
+        )
@@ -43,6 +43,7 @@ class TestPublisherGWAuth(unittest.TestCase):
                 "channels": ["stable"],
                 "packages": [{"type": "charm", "name": "my-charm"}],
             },
+            timeout=self.client.timeout,
         )
 
     def test_issue_usso_macaroon_permissions_required(self):
@@ -69,4 +70,5 @@ class TestPublisherGWAuth(unittest.TestCase):
                 )
             },
             json={"client-description": "charmhub.io - test-agent"},
+            timeout=self.client.timeout,
         )
@@ -0,0 +1,274 @@
+import threading
+import unittest
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from redis import ConnectionError as RedisConnectionError
+from requests import Session
+
+from canonicalwebteam.exceptions import (
+    StoreApiRateLimitError,
+    StoreApiTimeoutError,
+)
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from canonicalwebteam.store_api.rate_limiter import RateLimiter
+from canonicalwebteam.store_api.timeouts import store_deadline
+from canonicalwebteam.stores_web_redis.utility import RedisCache
+from tests.helpers import FakeClock, StubStoreMixin, make_response
+
+URL = "https://api.snapcraft.io/v2/snaps/info/test"
+GROUP = "api.snapcraft.io/v2/snaps/info"
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_fail_fast(self):
+        limiter = RateLimiter(rate=1, burst=3, max_wait=0)
+
+        for _ in range(3):
+            limiter.acquire(URL)
+        with self.assertRaises(StoreApiRateLimitError) as context:
+            limiter.acquire(URL)
+
+        self.assertGreater(context.exception.retry_after, 0.9)
+        self.assertEqual(
+            limiter.stats()[GROUP],
+            {"allowed": 3, "waited": 0, "rejected": 1},
+        )
+
+    def test_waits_for_a_token(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=4, burst=1, max_wait=1)
+        with patch(
+            "canonicalwebteam.store_api.rate_limiter.monotonic", clock
+        ), patch(
+            "canonicalwebteam.store_api.rate_limiter.sleep", clock.advance
+        ):
+            limiter.acquire(URL)
+            limiter.acquire(URL)
+
+        # Until the next token, at 4 per second
+        self.assertEqual(clock.now, 1000.25)
+        self.assertEqual(limiter.stats()[GROUP]["waited"], 1)
+
+    def test_rejects_when_wait_is_too_long(self):
+        limiter = RateLimiter(rate=1, burst=1, max_wait=0.1)
+        limiter.acquire(URL)
+
+        with patch("canonicalwebteam.store_api.rate_limiter.sleep") as sleep:
+            with self.assertRaises(StoreApiRateLimitError):
+                limiter.acquire(URL)
+
+        # Rejected right away rather than after a pointless wait
+        sleep.assert_not_called()
+
+    def test_wait_is_bounded_by_the_deadline(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, burst=1, max_wait=5)
+        with patch(
+            "canonicalwebteam.store_api.rate_limiter.monotonic", clock
+        ), patch(
+            "canonicalwebteam.store_api.timeouts.monotonic", clock
+        ), patch(
+            "canonicalwebteam.store_api.rate_limiter.sleep", clock.advance
+        ):
+            limiter.acquire(URL)
+            with store_deadline(0.5):
+                with self.assertRaises(StoreApiTimeoutError):
+                    limiter.acquire(URL)
+
+                # Rejected without waiting for the deadline
+                self.assertEqual(clock.now, 1000.0)
+
+            clock.advance(0.5)
+            with store_deadline(0.6):
+                limiter.acquire(URL)
+
+        self.assertEqual(clock.now, 1000.5 + 0.5)
+        self.assertEqual(
+            limiter.stats()[GROUP],
+            {"allowed": 1, "waited": 1, "rejected": 1},
+        )
+
+    def test_groups_are_independent(self):
+        limiter = RateLimiter(rate=1, burst=1, max_wait=0)
+        limiter.acquire(URL)
+
+        limiter.acquire("https://dashboard.snapcraft.io/dev/api/account")
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(rate=0)
+        with self.assertRaises(ValueError):
+            RateLimiter(burst=0)
+
+
+class TestAsyncRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_waits_for_a_token(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=4, burst=1, max_wait=1)
+        with patch(
+            "canonicalwebteam.store_api.rate_limiter.monotonic", clock
+        ), patch(
+            "canonicalwebteam.store_api.rate_limiter.asyncio.sleep",
+            AsyncMock(side_effect=clock.advance),
+        ):
+            await limiter.aacquire(URL)
+            await limiter.aacquire(URL)
+
+        self.assertEqual(clock.now, 1000.25)
+        self.assertEqual(limiter.stats()[GROUP]["waited"], 1)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    async def test_redis_calls_leave_the_event_loop(self, mock_redis):
+        threads = []
+        client = MagicMock()
+        client.register_script.return_value = Mock(
+            side_effect=lambda **kwargs: threads.append(
+                threading.current_thread()
+            )
+            or "0"
+        )
+        mock_redis.return_value = client
+        limiter = RateLimiter(cache=RedisCache("test", maxsize=10))
+
+        await limiter.aacquire(URL)
+
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    async def test_fail_fast(self):
+        limiter = RateLimiter(rate=1, burst=1, max_wait=0)
+        await limiter.aacquire(URL)
+
+        with self.assertRaises(StoreApiRateLimitError):
+            await limiter.aacquire(URL)
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_uses_redis_bucket(self, mock_redis):
+        client = MagicMock()
+        script = Mock(side_effect=["0", "0.5"])
+        client.register_script.return_value = script
+        mock_redis.return_value = client
+
+        limiter = RateLimiter(
+            rate=2,
+            burst=5,
+            max_wait=0,
+            cache=RedisCache("test", maxsize=10),
+            name="devicegw",
+        )
+        limiter.acquire(URL)
+        with self.assertRaises(StoreApiRateLimitError) as context:
+            limiter.acquire(URL)
+
+        self.assertEqual(context.exception.retry_after, 0.5)
+        script.assert_called_with(
+            keys=[f"test:rate-limit:devicegw:{GROUP}"], args=[2, 5]
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_falls_back_to_local_bucket(self, mock_redis):
+        client = MagicMock()
+        client.register_script.return_value = Mock(
+            side_effect=RedisConnectionError("down")
+        )
+        mock_redis.return_value = client
+
+        limiter = RateLimiter(
+            rate=1,
+            burst=2,
+            max_wait=0,
+            cache=RedisCache("test", maxsize=10),
+        )
+        with self.assertLogs(
+            "canonicalwebteam.store_api.rate_limiter", "ERROR"
+        ):
+            limiter.acquire(URL)
+            limiter.acquire(URL)
+            with self.assertRaises(StoreApiRateLimitError):
+                limiter.acquire(URL)
+        self.assertEqual(limiter.cache.health()["state"], "unhealthy")
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_uses_redis_once_it_is_back(self, mock_redis):
+        client = MagicMock()
+        client.ping.side_effect = RedisConnectionError("down")
+        script = Mock(return_value="0")
+        client.register_script.return_value = script
+        mock_redis.return_value = client
+        cache = RedisCache("test", maxsize=10)
+        limiter = RateLimiter(rate=1, burst=1, max_wait=0, cache=cache)
+
+        limiter.acquire(URL)
+        script.assert_not_called()
+
+        client.ping.side_effect = None
+        cache._probe()
+        limiter.acquire(URL)
+
+        script.assert_called_once()
+
+
+class TestGatewayRateLimiter(unittest.TestCase):
+    def test_rejected_requests_are_not_sent(self):
+        session = Mock(spec=Session)
+        session.get.return_value = make_response()
+        client = DeviceGW(
+            "snap",
+            session,
+            rate_limiter=RateLimiter(rate=1, burst=2, max_wait=0),
+        )
+
+        client.get_item_details("test")
+        client.get_item_details("test")
+        with self.assertRaises(StoreApiRateLimitError):
+            client.get_item_details("test")
+
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(client.rate_limit_stats()[GROUP]["rejected"], 1)
+
+    def test_timeout_is_resolved_after_waiting(self):
+        clock = FakeClock()
+        session = Mock(spec=Session)
+        session.get.return_value = make_response()
+        client = DeviceGW(
+            "snap",
+            session,
+            rate_limiter=RateLimiter(rate=1, burst=1, max_wait=5),
+        )
+        with patch(
+            "canonicalwebteam.store_api.rate_limiter.monotonic", clock
+        ), patch(
+            "canonicalwebteam.store_api.timeouts.monotonic", clock
+        ), patch(
+            "canonicalwebteam.store_api.rate_limiter.sleep", clock.advance
+        ):
+            client.get_item_details("test")
+            with store_deadline(2):
+                client.get_item_details("test")
+
+        # What is left of the deadline after waiting a second for a token
+        self.assertEqual(session.get.call_args.kwargs["timeout"], (1.0, 1.0))
+
+    def test_no_rate_limiter_by_default(self):
+        self.assertEqual(
+            DeviceGW("snap", Mock(spec=Session)).rate_limit_stats(), {}
+        )
+
+
+class TestAsyncGatewayRateLimiter(
+    StubStoreMixin, unittest.IsolatedAsyncioTestCase
+):
+    async def test_waits_for_the_rate(self):
+        self.stub.add("GET", "/v2/snaps/info/test", {"name": "test"})
+        limiter = RateLimiter(rate=10, burst=1, max_wait=1)
+
+        async with AsyncDeviceGW("snap", rate_limiter=limiter) as client:
+            self.use_stub(client)
+            for _ in range(3):
+                await client.get_item_details("test")
+
+        stats = list(client.rate_limit_stats().values())[0]
+        self.assertEqual(stats["waited"], 2)
@@ -1,5 +1,11 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
 from vcr_unittest import VCRTestCase
-from canonicalwebteam.retry_utils import retry
+from canonicalwebteam.retry_utils import RetryBudget, retry
+from canonicalwebteam.stores_web_redis.utility import RedisCache
 
 LIMIT = 5
 
@@ -148,3 +154,165 @@ class RetryDecoratorTest(VCRTestCase):
 
         # sleep only happens *between* calls
         self.assertEqual(c.counter, LIMIT - 1)
+
+    def test_budget(self):
+        c = Counter()
+        budget = RetryBudget(ratio=0.5, initial_tokens=2)
+
+        @retry(limit=LIMIT, callback_fn=c.increment, budget=budget)
+        def failing():
+            raise Exception("Exception")
+
+        @retry(limit=LIMIT, budget=budget)
+        def succeeding():
+            return True
+
+        with self.assertRaises(Exception):
+            failing()
+        # first call plus the two retries the budget allowed
+        self.assertEqual(c.counter, 3)
+
+        succeeding()
+        succeeding()
+        with self.assertRaises(Exception):
+            failing()
+        self.assertEqual(c.counter, 5)
+
+
+class AsyncRetryDecoratorTest(unittest.IsolatedAsyncioTestCase):
+    async def test_retries_coroutine(self):
+        c = Counter()
+
+        @retry(limit=LIMIT, delay_fn=(lambda x: 0.0))
+        async def wrapper():
+            c.increment()
+            if c.counter < 3:
+                raise Exception("Exception")
+            return c.counter
+
+        self.assertTrue(asyncio.iscoroutinefunction(wrapper))
+        self.assertEqual(await wrapper(), 3)
+
+    async def test_sleep_does_not_block_loop(self):
+        ticks = Counter()
+
+        async def ticker():
+            while True:
+                ticks.increment()
+                await asyncio.sleep(0.001)
+
+        @retry(limit=2, delay_fn=(lambda x: 0.05))
+        async def wrapper():
+            raise TypeError("Exception")
+
+        task = asyncio.ensure_future(ticker())
+        with self.assertRaises(TypeError):
+            await wrapper()
+        task.cancel()
+
+        # the loop kept running other tasks while the retry was sleeping
+        self.assertGreater(ticks.counter, 5)
+
+    async def test_sleep_fn(self):
+        delays = []
+
+        async def sleep(x: float):
+            delays.append(x)
+
+        @retry(limit=LIMIT, delay_fn=(lambda x: float(x)), sleep_fn=sleep)
+        async def wrapper():
+            raise Exception("Exception")
+
+        with self.assertRaises(Exception):
+            await wrapper()
+
+        self.assertEqual(delays, [1.0, 2.0, 3.0, 4.0])
+
+    async def test_callback_and_logger_fn(self):
+        c = Counter()
+        messages = []
+
+        @retry(
+            limit=LIMIT,
+            callback_fn=(lambda e: c.counter == 2),
+            logger_fn=messages.append,
+        )
+        async def wrapper():
+            c.increment()
+            raise TypeError("Exception")
+
+        with self.assertRaises(TypeError):
+            await wrapper()
+
+        self.assertEqual(c.counter, 2)
+        self.assertEqual(len(messages), 1)
+        self.assertTrue(messages[0].startswith("@retry (1/5) `wrapper`"))
+
+    async def test_cancellation_while_sleeping(self):
+        c = Counter()
+
+        @retry(delay_fn=(lambda x: 10.0))
+        async def wrapper():
+            c.increment()
+            raise Exception("Exception")
+
+        task = asyncio.ensure_future(wrapper())
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(c.counter, 1)
+
+    async def test_cancelled_call_is_not_retried(self):
+        c = Counter()
+
+        @retry(limit=LIMIT, exceptions=(BaseException,))
+        async def wrapper():
+            c.increment()
+            raise asyncio.CancelledError()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await wrapper()
+        self.assertEqual(c.counter, 1)
+
+    async def test_budget(self):
+        c = Counter()
+
+        @retry(
+            limit=LIMIT,
+            callback_fn=c.increment,
+            budget=RetryBudget(initial_tokens=1),
+        )
+        async def wrapper():
+            raise Exception("Exception")
+
+        with self.assertRaises(Exception):
+            await wrapper()
+        self.assertEqual(c.counter, 2)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    async def test_budget_in_redis_off_the_event_loop(self, mock_redis):
+        threads = []
+
+        def script(keys, args):
+            threads.append(threading.current_thread())
+            return 1
+
+        mock_redis.return_value.register_script.return_value = script
+        budget = RetryBudget(
+            cache=RedisCache("test", maxsize=1), deposit_every=1
+        )
+        c = Counter()
+
+        @retry(limit=2, budget=budget)
+        async def wrapper():
+            c.increment()
+            if c.counter == 1:
+                raise Exception("Exception")
+
+        await wrapper()
+
+        # A token spent for the retry, then a success deposited
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
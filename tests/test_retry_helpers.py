@@ -1,10 +1,20 @@
 from types import FunctionType
+from unittest.mock import MagicMock, patch
+
+from redis.exceptions import RedisError
 from vcr_unittest import VCRTestCase
 from canonicalwebteam.retry_utils import (
+    RetryBudget,
     delay_constant,
+    delay_decorrelated_jitter,
     delay_random,
     delay_exponential,
+    delay_full_jitter,
+    delay_retry_after,
+    retry,
 )
+from canonicalwebteam.exceptions import StoreApiTooManyRequestsError
+from canonicalwebteam.stores_web_redis.utility import RedisCache
 
 
 class RetryHelpersTest(VCRTestCase):
@@ -49,3 +59,161 @@ class RetryHelpersTest(VCRTestCase):
     def test_delay_exp_bad_max(self):
         with self.assertRaises(ValueError):
             delay_exponential(1.0, 0.1, -8.0)
+
+    def test_delay_full_jitter(self):
+        delay = delay_full_jitter(1.0, 2.0, 8.0)
+        self.assertIsInstance(delay, FunctionType)
+        for attempt in range(1, 6):
+            self.assertTrue(0.0 <= delay(attempt) <= min(8.0, 2.0**attempt))
+
+    def test_delay_full_jitter_bad_mult(self):
+        with self.assertRaises(ValueError):
+            delay_full_jitter(0.0, 2.0)
+
+    def test_delay_decorrelated_jitter(self):
+        delay = delay_decorrelated_jitter(1.0, 10.0)
+        self.assertIsInstance(delay, FunctionType)
+        previous = delay(1)
+        self.assertTrue(1.0 <= previous <= 3.0)
+        for attempt in range(2, 10):
+            current = delay(attempt)
+            self.assertTrue(1.0 <= current <= min(10.0, previous * 3))
+            previous = current
+
+    def test_delay_decorrelated_jitter_bad_delays(self):
+        with self.assertRaises(ValueError):
+            delay_decorrelated_jitter(0.0)
+        with self.assertRaises(ValueError):
+            delay_decorrelated_jitter(2.0, 1.0)
+
+    def test_delay_retry_after(self):
+        delays = []
+        errors = [
+            StoreApiTooManyRequestsError("Too many requests", retry_after=5),
+            StoreApiTooManyRequestsError("Too many requests", retry_after=90),
+            StoreApiTooManyRequestsError("Too many requests"),
+        ]
+
+        @retry(
+            limit=4,
+            delay_fn=delay_retry_after(delay_constant(1.0), max_delay=60),
+            sleep_fn=delays.append,
+        )
+        def wrapper():
+            if errors:
+                raise errors.pop(0)
+            return True
+
+        self.assertTrue(wrapper())
+        self.assertEqual(delays, [5, 60, 1.0])
+
+    def test_delay_retry_after_outside_retry(self):
+        self.assertEqual(delay_retry_after()(1), 0.0)
+
+    def test_delay_retry_after_bad_max(self):
+        with self.assertRaises(ValueError):
+            delay_retry_after(max_delay=-1)
+
+
+class RetryBudgetTest(VCRTestCase):
+    def test_budget(self):
+        budget = RetryBudget(ratio=0.5, max_tokens=2, initial_tokens=1)
+
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+
+        budget.record_success()
+        self.assertFalse(budget.try_spend())
+        budget.record_success()
+        self.assertTrue(budget.try_spend())
+
+    def test_budget_is_capped(self):
+        budget = RetryBudget(ratio=1, max_tokens=2, initial_tokens=0)
+
+        for _ in range(10):
+            budget.record_success()
+
+        self.assertTrue(budget.try_spend())
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+
+    def test_budget_bad_values(self):
+        with self.assertRaises(ValueError):
+            RetryBudget(ratio=0)
+        with self.assertRaises(ValueError):
+            RetryBudget(max_tokens=1, initial_tokens=2)
+        with self.assertRaises(ValueError):
+            RetryBudget(deposit_every=0)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_budget_deposits_in_batches(self, mock_redis):
+        client = MagicMock()
+        deposit = MagicMock()
+        client.register_script.side_effect = [deposit, MagicMock()]
+        mock_redis.return_value = client
+
+        budget = RetryBudget(
+            ratio=0.5, cache=RedisCache("test", maxsize=1), deposit_every=4
+        )
+        for _ in range(9):
+            budget.record_success()
+
+        self.assertEqual(deposit.call_count, 2)
+        deposit.assert_called_with(
+            keys=["test:retry-budget:store-api"], args=[10.0, 3600, 2.0, 100.0]
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_budget_in_redis(self, mock_redis):
+        client = MagicMock()
+        deposit, spend = MagicMock(), MagicMock(return_value=0)
+        client.register_script.side_effect = [deposit, spend]
+        mock_redis.return_value = client
+
+        budget = RetryBudget(
+            ratio=0.2,
+            cache=RedisCache("test", maxsize=1),
+            name="dashboard",
+            deposit_every=1,
+        )
+        budget.record_success()
+
+        self.assertFalse(budget.try_spend())
+        deposit.assert_called_once_with(
+            keys=["test:retry-budget:dashboard"], args=[10.0, 3600, 0.2, 100.0]
+        )
+        spend.assert_called_once_with(
+            keys=["test:retry-budget:dashboard"], args=[10.0, 3600]
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_budget_falls_back_to_local(self, mock_redis):
+        client = MagicMock()
+        client.register_script.return_value.side_effect = RedisError("Down")
+        mock_redis.return_value = client
+
+        budget = RetryBudget(initial_tokens=1, cache=RedisCache("t", 1))
+
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_budget_uses_redis_once_it_is_back(self, mock_redis):
+        client = MagicMock()
+        client.ping.side_effect = RedisError("Down")
+        deposit, spend = MagicMock(), MagicMock(return_value=1)
+        client.register_script.side_effect = [deposit, spend]
+        mock_redis.return_value = client
+        cache = RedisCache("test", maxsize=1)
+        budget = RetryBudget(initial_tokens=0, cache=cache, deposit_every=1)
+
+        self.assertFalse(budget.try_spend())
+        spend.assert_not_called()
+
+        client.ping.side_effect = None
+        cache._probe()
+        budget.record_success()
+
+        self.assertTrue(budget.try_spend())
+        deposit.assert_called_once()
+        spend.assert_called_once()
@@ -1,12 +1,15 @@
 import json
+import threading
 import time
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, Mock, call, patch
+from redis.exceptions import ConnectionError as RedisConnectionError
 from redis.exceptions import RedisError
 from canonicalwebteam.stores_web_redis.utility import RedisCache
 
 
 from canonicalwebteam.stores_web_redis.utility import SafeJSONEncoder
+from tests.helpers import FakeClock
 
 
 class TestSafeJSONEncoder(unittest.TestCase):
@@ -121,6 +124,11 @@ class TestRedisCache(unittest.TestCase):
         mock_client = MagicMock()
         mock_client.ping.return_value = True
         mock_client.get.return_value = '{"x": 1}'
+        # GET and PTTL replies, read together for the in-process cache
+        mock_client.pipeline.return_value.execute.return_value = [
+            '{"x": 1}',
+            -1,
+        ]
         mock_redis.return_value = mock_client
 
         cache = RedisCache(namespace="my-store", maxsize=1)
@@ -193,5 +201,820 @@ class TestRedisCache(unittest.TestCase):
         self.assertIsNone(cache.get(("key", {"arch": "x86"})))
 
 
+class TestStaleWhileRevalidate(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_fallback_serves_stale_and_refreshes_once(self, mock_redis):
+        mock_redis.return_value.ping.side_effect = RedisError("Down")
+        release = threading.Event()
+        loader = MagicMock(side_effect=lambda key: release.wait(1) and "new")
+        cache = RedisCache(namespace="my-store", maxsize=10)
+        cache.register_loader("featured", loader, ttl=60, stale_ttl=60)
+
+        cache.set("featured", "old", ttl=0)
+        self.assertEqual(cache.get("featured"), "old")
+        self.assertEqual(cache.get("featured"), "old")
+        release.set()
+        cache._refresh_pool.shutdown(wait=True)
+
+        loader.assert_called_once_with("featured")
+        self.assertEqual(cache.get("featured"), "new")
+        self.assertEqual(
+            cache.revalidation_stats(),
+            {"started": 1, "refreshed": 1, "failed": 0},
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_fresh_entries_are_not_refreshed(self, mock_redis):
+        mock_redis.return_value.ping.side_effect = RedisError("Down")
+        loader = MagicMock()
+        cache = RedisCache(namespace="my-store", maxsize=10)
+        cache.register_loader("featured", loader)
+
+        cache.set("featured", "value", ttl=60)
+
+        self.assertEqual(cache.get("featured"), "value")
+        self.assertIsNone(cache._refresh_pool)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_failed_refreshes_are_logged(self, mock_redis):
+        mock_redis.return_value.ping.side_effect = RedisError("Down")
+        cache = RedisCache(namespace="my-store", maxsize=10)
+        cache.register_loader("featured", MagicMock(side_effect=ValueError))
+        cache.set("featured", "old", ttl=0)
+
+        with self.assertLogs("canonicalwebteam.stores_web_redis.utility"):
+            self.assertEqual(cache.get("featured"), "old")
+            cache._refresh_pool.shutdown(wait=True)
+
+        self.assertEqual(cache.revalidation_stats()["failed"], 1)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_set_stores_soft_and_hard_ttl(self, mock_redis):
+        mock_client = MagicMock()
+        mock_redis.return_value = mock_client
+        pipeline = mock_client.pipeline.return_value
+
+        cache = RedisCache(namespace="my-store", maxsize=1)
+        cache.set("featured", "value", ttl=300, stale_ttl=60)
+
+        pipeline.setex.assert_any_call("my-store:featured", 360, "value")
+        pipeline.setex.assert_any_call("my-store:featured:fresh", 300, "1")
+        pipeline.execute.assert_called_once()
+        mock_client.setex.assert_not_called()
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_redis_single_worker_refreshes(self, mock_redis):
+        mock_client = MagicMock()
+        mock_redis.return_value = mock_client
+        mock_client.mget.return_value = ["old", None]
+        # Another worker claims the refresh after this one
+        mock_client.set.side_effect = [True, None]
+        loader = MagicMock(return_value="new")
+
+        cache = RedisCache(namespace="my-store", maxsize=1, l1_maxsize=0)
+        cache.register_loader("featured", loader, ttl=300, stale_ttl=60)
+        self.assertEqual(cache.get("featured"), "old")
+        self.assertEqual(cache.get("featured"), "old")
+        cache._refresh_pool.shutdown(wait=True)
+
+        loader.assert_called_once_with("featured")
+        mock_client.mget.assert_called_with(
+            ["my-store:featured", "my-store:featured:fresh"]
+        )
+        self.assertTrue(mock_client.set.call_args.kwargs["nx"])
+        mock_client.pipeline.return_value.setex.assert_any_call(
+            "my-store:featured", 360, "new"
+        )
+
+
+def envelope(value, expires_in, delta=0.1):
+    return json.dumps(
+        {"value": value, "delta": delta, "expires": time.time() + expires_in}
+    )
+
+
+class TestGetOrCompute(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def setUp(self, mock_redis):
+        mock_redis.return_value.ping.side_effect = RedisError("Down")
+        self.cache = RedisCache(namespace="my-store", maxsize=10)
+
+    def test_computes_once(self):
+        loader = MagicMock(return_value={"snaps": []})
+
+        for _ in range(3):
+            value = self.cache.get_or_compute(
+                "featured", loader, expected_type=dict
+            )
+
+        self.assertEqual(value, {"snaps": []})
+        loader.assert_called_once_with()
+        self.assertEqual(self.cache.compute_stats()["computed"], 1)
+
+    def test_same_type_when_computed_and_cached(self):
+        loader = MagicMock(return_value={"snaps": ("test",)})
+
+        computed = self.cache.get_or_compute("featured", loader)
+        cached = self.cache.get_or_compute("featured", loader)
+        computed_dict = self.cache.get_or_compute(
+            "other", loader, expected_type=dict
+        )
+        cached_dict = self.cache.get_or_compute(
+            "other", loader, expected_type=dict
+        )
+
+        self.assertEqual(computed, '{"snaps": ["test"]}')
+        self.assertEqual(cached, computed)
+        self.assertEqual(computed_dict, {"snaps": ["test"]})
+        self.assertEqual(cached_dict, computed_dict)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_concurrent_misses_compute_once(self):
+        def loader():
+            time.sleep(0.1)
+            return "value"
+
+        loader_mock = MagicMock(side_effect=loader)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.cache.get_or_compute("featured", loader_mock)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["value"] * 5)
+        loader_mock.assert_called_once()
+        self.assertEqual(self.cache.compute_stats()["waited"], 4)
+
+    def test_recomputes_early(self):
+        self.cache.fallback["my-store:featured"] = envelope(
+            "old", expires_in=10, delta=5
+        )
+        loader = MagicMock(return_value="new")
+
+        with patch(
+            "canonicalwebteam.stores_web_redis.utility.random.random",
+            return_value=0.0,
+        ):
+            self.assertEqual(
+                self.cache.get_or_compute("featured", loader), "old"
+            )
+        with patch(
+            "canonicalwebteam.stores_web_redis.utility.random.random",
+            return_value=0.99,
+        ):
+            # 5 * -ln(0.01) is more than the 10 seconds left
+            self.assertEqual(
+                self.cache.get_or_compute("featured", loader), "new"
+            )
+
+        self.assertEqual(self.cache.compute_stats()["early"], 1)
+
+    def test_expired_fallback_entries_are_recomputed(self):
+        self.cache.fallback["my-store:featured"] = envelope("old", -1)
+
+        self.assertEqual(
+            self.cache.get_or_compute("featured", lambda: "new"), "new"
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_redis_lock(self, mock_redis):
+        client = MagicMock()
+        client.get.return_value = None
+        client.set.return_value = True
+        release = MagicMock()
+        client.register_script.return_value = release
+        mock_redis.return_value = client
+
+        cache = RedisCache(namespace="my-store", maxsize=1)
+        value = cache.get_or_compute("featured", lambda: "value", ttl=60)
+
+        self.assertEqual(value, "value")
+        self.assertEqual(
+            client.set.call_args.args[0], "my-store:featured:lock"
+        )
+        self.assertTrue(client.set.call_args.kwargs["nx"])
+        key, ttl, entry = client.setex.call_args.args
+        self.assertEqual((key, ttl), ("my-store:featured", 60))
+        self.assertEqual(json.loads(entry)["value"], "value")
+        release.assert_called_once_with(
+            keys=["my-store:featured:lock"],
+            args=[client.set.call_args.args[1]],
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_serves_previous_value_while_locked(self, mock_redis):
+        client = MagicMock()
+        client.get.return_value = envelope("old", expires_in=1, delta=10)
+        client.set.return_value = None
+        mock_redis.return_value = client
+        loader = MagicMock()
+
+        cache = RedisCache(namespace="my-store", maxsize=1)
+        with patch(
+            "canonicalwebteam.stores_web_redis.utility.random.random",
+            return_value=0.5,
+        ):
+            value = cache.get_or_compute("featured", loader)
+
+        self.assertEqual(value, "old")
+        loader.assert_not_called()
+        self.assertEqual(cache.compute_stats()["stale"], 1)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_computes_after_waiting_too_long(self, mock_redis):
+        client = MagicMock()
+        client.get.return_value = None
+        client.set.return_value = None
+        mock_redis.return_value = client
+
+        cache = RedisCache(namespace="my-store", maxsize=1)
+
+        with self.assertLogs(
+            "canonicalwebteam.stores_web_redis.utility", "WARNING"
+        ):
+            value = cache.get_or_compute(
+                "featured", lambda: "value", wait_timeout=0.1
+            )
+        self.assertEqual(value, "value")
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_redis_errors_fall_back_to_local_lock(self, mock_redis):
+        client = MagicMock()
+        client.get.side_effect = RedisError("Down")
+        client.set.side_effect = RedisError("Down")
+        client.setex.side_effect = RedisError("Down")
+        mock_redis.return_value = client
+
+        cache = RedisCache(namespace="my-store", maxsize=1)
+
+        with self.assertLogs("canonicalwebteam.stores_web_redis.utility"):
+            value = cache.get_or_compute("featured", lambda: "value")
+        self.assertEqual(value, "value")
+        self.assertEqual(cache._computing, set())
+
+
+class TestL1Cache(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def setUp(self, mock_redis):
+        self.client = MagicMock()
+        self.pipeline = self.client.pipeline.return_value
+        # GET and PTTL replies
+        self.pipeline.execute.return_value = ['{"x": 1}', 60000]
+        mock_redis.return_value = self.client
+        self.clock = FakeClock()
+        with patch(
+            "canonicalwebteam.stores_web_redis.utility.monotonic", self.clock
+        ):
+            self.cache = RedisCache(
+                namespace="my-store", maxsize=10, l1_maxsize=100
+            )
+        patcher = patch(
+            "canonicalwebteam.stores_web_redis.utility.monotonic", self.clock
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_serves_values_from_memory(self):
+        first = self.cache.get("key", expected_type=dict)
+        second = self.cache.get("key", expected_type=dict)
+
+        self.assertEqual(first, {"x": 1})
+        self.assertEqual(second, first)
+        self.pipeline.get.assert_called_once_with("my-store:key")
+        self.pipeline.pttl.assert_called_once_with("my-store:key")
+        self.assertEqual(
+            self.cache.tier_stats(),
+            {
+                "l1": {
+                    "hits": 1,
+                    "misses": 1,
+                    "invalidations": 0,
+                    "size": 1,
+                },
+                "l2": {"hits": 1, "misses": 0},
+            },
+        )
+
+    def test_values_are_deserialized_once(self):
+        with patch(
+            "canonicalwebteam.stores_web_redis.utility.json.loads",
+            wraps=json.loads,
+        ) as loads:
+            first = self.cache.get("key", expected_type=dict)
+            second = self.cache.get("key", expected_type=dict)
+            (third,) = self.cache.get_many(["key"], expected_type=dict)
+
+        # Shared by the callers rather than copied
+        self.assertIs(second, first)
+        self.assertIs(third, first)
+        loads.assert_called_once()
+
+    def test_strings_are_deserialized_on_first_use(self):
+        self.assertEqual(self.cache.get("key"), '{"x": 1}')
+        first = self.cache.get("key", expected_type=dict)
+
+        self.assertEqual(first, {"x": 1})
+        self.assertIs(self.cache.get("key", expected_type=dict), first)
+
+    def test_strings_and_objects_share_entries(self):
+        self.assertEqual(self.cache.get("key", expected_type=dict), {"x": 1})
+        self.assertEqual(self.cache.get("key"), '{"x": 1}')
+        self.pipeline.execute.assert_called_once()
+
+    def test_misses_are_not_kept(self):
+        self.pipeline.execute.return_value = [None, -2]
+
+        self.cache.get("key")
+        self.cache.get("key")
+
+        self.assertEqual(self.pipeline.execute.call_count, 2)
+        self.assertEqual(self.cache.tier_stats()["l2"]["misses"], 2)
+
+    def test_set_and_delete_drop_values(self):
+        self.cache.get("key", expected_type=dict)
+        self.cache.set("key", {"x": 2})
+        self.cache.get("key", expected_type=dict)
+        self.cache.delete("key")
+        self.cache.get("key", expected_type=dict)
+
+        self.assertEqual(self.pipeline.execute.call_count, 3)
+
+    def test_expires_after_a_fraction_of_the_ttl(self):
+        self.assertEqual(self.cache.l1_ttl, 30)
+
+        self.cache.get("key")
+        self.clock.advance(29)
+        self.cache.get("key")
+        self.clock.advance(2)
+        self.cache.get("key")
+
+        self.assertEqual(self.pipeline.execute.call_count, 2)
+
+    def test_expires_with_redis(self):
+        # Set with a 5 second TTL, 4.5 seconds left
+        self.pipeline.execute.return_value = ['{"x": 1}', 4500]
+
+        self.cache.get("key")
+        self.clock.advance(4)
+        self.cache.get("key")
+        self.clock.advance(1)
+        self.pipeline.execute.return_value = [None, -2]
+
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(self.pipeline.execute.call_count, 2)
+
+    def test_kept_while_fresh_only(self):
+        self.cache.register_loader("featured", Mock())
+        self.client.set.return_value = False
+        # The value, its freshness marker, and the TTL of the marker
+        self.pipeline.execute.return_value = ['"old"', "1", 2000]
+
+        self.cache.get("featured")
+        self.clock.advance(1)
+        self.cache.get("featured")
+        self.clock.advance(1)
+        self.pipeline.execute.return_value = ['"old"', None, -2]
+        self.cache.get("featured")
+        self.cache.get("featured")
+
+        self.pipeline.get.assert_any_call("my-store:featured:fresh")
+        self.pipeline.pttl.assert_called_with("my-store:featured:fresh")
+        self.assertEqual(self.pipeline.execute.call_count, 3)
+
+    def test_not_used_without_redis(self):
+        self.cache._fail_over()
+        self.cache.set("key", "value")
+
+        self.assertEqual(self.cache.get("key"), "value")
+        self.assertEqual(len(self.cache.l1), 0)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_enabled_by_default(self, mock_redis):
+        mock_redis.return_value = self.client
+        cache = RedisCache(namespace="my-store", maxsize=10)
+
+        cache.get("key")
+        cache.get("key")
+
+        self.assertTrue(cache.l1_enabled)
+        self.assertEqual(cache.l1.maxsize, 1024)
+        self.pipeline.execute.assert_called_once()
+        self.assertEqual(cache.tier_stats()["l1"]["hits"], 1)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_disabled(self, mock_redis):
+        mock_redis.return_value = self.client
+        self.client.get.return_value = "value"
+        cache = RedisCache(namespace="my-store", maxsize=10, l1_maxsize=0)
+
+        cache.get("key")
+        cache.get("key")
+
+        self.assertFalse(cache.l1_enabled)
+        self.assertEqual(self.client.get.call_count, 2)
+        self.assertEqual(cache.tier_stats()["l1"]["hits"], 0)
+
+    @patch.dict(
+        "os.environ",
+        {
+            "REDIS_L1_MAXSIZE_SNAPCRAFT_IO": "7",
+            "REDIS_L1_MAXSIZE_CHARMHUB": "0",
+        },
+    )
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_sized_per_namespace(self, mock_redis):
+        snapcraft = RedisCache(namespace="snapcraft-io", maxsize=10)
+        charmhub = RedisCache(namespace="charmhub", maxsize=10)
+        other = RedisCache(namespace="other", maxsize=10)
+
+        self.assertEqual(snapcraft.l1.maxsize, 7)
+        self.assertTrue(snapcraft.l1_enabled)
+        self.assertFalse(charmhub.l1_enabled)
+        self.assertEqual(other.l1.maxsize, 1024)
+
+
+class TestL1Invalidation(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def setUp(self, mock_redis):
+        self.client = MagicMock()
+        self.client.pipeline.return_value.execute.return_value = [
+            '{"x": 1}',
+            60000,
+        ]
+        mock_redis.return_value = self.client
+        self.cache = RedisCache(
+            namespace="my-store", maxsize=10, l1_maxsize=100
+        )
+        self.pubsub = self.client.pubsub.return_value
+
+    def test_listens_in_the_background(self):
+        self.pubsub.subscribe.assert_called_once()
+        self.assertIn(
+            "my-store:l1-invalidate", self.pubsub.subscribe.call_args.kwargs
+        )
+        self.assertTrue(self.pubsub.run_in_thread.call_args.kwargs["daemon"])
+
+    def test_writes_are_announced(self):
+        self.cache.set("key", {"x": 2})
+        self.cache.delete("key")
+
+        self.assertEqual(
+            self.client.publish.call_args_list,
+            [
+                call("my-store:l1-invalidate", "my-store:key"),
+                call("my-store:l1-invalidate", "my-store:key"),
+            ],
+        )
+
+    def test_announced_keys_are_dropped(self):
+        handler = self.pubsub.subscribe.call_args.kwargs[
+            "my-store:l1-invalidate"
+        ]
+        self.cache.get("key", expected_type=dict)
+        self.cache.get("other", expected_type=dict)
+
+        handler({"type": "message", "data": "my-store:key"})
+        self.cache.get("key", expected_type=dict)
+        self.cache.get("other", expected_type=dict)
+
+        self.assertEqual(
+            self.client.pipeline.return_value.execute.call_count, 3
+        )
+        self.assertEqual(self.cache.tier_stats()["l1"]["invalidations"], 1)
+
+    @patch("canonicalwebteam.stores_web_redis.utility.sleep")
+    def test_connection_errors_clear_memory(self, mock_sleep):
+        handler = self.pubsub.run_in_thread.call_args.kwargs[
+            "exception_handler"
+        ]
+        self.cache.get("key", expected_type=dict)
+
+        with self.assertLogs("canonicalwebteam.stores_web_redis.utility"):
+            handler(RedisError("Down"), self.pubsub, Mock())
+
+        self.assertEqual(len(self.cache.l1), 0)
+        mock_sleep.assert_called_once()
+
+    def test_close(self):
+        thread = self.pubsub.run_in_thread.return_value
+
+        self.cache.close()
+
+        thread.stop.assert_called_once()
+        # Other processes are still told about writes
+        self.cache.set("key", "value")
+        self.client.publish.assert_called_once_with(
+            "my-store:l1-invalidate", "my-store:key"
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_not_without_memory_cache(self, mock_redis):
+        mock_redis.return_value = self.client
+        self.client.pubsub.reset_mock()
+
+        RedisCache(namespace="my-store", maxsize=10, l1_maxsize=0)
+        RedisCache(
+            namespace="my-store",
+            maxsize=10,
+            l1_maxsize=100,
+            invalidation=False,
+        )
+
+        self.client.pubsub.assert_not_called()
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_announced_without_memory_cache(self, mock_redis):
+        mock_redis.return_value = self.client
+        cache = RedisCache(namespace="my-store", maxsize=10, l1_maxsize=0)
+
+        cache.set("key", "value")
+        cache.delete("key")
+        cache.set_many({"other": "value"})
+
+        self.assertEqual(self.client.publish.call_count, 2)
+        self.client.pipeline.return_value.publish.assert_called_once_with(
+            "my-store:l1-invalidate", "my-store:other"
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_not_announced_when_disabled(self, mock_redis):
+        mock_redis.return_value = self.client
+        cache = RedisCache(
+            namespace="my-store", maxsize=10, invalidation=False
+        )
+
+        cache.set("key", "value")
+        cache.set_many({"other": "value"})
+
+        self.client.publish.assert_not_called()
+        self.client.pipeline.return_value.publish.assert_not_called()
+
+
+class TestBatchedCache(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def setUp(self, mock_redis):
+        self.client = MagicMock()
+        mock_redis.return_value = self.client
+        self.cache = RedisCache(namespace="my-store", maxsize=10, l1_maxsize=0)
+
+    def test_get_many_single_round_trip(self):
+        names = [f"snap-{i}" for i in range(50)]
+        self.client.mget.return_value = [
+            json.dumps({"name": name}) for name in names
+        ]
+
+        values = self.cache.get_many(
+            [("details", {"name": name}) for name in names],
+            expected_type=dict,
+        )
+
+        self.assertEqual(values, [{"name": name} for name in names])
+        self.client.mget.assert_called_once_with(
+            [f"my-store:details:name-{name}" for name in names]
+        )
+        self.client.get.assert_not_called()
+
+    def test_get_many_missing_keys(self):
+        self.client.mget.return_value = ['"a"', None]
+
+        self.assertEqual(
+            self.cache.get_many(["a", "b"], expected_type=dict), ["a", None]
+        )
+        self.assertEqual(
+            self.cache.tier_stats()["l2"], {"hits": 1, "misses": 1}
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def l1_cache(self, mock_redis):
+        mock_redis.return_value = self.client
+        return RedisCache(namespace="my-store", maxsize=10, l1_maxsize=100)
+
+    def test_get_many_reads_memory_first(self):
+        cache = self.l1_cache()
+        pipeline = self.client.pipeline.return_value
+        pipeline.execute.return_value = ['"a"', 60000, '"b"', 60000]
+        cache.get_many(["a", "b"], expected_type=dict)
+        pipeline.execute.return_value = ['"c"', 60000]
+
+        values = cache.get_many(["a", "b", "c"], expected_type=dict)
+
+        self.assertEqual(values, ["a", "b", "c"])
+        self.assertEqual(pipeline.execute.call_count, 2)
+        pipeline.get.assert_called_with("my-store:c")
+        self.assertEqual(cache.tier_stats()["l1"]["hits"], 2)
+        self.client.mget.assert_not_called()
+
+    def test_get_many_revalidates_stale_entries(self):
+        self.client.mget.return_value = ['"old"', '"other"', None]
+        self.client.set.return_value = True
+        loader = MagicMock(return_value="new")
+        self.cache.register_loader("featured", loader)
+
+        values = self.cache.get_many(["featured", "other"])
+        self.cache._refresh_pool.shutdown(wait=True)
+
+        self.assertEqual(values, ['"old"', '"other"'])
+        self.client.mget.assert_called_once_with(
+            ["my-store:featured", "my-store:other", "my-store:featured:fresh"]
+        )
+        loader.assert_called_once_with("featured")
+
+    def test_get_many_redis_error(self):
+        self.client.mget.side_effect = RedisError("Down")
+
+        with self.assertLogs("canonicalwebteam.stores_web_redis.utility"):
+            values = self.cache.get_many(["a", "b"])
+
+        self.assertEqual(values, [None, None])
+
+    def test_set_many_pipelined(self):
+        pipeline = self.client.pipeline.return_value
+
+        self.cache.set_many({"a": {"x": 1}, "b": "value"}, ttl=60)
+
+        self.assertEqual(
+            pipeline.setex.call_args_list,
+            [
+                call("my-store:a", 60, '{"x": 1}'),
+                call("my-store:b", 60, "value"),
+            ],
+        )
+        # In the same round trip, for other processes' in-process caches
+        self.assertEqual(
+            pipeline.publish.call_args_list,
+            [
+                call("my-store:l1-invalidate", "my-store:a"),
+                call("my-store:l1-invalidate", "my-store:b"),
+            ],
+        )
+        pipeline.execute.assert_called_once()
+        self.client.setex.assert_not_called()
+
+    def test_set_many_drops_memory(self):
+        cache = self.l1_cache()
+        pipeline = self.client.pipeline.return_value
+        pipeline.execute.return_value = ['"old"', 60000]
+        cache.get_many([("details", {"name": "a"})])
+
+        cache.set_many([(("details", {"name": "a"}), "new")])
+
+        self.assertEqual(len(cache.l1), 0)
+        pipeline.publish.assert_called_once_with(
+            "my-store:l1-invalidate", "my-store:details:name-a"
+        )
+
+    def test_set_many_redis_error(self):
+        self.client.pipeline.return_value.execute.side_effect = RedisError(
+            "Down"
+        )
+
+        with self.assertLogs("canonicalwebteam.stores_web_redis.utility"):
+            self.cache.set_many({"a": "value"})
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_fallback(self, mock_redis):
+        mock_redis.return_value.ping.side_effect = RedisError("Down")
+        cache = RedisCache(namespace="my-store", maxsize=10)
+
+        cache.set_many({"a": {"x": 1}, "b": {"x": 2}})
+
+        self.assertEqual(
+            cache.get_many(["a", "b", "c"], expected_type=dict),
+            [{"x": 1}, {"x": 2}, None],
+        )
+
+
+class TestRedisHealth(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def setUp(self, mock_redis):
+        self.clock = FakeClock()
+        patcher = patch(
+            "canonicalwebteam.stores_web_redis.utility.monotonic", self.clock
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = MagicMock()
+        mock_redis.return_value = self.client
+        self.cache = RedisCache(
+            namespace="my-store",
+            maxsize=10,
+            l1_maxsize=0,
+            probe_interval=0.01,
+            max_probe_interval=0.04,
+        )
+
+    def assert_probed(self, state):
+        """
+        Wait for the probes pinging Redis in the background to finish,
+        then check the state they left the cache in
+        """
+        for thread in threading.enumerate():
+            if thread.name == "redis-cache-probe":
+                thread.join()
+        self.assertEqual(self.cache.health()["state"], state)
+
+    def test_healthy(self):
+        health = self.cache.health()
+
+        self.assertTrue(self.cache.redis_available)
+        self.assertEqual(health["state"], "healthy")
+        self.assertEqual(
+            (health["failovers"], health["recoveries"], health["probes"]),
+            (0, 0, 0),
+        )
+
+    def test_fails_over_on_connection_errors(self):
+        self.client.get.side_effect = RedisConnectionError("Down")
+
+        with self.assertLogs("canonicalwebteam.stores_web_redis.utility"):
+            self.assertIsNone(self.cache.get("key"))
+        self.cache.set("key", "value")
+
+        # Served from the fallback cache without trying Redis again
+        self.assertEqual(self.cache.get("key"), "value")
+        self.client.get.assert_called_once()
+        self.client.setex.assert_not_called()
+        self.assertEqual(self.cache.health()["failovers"], 1)
+
+    def test_other_errors_keep_redis(self):
+        self.client.get.side_effect = RedisError("WRONGTYPE")
+
+        with self.assertLogs("canonicalwebteam.stores_web_redis.utility"):
+            self.cache.get("key")
+
+        self.assertTrue(self.cache.redis_available)
+
+    def test_recovers(self):
+        self.client.get.side_effect = RedisConnectionError("Down")
+        with self.assertLogs("canonicalwebteam.stores_web_redis.utility"):
+            self.cache.get("key")
+        self.client.get.side_effect = None
+        self.client.get.return_value = "value"
+
+        self.clock.advance(0.02)
+        self.assertFalse(self.cache.redis_available)
+        self.assert_probed("healthy")
+
+        self.assertEqual(self.cache.get("key"), "value")
+        self.assertEqual(self.cache.health()["recoveries"], 1)
+
+    def test_probes_back_off(self):
+        self.client.ping.side_effect = RedisConnectionError("Down")
+        self.cache._redis_error("get", RedisConnectionError("Down"))
+
+        delays = []
+        for _ in range(4):
+            self.clock.advance(self.cache._probe_delay)
+            self.assertFalse(self.cache.redis_available)
+            self.assert_probed("unhealthy")
+            delays.append(self.cache._probe_delay)
+
+        self.assertEqual(delays, [0.02, 0.04, 0.04, 0.04])
+        self.assertEqual(self.cache.health()["probes"], 4)
+
+    def test_no_probe_before_the_interval(self):
+        self.client.ping.side_effect = RedisConnectionError("Down")
+        self.cache.probe_interval = 60
+        self.cache._redis_error("get", RedisConnectionError("Down"))
+
+        for _ in range(10):
+            self.assertFalse(self.cache.redis_available)
+
+        self.client.ping.assert_called_once()
+        self.assertEqual(self.cache.health()["state"], "unhealthy")
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_unavailable_at_start(self, mock_redis):
+        client = MagicMock()
+        client.ping.side_effect = [RedisError("Down"), True]
+        client.pipeline.return_value.execute.return_value = ['{"x": 1}', -1]
+        mock_redis.return_value = client
+        self.cache = RedisCache(
+            namespace="my-store",
+            maxsize=10,
+            l1_maxsize=100,
+            probe_interval=0.01,
+        )
+        client.pubsub.assert_not_called()
+        self.cache.l1["my-store:key"] = ('{"x": 0}', self.clock() + 60)
+
+        self.clock.advance(0.02)
+        self.assertFalse(self.cache.redis_available)
+        self.assert_probed("healthy")
+
+        # Values kept in memory meanwhile are dropped, and invalidations
+        # listened to
+        self.assertEqual(self.cache.get("key", expected_type=dict), {"x": 1})
+        client.pubsub.return_value.subscribe.assert_called_once()
+
+
 if __name__ == "__main__":
     unittest.main()
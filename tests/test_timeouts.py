@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from requests import Session
+from requests.exceptions import ReadTimeout
+
+from canonicalwebteam.exceptions import StoreApiTimeoutError
+from canonicalwebteam.store_api.async_devicegw import AsyncDeviceGW
+from canonicalwebteam.store_api.dashboard import DASHBOARD_TIMEOUT, Dashboard
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from canonicalwebteam.store_api.timeouts import (
+    DEFAULT_TIMEOUT,
+    resolve_timeout,
+    store_deadline,
+    store_timeout,
+)
+from tests.helpers import FakeClock, StubStoreMixin, make_response
+
+
+class TestResolveTimeout(unittest.TestCase):
+    def test_default(self):
+        self.assertEqual(resolve_timeout((1.0, 2.0)), (1.0, 2.0))
+        self.assertEqual(resolve_timeout(5), (5, 5))
+
+    def test_override(self):
+        with store_timeout((4.0, 60.0)):
+            self.assertEqual(resolve_timeout(DEFAULT_TIMEOUT), (4.0, 60.0))
+        self.assertEqual(resolve_timeout(DEFAULT_TIMEOUT), DEFAULT_TIMEOUT)
+
+    def test_deadline_shortens_timeout(self):
+        with store_deadline(0.5):
+            connect, read = resolve_timeout((3.0, 10.0))
+        self.assertLessEqual(connect, 0.5)
+        self.assertLessEqual(read, 0.5)
+
+    def test_nested_deadline_cannot_extend(self):
+        with store_deadline(0.5):
+            with store_deadline(10):
+                _, read = resolve_timeout((3.0, 10.0))
+        self.assertLessEqual(read, 0.5)
+
+    def test_expired_deadline(self):
+        clock = FakeClock()
+        with patch("canonicalwebteam.store_api.timeouts.monotonic", clock):
+            with store_deadline(0.01):
+                clock.advance(0.02)
+                with self.assertRaises(StoreApiTimeoutError):
+                    resolve_timeout(DEFAULT_TIMEOUT)
+
+
+class TestGatewayTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.session = Mock(spec=Session)
+
+    def test_default_timeouts(self):
+        self.session.get.return_value = make_response({"snap_id": "id"})
+
+        DeviceGW("snap", self.session).get_item_details("test")
+        Dashboard(self.session).get_snap_id({"macaroons": ""}, "test")
+
+        first, second = self.session.get.call_args_list
+        self.assertEqual(first.kwargs["timeout"], DEFAULT_TIMEOUT)
+        self.assertEqual(second.kwargs["timeout"], DASHBOARD_TIMEOUT)
+
+    def test_per_instance_timeout(self):
+        self.session.get.return_value = make_response({})
+
+        DeviceGW("snap", self.session, timeout=(1, 2)).get_categories()
+
+        self.assertEqual(self.session.get.call_args.kwargs["timeout"], (1, 2))
+
+    def test_deadline_spans_composite_calls(self):
+        clock = FakeClock()
+
+        def slow_get(**kwargs):
+            clock.advance(0.1)
+            return make_response({"snap_id": "id"})
+
+        self.session.get.side_effect = slow_get
+        dashboard = Dashboard(self.session)
+
+        with patch("canonicalwebteam.store_api.timeouts.monotonic", clock):
+            with store_deadline(0.08):
+                dashboard.get_snap_id({"macaroons": ""}, "test")
+                with self.assertRaises(StoreApiTimeoutError):
+                    dashboard.get_snap_id({"macaroons": ""}, "test")
+
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_requests_timeout_mapped(self):
+        self.session.get.side_effect = ReadTimeout("read timed out")
+
+        with self.assertRaises(StoreApiTimeoutError):
+            DeviceGW("snap", self.session).get_categories()
+
+
+class TestAsyncTimeouts(StubStoreMixin, unittest.IsolatedAsyncioTestCase):
+    async def test_deadline(self):
+        self.stub.delay = 0.5
+        self.stub.add("GET", "/v2/snaps/categories", {})
+        client = self.use_stub(AsyncDeviceGW("snap"))
+
+        with store_deadline(0.1):
+            with self.assertRaises(StoreApiTimeoutError):
+                await client.get_categories()
+
+        await client.aclose()
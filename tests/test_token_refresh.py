@@ -0,0 +1,367 @@
+import asyncio
+import threading
+import time
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock, Mock, patch
+
+from redis import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
+from requests import Session
+
+from canonicalwebteam.exceptions import PublisherMacaroonRefreshRequired
+from canonicalwebteam.store_api.async_dashboard import AsyncDashboard
+from canonicalwebteam.store_api.dashboard import Dashboard
+from canonicalwebteam.store_api.publishergw import PublisherGW
+from canonicalwebteam.store_api.token_refresh import (
+    RefreshCoordinator,
+    credential_key,
+)
+from canonicalwebteam.stores_web_redis.utility import RedisCache
+from tests.helpers import StubStoreMixin, make_response, make_token
+
+
+def needs_refresh():
+    return make_response(
+        status_code=401,
+        headers={"WWW-Authenticate": "Macaroon needs_refresh=1"},
+    )
+
+
+class TestRefreshCoordinator(unittest.TestCase):
+    def test_concurrent_refreshes_run_once(self):
+        def refresh(session):
+            time.sleep(0.05)
+            return {"macaroons": "new"}
+
+        coordinator = RefreshCoordinator(Mock(side_effect=refresh))
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    coordinator.refresh({"macaroons": "old"})
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [{"macaroons": "new"}] * 5)
+        coordinator.refresh_fn.assert_called_once_with({"macaroons": "old"})
+        self.assertEqual(coordinator.stats()["refreshes"], 1)
+
+    def test_late_callers_reuse_the_result(self):
+        coordinator = RefreshCoordinator(Mock(return_value="new"))
+
+        coordinator.refresh("old")
+        coordinator.refresh("old")
+
+        coordinator.refresh_fn.assert_called_once_with("old")
+
+    def test_credential_key(self):
+        self.assertEqual(
+            credential_key({"a": 1, "b": 2}), credential_key({"b": 2, "a": 1})
+        )
+        self.assertNotEqual(credential_key("a"), credential_key("b"))
+
+
+class TestGatewayReplay(unittest.TestCase):
+    def test_replays_idempotent_call(self):
+        session = Mock(spec=Session)
+        session.get.side_effect = [
+            needs_refresh(),
+            make_response({"username": "test"}),
+        ]
+        coordinator = RefreshCoordinator(
+            Mock(return_value={"macaroons": "new"})
+        )
+        client = Dashboard(session, refresh_coordinator=coordinator)
+
+        account = client.get_account({"macaroons": "old"})
+
+        self.assertEqual(account, {"username": "test"})
+        self.assertEqual(
+            session.get.call_args.kwargs["headers"]["Macaroons"], "new"
+        )
+        self.assertEqual(coordinator.stats(), {"refreshes": 1, "replays": 1})
+
+    def test_replays_locally_expired_token(self):
+        session = Mock(spec=Session)
+        session.get.return_value = make_response()
+        new_token = make_token()
+        client = PublisherGW(
+            "charm",
+            session,
+            refresh_coordinator=RefreshCoordinator(
+                Mock(return_value=new_token)
+            ),
+        )
+
+        client.get_releases(
+            make_token(timedelta(seconds=-1)), package_name="test-charm"
+        )
+
+        session.get.assert_called_once()
+        self.assertIn(
+            new_token,
+            session.get.call_args.kwargs["headers"]["Authorization"],
+        )
+
+    def test_credential_passed_by_keyword(self):
+        session = Mock(spec=Session)
+        session.get.side_effect = [needs_refresh(), make_response()]
+        client = Dashboard(
+            session,
+            refresh_coordinator=RefreshCoordinator(
+                Mock(return_value={"macaroons": "new"})
+            ),
+        )
+
+        client.get_account(session={"macaroons": "old"})
+
+        self.assertEqual(
+            session.get.call_args.kwargs["headers"]["Macaroons"], "new"
+        )
+
+    def test_no_replay_after_unsafe_request(self):
+        session = Mock(spec=Session)
+        session.post.return_value = needs_refresh()
+        coordinator = RefreshCoordinator(Mock())
+        client = Dashboard(session, refresh_coordinator=coordinator)
+
+        with self.assertRaises(PublisherMacaroonRefreshRequired):
+            client.post_agreement({"macaroons": "old"}, True)
+
+        session.post.assert_called_once()
+        coordinator.refresh_fn.assert_not_called()
+
+    def test_replays_once(self):
+        session = Mock(spec=Session)
+        session.get.return_value = needs_refresh()
+        client = Dashboard(
+            session,
+            refresh_coordinator=RefreshCoordinator(
+                Mock(return_value={"macaroons": "new"})
+            ),
+        )
+
+        with self.assertRaises(PublisherMacaroonRefreshRequired):
+            client.get_account({"macaroons": "old"})
+
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_refresh_errors_propagate(self):
+        session = Mock(spec=Session)
+        session.get.return_value = needs_refresh()
+        client = Dashboard(
+            session,
+            refresh_coordinator=RefreshCoordinator(
+                Mock(side_effect=ValueError("logged out"))
+            ),
+        )
+
+        with self.assertRaises(ValueError):
+            client.get_account({"macaroons": "old"})
+
+    def test_no_coordinator_by_default(self):
+        client = Dashboard(Mock(spec=Session))
+
+        self.assertNotIn("get_account", vars(client))
+        self.assertIsNone(client.refresh_coordinator)
+
+
+class TestSharedRefresh(unittest.TestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_single_worker_refreshes(self, mock_redis):
+        client = MagicMock()
+        client.get.return_value = None
+        client.set.return_value = True
+        release = Mock(return_value=1)
+        client.register_script.return_value = release
+        mock_redis.return_value = client
+
+        coordinator = RefreshCoordinator(
+            Mock(return_value="new"),
+            cache=RedisCache("test", maxsize=10, l1_maxsize=0),
+            secret="test-secret",
+        )
+
+        self.assertEqual(coordinator.refresh("old"), "new")
+        lock_key = f"test:token-refresh-lock:{credential_key('old')}"
+        self.assertEqual(client.set.call_args.args[0], lock_key)
+        self.assertTrue(client.set.call_args.kwargs["nx"])
+        client.setex.assert_called_once()
+        release.assert_called_once_with(
+            keys=[lock_key], args=[client.set.call_args.args[1]]
+        )
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_shared_credentials_are_encrypted(self, mock_redis):
+        mock_redis.return_value.ping.side_effect = RedisError("Down")
+        cache = RedisCache("test", maxsize=10, l1_maxsize=0)
+        coordinator = RefreshCoordinator(
+            Mock(return_value={"macaroons": "new-macaroon"}),
+            cache=cache,
+            secret="test-secret",
+        )
+
+        coordinator.refresh({"macaroons": "old"})
+
+        ((key, value),) = cache.fallback.items()
+        self.assertNotIn("new-macaroon", value)
+        other = RefreshCoordinator(Mock(), cache=cache, secret="test-secret")
+        self.assertEqual(
+            other.refresh({"macaroons": "old"}), {"macaroons": "new-macaroon"}
+        )
+        other.refresh_fn.assert_not_called()
+
+    def test_secret_required_with_a_cache(self):
+        with patch("canonicalwebteam.store_api.token_refresh.CACHE_KEY", None):
+            with self.assertRaises(ValueError):
+                RefreshCoordinator(Mock(), cache=Mock())
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_waits_for_another_worker(self, mock_redis):
+        client = MagicMock()
+        # Another worker holds the lock and shares its result
+        client.set.return_value = None
+        mock_redis.return_value = client
+
+        coordinator = RefreshCoordinator(
+            Mock(),
+            cache=RedisCache("test", maxsize=10, l1_maxsize=0),
+            secret="test-secret",
+            poll_interval=0.01,
+        )
+        client.get.side_effect = [
+            None,
+            None,
+            coordinator._cipher.encrypt({"credential": "new"}),
+        ]
+
+        self.assertEqual(coordinator.refresh("old"), "new")
+        coordinator.refresh_fn.assert_not_called()
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_refreshes_after_waiting_too_long(self, mock_redis):
+        client = MagicMock()
+        client.set.return_value = None
+        client.get.return_value = None
+        mock_redis.return_value = client
+
+        coordinator = RefreshCoordinator(
+            Mock(return_value="new"),
+            cache=RedisCache("test", maxsize=10, l1_maxsize=0),
+            secret="test-secret",
+            wait_timeout=0.05,
+            poll_interval=0.01,
+        )
+
+        with self.assertLogs("canonicalwebteam.store_api.token_refresh"):
+            self.assertEqual(coordinator.refresh("old"), "new")
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_redis_errors_fall_back_to_local_refresh(self, mock_redis):
+        client = MagicMock()
+        client.set.side_effect = RedisConnectionError("down")
+        client.get.return_value = None
+        mock_redis.return_value = client
+
+        coordinator = RefreshCoordinator(
+            Mock(return_value="new"),
+            cache=RedisCache("test", maxsize=10, l1_maxsize=0),
+            secret="test-secret",
+        )
+
+        with self.assertLogs(
+            "canonicalwebteam.store_api.token_refresh", "ERROR"
+        ):
+            self.assertEqual(coordinator.refresh("old"), "new")
+        self.assertEqual(coordinator.cache.health()["state"], "unhealthy")
+
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    def test_shares_refreshes_once_redis_is_back(self, mock_redis):
+        client = MagicMock()
+        client.ping.side_effect = RedisError("Down")
+        client.get.return_value = None
+        client.set.return_value = True
+        mock_redis.return_value = client
+        cache = RedisCache("test", maxsize=10, l1_maxsize=0)
+        coordinator = RefreshCoordinator(
+            Mock(return_value="new"), cache=cache, secret="test-secret"
+        )
+
+        coordinator.refresh("old")
+        client.set.assert_not_called()
+
+        client.ping.side_effect = None
+        cache._probe()
+        coordinator.refresh("older")
+
+        lock_key = f"test:token-refresh-lock:{credential_key('older')}"
+        self.assertEqual(client.set.call_args.args[0], lock_key)
+
+
+class TestAsyncSharedRefresh(unittest.IsolatedAsyncioTestCase):
+    @patch("canonicalwebteam.stores_web_redis.utility.redis.Redis")
+    async def test_waits_off_the_event_loop(self, mock_redis):
+        threads = []
+        client = MagicMock()
+        # Another worker holds the lock and shares its result
+        client.set.side_effect = lambda *args, **kwargs: threads.append(
+            threading.current_thread()
+        )
+        mock_redis.return_value = client
+        coordinator = RefreshCoordinator(
+            Mock(),
+            cache=RedisCache("test", maxsize=10, l1_maxsize=0),
+            secret="test-secret",
+            poll_interval=0.01,
+        )
+        results = [None, coordinator._cipher.encrypt({"credential": "new"})]
+
+        def get(key):
+            threads.append(threading.current_thread())
+            return results.pop(0)
+
+        client.get.side_effect = get
+
+        self.assertEqual(await coordinator.arefresh("old"), "new")
+        coordinator.refresh_fn.assert_not_called()
+        # Two attempts to lock, each followed by a read
+        self.assertEqual(len(threads), 4)
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+class TestAsyncGatewayReplay(StubStoreMixin, unittest.IsolatedAsyncioTestCase):
+    async def test_replays_with_coroutine_refresh(self):
+        async def refresh(session):
+            await asyncio.sleep(0.01)
+            return {"macaroons": "new"}
+
+        self.stub.add(
+            "GET",
+            "/dev/api/account",
+            {},
+            status=401,
+            headers={"WWW-Authenticate": "Macaroon needs_refresh=1"},
+        )
+        coordinator = RefreshCoordinator(refresh)
+        client = self.use_stub(AsyncDashboard(refresh_coordinator=coordinator))
+
+        results = await asyncio.gather(
+            *(client.get_account({"macaroons": "old"}) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        # Every call was replayed with the credential refreshed once
+        for result in results:
+            self.assertIsInstance(result, PublisherMacaroonRefreshRequired)
+        self.assertEqual(coordinator.stats(), {"refreshes": 1, "replays": 3})
+        self.assertEqual(
+            [r["headers"]["Macaroons"] for r in self.stub.requests[-3:]],
+            ["new"] * 3,
+        )
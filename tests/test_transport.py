@@ -0,0 +1,83 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from requests import Request, Session
+
+from canonicalwebteam.snap_recommendations import SnapRecommendations
+from canonicalwebteam.store_api.dashboard import Dashboard
+from canonicalwebteam.store_api.devicegw import DeviceGW
+from canonicalwebteam.store_api.publishergw import PublisherGW
+from canonicalwebteam.store_api.transport import (
+    PoolAdapter,
+    build_session,
+    pool_stats,
+)
+from tests.helpers import StubStoreMixin
+
+
+class TestBuildSession(unittest.TestCase):
+    def test_mounts_adapter_per_host(self):
+        session = build_session(
+            ["https://api.snapcraft.io/", "https://api.charmhub.io"],
+            pool_maxsize=25,
+            pool_block=True,
+        )
+
+        adapter = session.get_adapter("https://api.snapcraft.io/v2/snaps")
+        self.assertIsInstance(adapter, PoolAdapter)
+        self.assertEqual(adapter.stats()["pool_maxsize"], 25)
+        self.assertTrue(adapter.stats()["pool_block"])
+        self.assertIsNot(
+            adapter, session.get_adapter("https://api.charmhub.io/v1/charm")
+        )
+        self.assertIn("https://api.charmhub.io/", pool_stats(session))
+
+    def test_keep_alive_disabled(self):
+        session = build_session(keep_alive=False)
+        request = Request("GET", "https://example.com").prepare()
+        session.get_adapter("https://example.com").add_headers(request)
+        self.assertEqual(request.headers["Connection"], "close")
+
+    def test_no_stats_for_custom_session(self):
+        self.assertEqual(pool_stats(Session()), {})
+
+
+class TestGatewaySessions(unittest.TestCase):
+    def test_each_instance_gets_its_own_session(self):
+        for factory in [
+            lambda: DeviceGW("snap"),
+            lambda: PublisherGW("charm"),
+            lambda: Dashboard(),
+            lambda: SnapRecommendations(),
+        ]:
+            first, second = factory(), factory()
+            self.assertIsNot(first.session, second.session)
+            self.assertIsInstance(
+                first.session.get_adapter("https://example.com"), PoolAdapter
+            )
+
+    def test_custom_session_is_used(self):
+        session = Session()
+        self.assertIs(DeviceGW("snap", session).session, session)
+        self.assertEqual(DeviceGW("snap", session).pool_stats(), {})
+
+
+class TestPoolStats(StubStoreMixin, unittest.TestCase):
+    def test_saturation(self):
+        self.stub.delay = 0.2
+        self.stub.add("GET", "/test", {})
+        session = build_session([self.stub.url], pool_maxsize=2)
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(
+                executor.map(
+                    lambda _: session.get(f"{self.stub.url}/test"), range(6)
+                )
+            )
+
+        stats = pool_stats(session)[f"{self.stub.url}/"]
+        self.assertEqual(stats["requests"], 6)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertGreater(stats["peak_in_flight"], 2)
+        self.assertGreater(stats["saturated"], 0)
+        self.assertGreaterEqual(stats["connections_opened"], 3)